@@ -0,0 +1,316 @@
+# Substitutos locais do Gemini, do Unsplash e do Firebase para os benchmarks
+#
+# Cada fake tem latência e taxa de falhas configuráveis e conta as chamadas,
+# para que o benchmark corra sem rede e sem custos.
+import json
+import random
+import sys
+import threading
+import time
+import types
+
+
+class Latency:
+    """Latência com distribuição log-normal à volta de `mean` (em segundos)."""
+
+    def __init__(self, mean=0.0, jitter=0.3, rng=None):
+        self.mean = mean
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+
+    def sample(self):
+        if self.mean <= 0:
+            return 0.0
+        return self.mean * self.rng.lognormvariate(0, self.jitter)
+
+    def sleep(self):
+        time.sleep(self.sample())
+
+
+class FakeProviderError(Exception):
+    """Erro de fornecedor com código HTTP, como os do google.api_core."""
+
+    def __init__(self, code, message="falha simulada"):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class CallCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {}
+
+    def add(self, name, amount=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+
+# --- Gemini ---
+# Keywords devolvidas pelo Gemini falso (escolhidas pelo prompt, para variar as buscas de imagem)
+KEYWORDS = [
+    "sunrise, mountains, peace",
+    "calm lake, reflection, morning",
+    "forest path, light, hope",
+    "ocean horizon, sky, serenity",
+    "candle, quiet room, prayer",
+]
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGemini:
+    """Instala um módulo `google.generativeai` falso com um GenerativeModel configurável."""
+
+    def __init__(self, latency=0.8, first_chunk_latency=0.2, failure_rate=0.0, chunk_size=40, seed=None):
+        self.rng = random.Random(seed)
+        self.latency = Latency(latency, rng=self.rng)
+        self.first_chunk_latency = Latency(first_chunk_latency, rng=self.rng)
+        self.failure_rate = failure_rate
+        self.chunk_size = chunk_size
+        self.calls = CallCounter()
+
+    def _payload(self, prompt, generation_config=None):
+        n = self.rng.randrange(10000)
+        campos = {
+            "keywords": KEYWORDS[sum(map(ord, prompt)) % len(KEYWORDS)],
+            "mensagem": f"Mensagem de teste {n}. " * 8,
+            "versiculo": "O Senhor é o meu pastor; nada me faltará. (Salmos 23:1)",
+            "oracao": f"Senhor, obrigado por este dia {n}. " * 5,
+        }
+        # Como no modo JSON real, só devolve os campos pedidos no schema
+        pedidos = ((generation_config or {}).get("response_schema") or {}).get("properties") or campos
+        return json.dumps({campo: campos[campo] for campo in pedidos if campo in campos}, ensure_ascii=False)
+
+    def _maybe_fail(self):
+        if self.rng.random() < self.failure_rate:
+            self.calls.add("gemini_errors")
+            raise FakeProviderError(self.rng.choice([429, 500, 503]))
+
+    def generate_content(self, prompt, stream=False, generation_config=None, **kwargs):
+        self.calls.add("gemini_calls")
+        payload = self._payload(prompt, generation_config)
+        if not stream:
+            self.latency.sleep()
+            self._maybe_fail()
+            return _Chunk(payload)
+        self.first_chunk_latency.sleep()
+        self._maybe_fail()
+        return self._stream(payload)
+
+    def _stream(self, payload):
+        pedacos = [payload[i:i + self.chunk_size] for i in range(0, len(payload), self.chunk_size)]
+        pausa = max(self.latency.sample() - self.first_chunk_latency.mean, 0) / max(len(pedacos), 1)
+        for pedaco in pedacos:
+            yield _Chunk(pedaco)
+            time.sleep(pausa)
+
+    def install(self):
+        fake = self
+        module = types.ModuleType("google.generativeai")
+
+        class GenerativeModel:
+            def __init__(self, model_name=None, generation_config=None, **kwargs):
+                fake.calls.add("gemini_models_created")
+                self.generation_config = generation_config
+
+            def generate_content(self, prompt, stream=False, generation_config=None, **kwargs):
+                return fake.generate_content(prompt, stream=stream,
+                                             generation_config=generation_config or self.generation_config, **kwargs)
+
+        class GenerativeServiceClient:
+            def __init__(self, client_options=None, **kwargs):
+                fake.calls.add("gemini_clients_created")
+                self.client_options = client_options
+
+        module.GenerativeModel = GenerativeModel
+        glm = types.ModuleType("google.ai.generativelanguage")
+        glm.GenerativeServiceClient = GenerativeServiceClient
+        ai = types.ModuleType("google.ai")
+        ai.generativelanguage = glm
+        google = sys.modules.get("google") or types.ModuleType("google")
+        google.generativeai = module
+        google.ai = ai
+        sys.modules["google"] = google
+        sys.modules["google.generativeai"] = module
+        sys.modules["google.ai"] = ai
+        sys.modules["google.ai.generativelanguage"] = glm
+        return self
+
+
+# --- Unsplash ---
+class _FakeResponse:
+    def __init__(self, status_code, data=None, headers=None, content=b""):
+        self.status_code = status_code
+        self._data = data or {}
+        self.headers = headers or {}
+        self.content = content
+
+    def json(self):
+        return self._data
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            error = FakeProviderError(self.status_code)
+            error.response = self
+            raise error
+
+
+def _imagem_jpeg(largura=1080, altura=720):
+    """JPEG do tamanho de um `urls.regular` do Unsplash, para o proxy de imagens ter o que reduzir."""
+    import io
+
+    from PIL import Image
+
+    saida = io.BytesIO()
+    Image.linear_gradient("L").resize((largura, altura)).convert("RGB").save(saida, "JPEG", quality=85)
+    return saida.getvalue()
+
+
+class FakeUnsplashSession:
+    """Substitui a sessão HTTP dos clientes do Unsplash: responde à busca e aos downloads de imagens."""
+
+    def __init__(self, latency=0.3, failure_rate=0.0, seed=None):
+        self.rng = random.Random(seed)
+        self.latency = Latency(latency, rng=self.rng)
+        self.failure_rate = failure_rate
+        self.calls = CallCounter()
+        self._imagem = None
+
+    def get(self, url, params=None, **kwargs):
+        download = not url.startswith("https://api.unsplash.com/")
+        self.calls.add("image_downloads" if download else "unsplash_calls")
+        self.latency.sleep()
+        if self.rng.random() < self.failure_rate:
+            self.calls.add("unsplash_errors")
+            return _FakeResponse(503)
+        if download:
+            if self._imagem is None:
+                self._imagem = _imagem_jpeg()
+            return _FakeResponse(200, content=self._imagem)
+        per_page = (params or {}).get("per_page", 1)
+        query = (params or {}).get("query", "")
+        results = [{"urls": {"regular": f"https://images.example/{query}/{i}.jpg"}} for i in range(per_page)]
+        return _FakeResponse(200, {"results": results})
+
+    def install(self, *clients):
+        for client in clients:
+            client._session = self
+        return self
+
+
+# --- Firebase ---
+class FakeDatabase:
+    """Árvore em memória com a API de `firebase_admin.db.Reference` usada pela aplicação.
+
+    Simula a contenção das transações otimistas: se outra escrita acontecer
+    entre a leitura e a escrita, a transação é repetida (e contada).
+    """
+
+    def __init__(self, latency=0.05, failure_rate=0.0, seed=None):
+        self.rng = random.Random(seed)
+        self.latency = Latency(latency, rng=self.rng)
+        self.failure_rate = failure_rate
+        self.tree = {}
+        self.version = 0
+        self._lock = threading.Lock()
+        self.calls = CallCounter()
+
+    def reference(self, path='/'):
+        return FakeReference(self, path.strip('/'))
+
+    def install(self):
+        """Instala módulos `firebase_admin` falsos, para que `init_firebase_app` corra sem rede."""
+        root = types.ModuleType("firebase_admin")
+        root._apps = {}
+        root.initialize_app = lambda cred, options=None: root._apps.setdefault("[DEFAULT]", options)
+        credentials = types.ModuleType("firebase_admin.credentials")
+        credentials.Certificate = lambda info: info
+        db = types.ModuleType("firebase_admin.db")
+        db.reference = self.reference
+        root.credentials, root.db = credentials, db
+        sys.modules.update({
+            "firebase_admin": root,
+            "firebase_admin.credentials": credentials,
+            "firebase_admin.db": db,
+        })
+        return self
+
+    def _io(self, kind):
+        self.calls.add(f"firebase_{kind}")
+        self.latency.sleep()
+        if self.rng.random() < self.failure_rate:
+            self.calls.add("firebase_errors")
+            raise FakeProviderError(503)
+
+    def _node(self, path, create=False):
+        node = self.tree
+        for parte in [p for p in path.split('/') if p]:
+            if not isinstance(node, dict) or parte not in node:
+                if not create:
+                    return None
+                node[parte] = {}
+            node = node[parte]
+        return node
+
+    def _set(self, path, value):
+        partes = [p for p in path.split('/') if p]
+        parent = self._node('/'.join(partes[:-1]), create=True)
+        atual = parent.get(partes[-1])
+        if isinstance(value, dict) and ".sv" in value:
+            value = (atual or 0) + value[".sv"]["increment"]
+        parent[partes[-1]] = value
+        self.version += 1
+
+
+class FakeReference:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+
+    def get(self, etag=False, shallow=False):
+        self.db._io("reads")
+        with self.db._lock:
+            value = self.db._node(self.path)
+            if shallow and isinstance(value, dict):
+                return {k: (True if isinstance(v, dict) else v) for k, v in value.items()}
+            return json.loads(json.dumps(value)) if value is not None else None
+
+    def update(self, value):
+        self.db._io("updates")
+        with self.db._lock:
+            for caminho, valor in value.items():
+                self.db._set(f"{self.path}/{caminho}", valor)
+
+    def push(self, value=''):
+        self.db._io("pushes")
+        with self.db._lock:
+            key = f"-fake{self.db.version}"
+            self.db._set(f"{self.path}/{key}", value)
+        return FakeReference(self.db, f"{self.path}/{key}")
+
+    def transaction(self, transaction_update):
+        while True:
+            self.db._io("transactions")
+            with self.db._lock:
+                versao, atual = self.db.version, self.db._node(self.path)
+            novo = transaction_update(atual)
+            self.db.latency.sleep()
+            with self.db._lock:
+                if self.db.version == versao:
+                    self.db._set(self.path, novo)
+                    return novo
+            self.db.calls.add("firebase_transaction_conflicts")
@@ -0,0 +1,380 @@
+# Benchmark offline do CoachAI Espiritual
+#
+# Corre a aplicação contra os fakes de `benchmarks.fakes` (sem rede) e mede:
+# - o tempo de cada rerun do script (via AppTest), por tipo de ação;
+# - a latência da geração com várias sessões em simultâneo (p50/p95/p99);
+# - as chamadas externas por ação e a contenção nas escritas dos contadores.
+#
+# Uso (na raiz do repositório):
+#   python -m benchmarks.run                       # tudo, com os parâmetros padrão
+#   python -m benchmarks.run --scenario sessions --sessions 50 --gemini-failure-rate 0.05
+#   python -m benchmarks.run --compare benchmarks/results/<anterior>.json
+#
+# Os resultados ficam em benchmarks/results/<commit>-<data>.json; com a mesma
+# semente e os mesmos parâmetros, são comparáveis entre commits.
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# A configuração é lida no import do `coachai`; estes valores evitam que o
+# benchmark meça o limite por sessão ou o pool em vez do caminho de geração.
+BENCH_ENV = {
+    "SESSION_RATE_PER_SECOND": "1000",
+    "SESSION_BURST": "1000",
+    "WARM_POOL_ENABLED": "0",
+    "COUNTER_FLUSH_INTERVAL": "1",
+    "STATS_REFRESH_INTERVAL": "5",
+}
+
+SUGESTOES = [
+    "Estou a passar por um momento difícil e sinto-me um pouco triste.",
+    "Gostaria de uma mensagem de motivação para começar bem o meu dia.",
+    "Estou a enfrentar uma decisão importante e sinto-me um pouco perdido(a).",
+]
+
+FIREBASE_SECRETS = {
+    "credentials": {"type": "service_account", "private_key": "fake\\nkey"},
+    "databaseURL": "https://bench.firebaseio.example",
+}
+
+# Métricas mostradas no --compare (caminho no JSON, e se maior é pior)
+COMPARE_METRICS = [
+    ("reruns.load.p50", True),
+    ("reruns.generate.p50", True),
+    ("reruns.rate.p50", True),
+    ("reruns.idle.p50", True),
+    ("sessions.generation_latency.p50", True),
+    ("sessions.generation_latency.p95", True),
+    ("sessions.generation_latency.p99", True),
+    ("sessions.first_partial_latency.p50", True),
+    ("sessions.throughput_per_second", False),
+    ("sessions.calls_per_action.gemini_calls", True),
+    ("sessions.calls_per_action.unsplash_calls", True),
+    ("sessions.calls_per_action.firebase_updates", True),
+    ("sessions.counters.events_per_write", False),
+    ("sessions.counters.transaction_conflicts", True),
+    ("sessions.errors", True),
+]
+
+
+# --- Estatísticas ---
+def percentil(valores, p):
+    """Percentil pelo método "nearest-rank"; None se não houver valores."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[indice]
+
+
+def resumo(valores):
+    return {
+        "count": len(valores),
+        "p50": percentil(valores, 50),
+        "p95": percentil(valores, 95),
+        "p99": percentil(valores, 99),
+        "max": max(valores) if valores else None,
+        "avg": sum(valores) / len(valores) if valores else None,
+    }
+
+
+def diferenca(antes, depois):
+    return {nome: depois.get(nome, 0) - antes.get(nome, 0) for nome in set(antes) | set(depois)}
+
+
+def por_acao(chamadas, acoes):
+    return {nome: round(total / acoes, 3) for nome, total in sorted(chamadas.items())} if acoes else {}
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        sujo = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if sujo else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# --- Preparação ---
+class Fakes:
+    """Instala os fakes antes do primeiro import do `coachai` e junta as contagens de chamadas."""
+
+    def __init__(self, args):
+        from benchmarks.fakes import FakeDatabase, FakeGemini, FakeUnsplashSession
+
+        for nome, valor in BENCH_ENV.items():
+            os.environ.setdefault(nome, valor)
+        # Cache de imagens vazia em cada execução, para medir também os downloads
+        os.environ.setdefault("IMAGE_CACHE_DIR", tempfile.mkdtemp(prefix="coachai-bench-imagens-"))
+        self.gemini = FakeGemini(
+            latency=args.gemini_latency, first_chunk_latency=args.gemini_first_chunk,
+            failure_rate=args.gemini_failure_rate, seed=args.seed,
+        ).install()
+        self.db = FakeDatabase(
+            latency=args.firebase_latency, failure_rate=args.firebase_failure_rate, seed=args.seed,
+        ).install()
+        self.unsplash = FakeUnsplashSession(
+            latency=args.unsplash_latency, failure_rate=args.unsplash_failure_rate, seed=args.seed,
+        )
+
+        from coachai.providers import firebase, unsplash
+
+        self.unsplash.install(unsplash.get_unsplash_client(), unsplash.get_image_client())
+        firebase.init_firebase_app(FIREBASE_SECRETS["credentials"], FIREBASE_SECRETS["databaseURL"])
+
+    def calls(self):
+        return {**self.gemini.calls.snapshot(), **self.unsplash.calls.snapshot(), **self.db.calls.snapshot()}
+
+
+def flush_contadores(engine):
+    """Grava o que estiver pendente no buffer de contadores (como no fim de um processo)."""
+    if engine is not None and engine._counter_buffer is not None:
+        engine._counter_buffer.flush()
+
+
+# --- Cenário: reruns do script (AppTest) ---
+def cenario_reruns(args, fakes):
+    """Mede cada rerun do app.py numa sessão nova: carga, geração, avaliação e rerun sem ação."""
+    from streamlit.testing.v1 import AppTest
+
+    from coachai.ui import page
+
+    tempos = {"load": [], "generate": [], "rate": [], "idle": []}
+    chamadas = {acao: {} for acao in tempos}
+    falhas = []
+    rng = random.Random(args.seed)
+
+    def medir(acao, fn):
+        antes = fakes.calls()
+        inicio = time.perf_counter()
+        at = fn()
+        tempos[acao].append(time.perf_counter() - inicio)
+        for nome, total in diferenca(antes, fakes.calls()).items():
+            chamadas[acao][nome] = chamadas[acao].get(nome, 0) + total
+        if at.exception:
+            falhas.append({"action": acao, "exception": [e.message for e in at.exception]})
+        return at
+
+    for i in range(args.reruns):
+        at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=args.timeout)
+        at.secrets["GOOGLE_API_KEY"] = "bench-google"
+        at.secrets["UNSPLASH_API_KEY"] = "bench-unsplash"
+        at.secrets["FORMSPREE_ENDPOINT"] = "https://formspree.example/bench"
+        at.secrets["firebase"] = FIREBASE_SECRETS
+
+        medir("load", at.run)
+        texto = SUGESTOES[i % len(SUGESTOES)] if rng.random() >= args.unique_ratio else f"Rerun {i}: {rng.random()}"
+        at.text_area(key="sentimento_input").input(texto)
+        medir("generate", at.button(key="main_button").click().run)
+        gostei = [b for b in at.button if b.label == "👍 Gostei"]
+        if gostei:
+            medir("rate", gostei[0].click().run)
+        medir("idle", at.run)
+
+    flush_contadores(page.get_engine())
+    return {
+        **{acao: resumo(valores) for acao, valores in tempos.items()},
+        "calls_per_action": {acao: por_acao(chamadas[acao], len(tempos[acao])) for acao in tempos},
+        "exceptions": falhas,
+    }
+
+
+# --- Cenário: sessões simultâneas (motor) ---
+def cenario_sessoes(args, fakes):
+    """Várias sessões simuladas a gerar e avaliar em simultâneo contra um único motor."""
+    from coachai.providers import firebase
+    from coachai.services.admission import Overloaded
+    from coachai.services.engine import TONS, CoachEngine
+
+    engine = CoachEngine()
+    lock = threading.Lock()
+    latencias, primeiras_parciais = [], []
+    contagens = {"actions": 0, "errors": 0, "timeouts": 0, "rejected": 0, "ratings": 0, "increments": 0}
+    barreira = threading.Barrier(args.sessions)
+
+    def somar(**valores):
+        with lock:
+            for nome, valor in valores.items():
+                contagens[nome] += valor
+
+    def sessao(indice):
+        rng = random.Random(f"{args.seed}-{indice}")
+        session_id = f"bench-{indice}"
+        barreira.wait()
+        engine.increment_visitor_count()
+        somar(increments=1)
+        for acao in range(args.actions):
+            if args.think_time:
+                time.sleep(rng.expovariate(1 / args.think_time))
+            engine.get_app_stats()
+            if rng.random() < args.unique_ratio:
+                texto = f"Sessão {indice}, pedido {acao}: preciso de força para hoje."
+            else:
+                texto = rng.choice(SUGESTOES)
+            tom = rng.choice(TONS)
+            try:
+                engine.admission.check_session(session_id)
+            except Overloaded:
+                somar(rejected=1)
+                continue
+
+            inicio = time.perf_counter()
+            primeira = []
+
+            def on_partial(campos):
+                if not primeira:
+                    primeira.append(time.perf_counter() - inicio)
+
+            resultado = engine.executar_geracao("bench-google", "bench-unsplash", texto, tom, on_partial=on_partial)
+            duracao = time.perf_counter() - inicio
+            with lock:
+                contagens["actions"] += 1
+                if resultado.ok:
+                    latencias.append(duracao)
+                    primeiras_parciais.extend(primeira)
+                    contagens["increments"] += 1
+                elif resultado.errors.get("generation") == "timeout":
+                    contagens["timeouts"] += 1
+                else:
+                    contagens["errors"] += 1
+            if resultado.ok and rng.random() < args.rating_ratio:
+                engine.handle_rating(rng.choice(["like", "dislike"]), texto, resultado.conteudo, tom)
+                somar(ratings=1, increments=1)
+
+    antes, gravados_antes = fakes.calls(), firebase.ler_contadores()
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=sessao, args=(i,)) for i in range(args.sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+    # As tarefas "fire-and-forget" do pipeline (contadores) terminam antes do flush final
+    engine.executor.shutdown(wait=True)
+    flush_contadores(engine)
+    chamadas = diferenca(antes, fakes.calls())
+
+    gravados = firebase.ler_contadores()
+    buffer = engine.counter_buffer.metrics
+    return {
+        "duration": duracao,
+        "throughput_per_second": contagens["actions"] / duracao if duracao else 0.0,
+        **contagens,
+        "generation_latency": resumo(latencias),
+        "first_partial_latency": resumo(primeiras_parciais),
+        "calls": chamadas,
+        "calls_per_action": por_acao(chamadas, contagens["actions"]),
+        "counters": {
+            "increments_requested": contagens["increments"],
+            "increments_stored": sum(gravados.values()) - sum(gravados_antes.values()),
+            "firebase_writes": chamadas.get("firebase_updates", 0) + chamadas.get("firebase_transactions", 0),
+            "events_per_write": (buffer["events_written"] / buffer["flushes"]) if buffer["flushes"] else 0.0,
+            "transaction_conflicts": chamadas.get("firebase_transaction_conflicts", 0),
+            "max_flush_seconds": buffer["max_flush_seconds"],
+            "lost_writes": buffer["lost_writes"],
+        },
+        "admission": engine.admission.stats(),
+        "validator": engine.validator.stats(),
+        "cache": engine.response_cache.stats(),
+        "pipeline": engine.pipeline.stats(),
+    }
+
+
+# --- Relatório ---
+def valor_em(resultado, caminho):
+    for parte in caminho.split("."):
+        if not isinstance(resultado, dict) or parte not in resultado:
+            return None
+        resultado = resultado[parte]
+    return resultado
+
+
+def formatar(valor):
+    if valor is None:
+        return "-"
+    return f"{valor:.4f}" if isinstance(valor, float) else str(valor)
+
+
+def imprimir_resumo(resultado, base=None):
+    titulo = f"Benchmark {resultado['commit']}"
+    if base is not None:
+        titulo += f" vs {base['commit']}"
+    print(titulo)
+    for caminho, maior_e_pior in COMPARE_METRICS:
+        atual = valor_em(resultado, caminho)
+        if atual is None:
+            continue
+        linha = f"  {caminho:<45} {formatar(atual):>10}"
+        anterior = valor_em(base, caminho) if base is not None else None
+        if isinstance(anterior, (int, float)) and anterior:
+            variacao = (atual - anterior) / anterior * 100
+            pior = variacao > 0 if maior_e_pior else variacao < 0
+            linha += f"  {formatar(anterior):>10}  {variacao:+.1f}%{' !' if pior and abs(variacao) > 10 else ''}"
+        print(linha)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline do CoachAI Espiritual")
+    parser.add_argument("--scenario", choices=["all", "reruns", "sessions"], default="all")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reruns", type=int, default=10, help="sessões AppTest no cenário de reruns")
+    parser.add_argument("--sessions", type=int, default=20, help="sessões simultâneas")
+    parser.add_argument("--actions", type=int, default=5, help="gerações por sessão")
+    parser.add_argument("--think-time", type=float, default=0.2, help="pausa média entre ações (s)")
+    parser.add_argument("--unique-ratio", type=float, default=0.5, help="fração de textos escritos livremente")
+    parser.add_argument("--rating-ratio", type=float, default=0.5, help="fração de respostas avaliadas")
+    parser.add_argument("--gemini-latency", type=float, default=0.8)
+    parser.add_argument("--gemini-first-chunk", type=float, default=0.2)
+    parser.add_argument("--gemini-failure-rate", type=float, default=0.0)
+    parser.add_argument("--unsplash-latency", type=float, default=0.3)
+    parser.add_argument("--unsplash-failure-rate", type=float, default=0.0)
+    parser.add_argument("--firebase-latency", type=float, default=0.05)
+    parser.add_argument("--firebase-failure-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=60, help="tempo máximo de cada rerun no AppTest (s)")
+    parser.add_argument("--output", help="ficheiro de resultados (padrão: benchmarks/results/<commit>-<data>.json)")
+    parser.add_argument("--compare", help="resultados anteriores para comparar")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    fakes = Fakes(args)
+    resultado = {
+        "commit": git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "params": vars(args),
+    }
+    if args.scenario in ("all", "reruns"):
+        resultado["reruns"] = cenario_reruns(args, fakes)
+    if args.scenario in ("all", "sessions"):
+        resultado["sessions"] = cenario_sessoes(args, fakes)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        data = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{resultado['commit']}-{data}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2, default=str)
+
+    base = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            base = json.load(f)
+    imprimir_resumo(resultado, base)
+    print(f"Resultados gravados em {output}")
+
+
+if __name__ == "__main__":
+    main()
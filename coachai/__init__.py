@@ -0,0 +1,2 @@
+# CoachAI Espiritual: geração de mensagens, versículos e orações com o Gemini,
+# imagens do Unsplash e estatísticas no Firebase.
@@ -0,0 +1,254 @@
+# API HTTP do CoachAI Espiritual
+#
+# Serve o CoachService (geração, imagens, contadores e avaliações) numa API
+# assíncrona sem estado de sessão, para correr em vários workers atrás de um
+# balanceador de carga, separada das sessões da interface. Cada worker tem o
+# seu CoachEngine e inicializa o Firebase uma vez; o estado partilhado fica no
+# Firebase (contadores com incrementos atómicos) e, opcionalmente, no cache de
+# respostas em SQLite (RESPONSE_CACHE_PATH) e na cache de imagens em disco.
+#
+# A interface Streamlit passa a ser um cliente desta API quando COACHAI_API_URL
+# está definido (ver `providers.coach_api`).
+#
+# Uso (na raiz do repositório, com as chaves nas variáveis de ambiente):
+#   python -m coachai.api --port 8000 --workers 4
+#
+# Endpoints (com COACHAI_API_TOKEN definido, todos menos /healthz pedem
+# "Authorization: Bearer <token>"):
+#   POST /v1/generate  {sentimento, tom, surpresa?, session_id?, stream?}
+#        com stream=true devolve NDJSON: {"partial": {...}}* e depois {"result": {...}}
+#   GET  /v1/image?url=&keywords=   imagem do card, já redimensionada (url só da CDN do Unsplash)
+#   GET  /v1/image-url?keywords=    URL do Unsplash para as keywords
+#   POST /v1/visit                  conta uma visita
+#   POST /v1/rate    {tipo: like|dislike, sentimento?, resposta?, tom?}
+#   GET  /v1/stats                  visitas, mensagens e avaliações
+#   GET  /v1/metrics                métricas do motor (JSON)
+#   GET  /metrics                   métricas do processo (Prometheus)
+#   GET  /healthz                   estado do worker e do Firebase
+import argparse
+import asyncio
+import contextlib
+import json
+import secrets
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from coachai import config, telemetry
+from coachai.services.admission import Overloaded
+from coachai.services.engine import TONS, CoachEngine
+from coachai.services.image_store import url_permitida
+from coachai.services.service import CoachService, resultado_para_json
+
+TIPOS_IMAGEM = {"webp": "image/webp", "jpg": "image/jpeg"}
+
+
+class ErroPedido(Exception):
+    """Pedido inválido; vira uma resposta 4xx com a mensagem em JSON."""
+
+    def __init__(self, mensagem, status=422):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def _erro(mensagem, status):
+    return JSONResponse({"error": mensagem}, status_code=status)
+
+
+def _autorizado(request):
+    if not config.API_TOKEN:
+        return True
+    recebido = request.headers.get("authorization", "")
+    return secrets.compare_digest(recebido, f"Bearer {config.API_TOKEN}")
+
+
+def endpoint(fn):
+    """Autenticação, erros de validação e Overloaded (429) comuns a todos os endpoints /v1."""
+    async def handler(request):
+        if not _autorizado(request):
+            return _erro("token inválido", 401)
+        try:
+            return await fn(request, request.app.state.service)
+        except ErroPedido as e:
+            return _erro(str(e), e.status)
+        except Overloaded as e:
+            return _erro(str(e), 429)
+    return handler
+
+
+async def _corpo(request):
+    try:
+        dados = await request.json()
+    except ValueError:
+        raise ErroPedido("corpo JSON inválido", 400)
+    if not isinstance(dados, dict):
+        raise ErroPedido("o corpo deve ser um objeto JSON", 400)
+    return dados
+
+
+def _campo(dados, nome, tipo=str):
+    """Valor de `nome` no corpo (None se faltar); ErroPedido (422) se tiver outro tipo."""
+    valor = dados.get(nome)
+    if valor is not None and not isinstance(valor, tipo):
+        descricao = "um objeto JSON" if tipo is dict else "texto"
+        raise ErroPedido(f"'{nome}' deve ser {descricao}")
+    return valor
+
+
+# --- Endpoints ---
+@endpoint
+async def gerar(request, service):
+    dados = await _corpo(request)
+    sentimento = (_campo(dados, "sentimento") or "").strip()
+    tom = _campo(dados, "tom")
+    session_id = _campo(dados, "session_id")
+    if not sentimento:
+        raise ErroPedido("'sentimento' é obrigatório")
+    if tom not in TONS:
+        raise ErroPedido(f"'tom' deve ser um de: {', '.join(TONS)}")
+    argumentos = (sentimento, tom, bool(dados.get("surpresa")), session_id)
+    if not dados.get("stream"):
+        result = await run_in_threadpool(service.gerar, *argumentos)
+        return JSONResponse(resultado_para_json(result))
+
+    # O limite da sessão é verificado antes de abrir o stream, para poder responder 429
+    if argumentos[3]:
+        service.engine.admission.check_session(argumentos[3])
+    loop = asyncio.get_running_loop()
+    parciais = asyncio.Queue()
+
+    def on_partial(campos):
+        loop.call_soon_threadsafe(parciais.put_nowait, campos)
+
+    async def linhas():
+        tarefa = asyncio.ensure_future(run_in_threadpool(
+            service.gerar, sentimento, tom, argumentos[2], None, on_partial
+        ))
+        while True:
+            proximo = asyncio.ensure_future(parciais.get())
+            await asyncio.wait({proximo, tarefa}, return_when=asyncio.FIRST_COMPLETED)
+            if not proximo.done():
+                proximo.cancel()
+                break
+            yield json.dumps({"partial": proximo.result()}, ensure_ascii=False) + "\n"
+        while not parciais.empty():
+            yield json.dumps({"partial": parciais.get_nowait()}, ensure_ascii=False) + "\n"
+        yield json.dumps({"result": resultado_para_json(tarefa.result())}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(linhas(), media_type="application/x-ndjson")
+
+
+@endpoint
+async def imagem(request, service):
+    keywords = request.query_params.get("keywords", "")
+    url = request.query_params.get("url") or None
+    # Só imagens da CDN do Unsplash: nada de ficheiros do servidor (local:) nem outros hosts
+    if url is not None and not url_permitida(url):
+        raise ErroPedido(f"'url' deve ser uma imagem HTTPS de: {', '.join(config.IMAGE_ALLOWED_HOSTS)}")
+    dados = await run_in_threadpool(service.imagem, url, keywords)
+    if not dados:
+        return Response(status_code=404)
+    media_type = TIPOS_IMAGEM.get(service.engine.image_store.extensao, "application/octet-stream")
+    return Response(dados, media_type=media_type, headers={"Cache-Control": "public, max-age=86400"})
+
+
+@endpoint
+async def url_imagem(request, service):
+    keywords = request.query_params.get("keywords", "")
+    return JSONResponse({"image_url": await run_in_threadpool(service.buscar_imagem, keywords)})
+
+
+@endpoint
+async def visita(request, service):
+    # O contador pode escrever no Firebase: fora do event loop
+    await run_in_threadpool(service.registrar_visita)
+    return Response(status_code=204)
+
+
+@endpoint
+async def avaliar(request, service):
+    dados = await _corpo(request)
+    if dados.get("tipo") not in ("like", "dislike"):
+        raise ErroPedido("'tipo' deve ser 'like' ou 'dislike'")
+    # Tudo validado antes de chamar o serviço: a avaliação incrementa contadores
+    sentimento, tom, resposta = _campo(dados, "sentimento"), _campo(dados, "tom"), _campo(dados, "resposta", dict)
+    for campo in ("mensagem", "versiculo", "keywords"):
+        _campo(resposta or {}, campo)
+    await run_in_threadpool(service.avaliar, dados["tipo"], sentimento, resposta, tom)
+    return Response(status_code=204)
+
+
+@endpoint
+async def estatisticas(request, service):
+    stats = await run_in_threadpool(service.estatisticas)
+    if stats is None:
+        return _erro("estatísticas indisponíveis (Firebase não configurado)", 503)
+    return JSONResponse(stats)
+
+
+@endpoint
+async def metricas(request, service):
+    return JSONResponse(await run_in_threadpool(service.metricas))
+
+
+async def prometheus(request):
+    if not _autorizado(request):
+        return _erro("token inválido", 401)
+    return PlainTextResponse(telemetry.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+async def healthz(request):
+    service = request.app.state.service
+    estado = await run_in_threadpool(service.estado_base_de_dados)
+    return JSONResponse({"status": "ok", "firebase": estado, "ready": service.pronto})
+
+
+# --- Aplicação ---
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """Um motor por worker, com o Firebase e o pool do "Me Surpreenda" iniciados no arranque."""
+    service = CoachService(CoachEngine(), config.load_api_keys())
+    await run_in_threadpool(service.estado_base_de_dados)
+    service.aquecer()
+    app.state.service = service
+    telemetry.log_event("api_started", ready=service.pronto)
+    yield
+
+
+def criar_app():
+    return Starlette(
+        routes=[
+            Route("/v1/generate", gerar, methods=["POST"]),
+            Route("/v1/image", imagem),
+            Route("/v1/image-url", url_imagem),
+            Route("/v1/visit", visita, methods=["POST"]),
+            Route("/v1/rate", avaliar, methods=["POST"]),
+            Route("/v1/stats", estatisticas),
+            Route("/v1/metrics", metricas),
+            Route("/metrics", prometheus),
+            Route("/healthz", healthz),
+        ],
+        lifespan=lifespan,
+    )
+
+
+app = criar_app()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API HTTP do CoachAI Espiritual")
+    parser.add_argument("--host", default=config.API_HOST)
+    parser.add_argument("--port", type=int, default=config.API_PORT)
+    parser.add_argument("--workers", type=int, default=config.API_WORKERS, help="processos (um motor por processo)")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    uvicorn.run("coachai.api:app", host=args.host, port=args.port, workers=args.workers,
+                log_level=config.LOG_LEVEL.lower())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+# Geração em lote do CoachAI Espiritual (devocionais diários, newsletters, ...)
+#
+# Lê pedidos (sentimento, tom) de um CSV ou JSONL e gera as respostas com o
+# mesmo CoachEngine da interface, sem Streamlit. As gerações correm num
+# escalonador asyncio com concorrência limitada e um limite de pedidos por
+# segundo; as imagens são resolvidas em paralelo com as gerações seguintes.
+# Cada resultado é acrescentado ao JSONL de saída assim que fica pronto, e esse
+# ficheiro serve de checkpoint: ao repetir o comando, os pedidos já concluídos
+# com sucesso são saltados e os que falharam são repetidos. No fim de cada
+# execução (mesmo interrompida) o ficheiro é compactado: fica um só resultado
+# por id, o mais recente.
+#
+# Uso (na raiz do repositório, com GOOGLE_API_KEY e UNSPLASH_API_KEY definidas):
+#   python -m coachai.batch pedidos.csv -o devocionais.jsonl
+#   python -m coachai.batch pedidos.jsonl -o devocionais.jsonl --concorrencia 8 --taxa 2 --imagens imagens/
+#
+# Colunas/campos de entrada: `sentimento` (obrigatório), `tom` e `id` (opcionais).
+# Linhas que não se consegue ler ficam na saída como `invalid_input`.
+import argparse
+import asyncio
+import csv
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from coachai import config, telemetry
+from coachai.providers import gemini
+from coachai.providers.http_client import all_stats
+from coachai.services.admission import TokenBucket
+from coachai.services.engine import TONS, CoachEngine
+
+
+# --- Entradas e checkpoint ---
+def _texto(valor):
+    """Valor de um campo de entrada como texto; listas, objetos e nulos ficam vazios."""
+    return str(valor).strip() if isinstance(valor, (str, int, float)) else ""
+
+
+def _ler_jsonl(f):
+    registos = []
+    for linha in f:
+        if not linha.strip():
+            continue
+        try:
+            registo = json.loads(linha)
+        except ValueError:
+            registo = None
+        # Uma linha inválida não interrompe o lote: vira um pedido sem sentimento
+        registos.append(registo if isinstance(registo, dict) else {})
+    return registos
+
+
+def ler_entradas(path, tom_padrao):
+    """Lista de pedidos {id, sentimento, tom} lidos de um CSV ou de um JSONL."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        registos = list(csv.DictReader(f)) if path.lower().endswith(".csv") else _ler_jsonl(f)
+    entradas = []
+    for n, registo in enumerate(registos, start=1):
+        entradas.append({
+            "id": _texto(registo.get("id")) or str(n),
+            "sentimento": _texto(registo.get("sentimento")),
+            "tom": _texto(registo.get("tom")).lower() or tom_padrao,
+        })
+    return entradas
+
+
+def ler_checkpoint(path):
+    """Ids já gerados com sucesso num JSONL de saída anterior (linhas incompletas são ignoradas)."""
+    feitos = set()
+    try:
+        with open(path, encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    resultado = json.loads(linha)
+                except ValueError:
+                    continue
+                if isinstance(resultado, dict) and resultado.get("status") == "ok":
+                    feitos.add(resultado["id"])
+    except FileNotFoundError:
+        pass
+    return feitos
+
+
+def compactar_saida(path):
+    """Reescreve o JSONL de saída com um só resultado por id (o último) e sem linhas incompletas."""
+    resultados = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    resultado = json.loads(linha)
+                except ValueError:
+                    continue
+                if isinstance(resultado, dict) and "id" in resultado:
+                    resultados.pop(resultado["id"], None)
+                    resultados[resultado["id"]] = linha.rstrip("\n")
+    except FileNotFoundError:
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(linha + "\n" for linha in resultados.values())
+    os.replace(tmp_path, path)
+
+
+def percentil(valores, q):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+
+# --- Escalonador ---
+class BatchRunner:
+    """Gera um lote de pedidos com `concorrencia` gerações em simultâneo e até `taxa` pedidos/segundo.
+
+    Com o circuit breaker do Gemini aberto, os workers esperam que volte a
+    meio-aberto em vez de falharem o resto do lote.
+    """
+
+    def __init__(self, engine, google_key, unsplash_key, saida, concorrencia=4, taxa=1.0,
+                 concorrencia_imagens=4, imagens_dir=None, variado=False, timeout=60.0):
+        self.engine = engine
+        self.google_key = google_key
+        self.resolver = engine.get_image_resolver(unsplash_key) if unsplash_key else None
+        self.saida = saida
+        self.concorrencia = concorrencia
+        self.bucket = TokenBucket(taxa, burst=max(1, concorrencia)) if taxa > 0 else None
+        self.concorrencia_imagens = concorrencia_imagens
+        self.imagens_dir = imagens_dir
+        self.variado = variado
+        self.timeout = timeout
+        self.feitos = ler_checkpoint(saida)
+        self.contagem = {"ok": 0, "error": 0, "skipped": 0}
+        self.latencias = {"generation": [], "image": []}
+        self.total = 0
+        self.inicio = None
+        self._saida = None
+        self._pendentes = set()
+
+    async def run(self, entradas):
+        loop = asyncio.get_running_loop()
+        # O motor é síncrono: as gerações e as imagens correm neste pool, fora do event loop
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.concorrencia + self.concorrencia_imagens))
+        self._sem_imagens = asyncio.Semaphore(self.concorrencia_imagens)
+        if self.imagens_dir:
+            os.makedirs(self.imagens_dir, exist_ok=True)
+        self.total = len(entradas)
+        self.inicio = time.perf_counter()
+        self._abrir_saida()
+        try:
+            fila = asyncio.Queue(maxsize=self.concorrencia * 2)
+            workers = [asyncio.create_task(self._worker(fila)) for _ in range(self.concorrencia)]
+            for entrada in entradas:
+                if entrada["id"] in self.feitos:
+                    self.contagem["skipped"] += 1
+                    continue
+                await fila.put(entrada)
+            for _ in workers:
+                await fila.put(None)
+            await asyncio.gather(*workers)
+            # As últimas imagens ainda podem estar a ser resolvidas
+            await asyncio.gather(*self._pendentes)
+        finally:
+            self._saida.close()
+            # Os pedidos repetidos (que falharam antes) deixaram o resultado antigo no ficheiro
+            compactar_saida(self.saida)
+        return self.resumo()
+
+    def _abrir_saida(self):
+        # Uma execução interrompida pode ter deixado a última linha a meio
+        linha_a_meio = False
+        try:
+            with open(self.saida, "rb") as f:
+                if f.seek(0, os.SEEK_END):
+                    f.seek(-1, os.SEEK_END)
+                    linha_a_meio = f.read(1) != b"\n"
+        except FileNotFoundError:
+            pass
+        self._saida = open(self.saida, "a", encoding="utf-8")
+        if linha_a_meio:
+            self._saida.write("\n")
+
+    async def _esperar_vez(self):
+        breaker = gemini.get_gemini_client().breaker
+        while not breaker.available:
+            await asyncio.sleep(1.0)
+        if self.bucket is not None:
+            while not self.bucket.take():
+                await asyncio.sleep(1.0 / self.bucket.rate)
+
+    async def _worker(self, fila):
+        loop = asyncio.get_running_loop()
+        while True:
+            entrada = await fila.get()
+            if entrada is None:
+                return
+            if not entrada["sentimento"] or entrada["tom"] not in TONS:
+                self._gravar(entrada, erro="invalid_input")
+                continue
+            await self._esperar_vez()
+            inicio = time.perf_counter()
+            geracao = loop.run_in_executor(None, self._gerar, entrada)
+            try:
+                resposta = await asyncio.wait_for(asyncio.shield(geracao), self.timeout)
+                erro = None if resposta else "generation_failed"
+            except asyncio.TimeoutError:
+                resposta, erro = None, "timeout"
+            except Exception as e:
+                # Ex.: Overloaded, se a interface partilhar o processo e a fila global estiver cheia
+                resposta, erro = None, type(e).__name__
+            segundos = time.perf_counter() - inicio
+            self.latencias["generation"].append(segundos)
+            if resposta is None:
+                self._gravar(entrada, erro=erro, segundos=segundos)
+                if not geracao.done():
+                    # A thread não pode ser cancelada: o worker só pega no pedido seguinte quando
+                    # ela termina, para nunca haver mais de `concorrencia` gerações em curso
+                    await asyncio.wait({geracao})
+                continue
+            tarefa = asyncio.create_task(self._finalizar(entrada, resposta, segundos))
+            self._pendentes.add(tarefa)
+            tarefa.add_done_callback(self._pendentes.discard)
+
+    def _gerar(self, entrada):
+        return self.engine.obter_conteudo_espiritual(
+            self.google_key, entrada["sentimento"], entrada["tom"], variado=self.variado
+        )
+
+    async def _finalizar(self, entrada, resposta, segundos):
+        """Resolve a imagem da resposta (e guarda-a, se pedido) e grava o resultado."""
+        loop = asyncio.get_running_loop()
+        image_url, imagem = None, None
+        if self.resolver is None and not self.imagens_dir:
+            self._gravar(entrada, resposta=resposta, segundos=segundos)
+            return
+        async with self._sem_imagens:
+            inicio = time.perf_counter()
+            try:
+                if self.resolver is not None:
+                    image_url = await loop.run_in_executor(None, self.resolver.resolve, resposta["keywords"])
+                if self.imagens_dir:
+                    dados = await loop.run_in_executor(
+                        None, self.engine.imagem_do_card, image_url, resposta["keywords"]
+                    )
+                    if dados:
+                        imagem = self._guardar_imagem(entrada["id"], dados)
+            except Exception as e:
+                telemetry.record_error("batch", e, "Falha ao resolver a imagem", id=entrada["id"])
+            self.latencias["image"].append(time.perf_counter() - inicio)
+        self._gravar(entrada, resposta=resposta, segundos=segundos, image_url=image_url, imagem=imagem)
+
+    def _guardar_imagem(self, id_, dados):
+        nome = re.sub(r"[^\w.-]", "_", id_) + "." + self.engine.image_store.extensao
+        with open(os.path.join(self.imagens_dir, nome), "wb") as f:
+            f.write(dados)
+        return nome
+
+    def _gravar(self, entrada, resposta=None, erro=None, segundos=0.0, image_url=None, imagem=None):
+        resultado = {**entrada, "status": "ok" if resposta else "error", "segundos": round(segundos, 3)}
+        if resposta:
+            resultado.update(resposta=resposta, image_url=image_url)
+            if imagem:
+                resultado["imagem"] = imagem
+        else:
+            resultado["erro"] = erro
+        self._saida.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+        self._saida.flush()
+        self.contagem[resultado["status"]] += 1
+        feitos = sum(self.contagem.values())
+        print(f"[{feitos:>{len(str(self.total))}}/{self.total}] {resultado['status']:<5} {entrada['id']} "
+              f"({segundos:.2f}s){'' if resposta else ' ' + str(erro)}", file=sys.stderr)
+
+    def resumo(self):
+        decorrido = time.perf_counter() - self.inicio if self.inicio else 0.0
+        processados = self.contagem["ok"] + self.contagem["error"]
+        return {
+            "total": self.total,
+            **self.contagem,
+            "elapsed_seconds": round(decorrido, 2),
+            "throughput_per_second": round(processados / decorrido, 3) if decorrido else None,
+            "generation_p50": percentil(self.latencias["generation"], 0.5),
+            "generation_p95": percentil(self.latencias["generation"], 0.95),
+            "image_p50": percentil(self.latencias["image"], 0.5),
+            "response_cache": self.engine.response_cache.stats(),
+            "providers": all_stats(),
+        }
+
+
+def imprimir_resumo(resumo, interrompido=False):
+    print("Lote interrompido (repita o comando para continuar)" if interrompido else "Lote concluído",
+          file=sys.stderr)
+    for chave in ("total", "ok", "error", "skipped", "elapsed_seconds", "throughput_per_second",
+                  "generation_p50", "generation_p95", "image_p50"):
+        valor = resumo[chave]
+        print(f"  {chave:<24} {f'{valor:.3f}' if isinstance(valor, float) else valor}", file=sys.stderr)
+    for fornecedor, metricas in resumo["providers"].items():
+        print(f"  {fornecedor:<24} {metricas['requests']} pedidos, {metricas['errors']} erros, "
+              f"{metricas['retries']} novas tentativas", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Geração em lote do CoachAI Espiritual")
+    parser.add_argument("entrada", help="CSV ou JSONL com os pedidos (sentimento, tom, id)")
+    parser.add_argument("-o", "--saida", help="JSONL de resultados e checkpoint (padrão: <entrada>.saida.jsonl)")
+    parser.add_argument("--tom", default=TONS[0], choices=TONS, help="tom dos pedidos sem tom")
+    parser.add_argument("--concorrencia", type=int, default=config.BATCH_CONCURRENCY, help="gerações simultâneas")
+    parser.add_argument("--taxa", type=float, default=config.BATCH_RATE_PER_SECOND,
+                        help="máximo de gerações iniciadas por segundo (0 = sem limite)")
+    parser.add_argument("--concorrencia-imagens", type=int, default=config.BATCH_IMAGE_CONCURRENCY)
+    parser.add_argument("--imagens", help="pasta onde guardar a imagem de cada resposta, já redimensionada")
+    parser.add_argument("--sem-imagens", action="store_true", help="não busca imagens no Unsplash")
+    parser.add_argument("--variar", action="store_true",
+                        help="pedidos repetidos recebem respostas diferentes (como o \"Me Surpreenda\")")
+    parser.add_argument("--timeout", type=float, default=config.GENERATION_TIMEOUT, help="tempo máximo por geração (s)")
+    args = parser.parse_args(argv)
+
+    keys = config.load_api_keys() or {}
+    if not keys.get("google"):
+        parser.error("defina GOOGLE_API_KEY (ou os secrets do Streamlit)")
+    saida = args.saida or os.path.splitext(args.entrada)[0] + ".saida.jsonl"
+    runner = BatchRunner(
+        CoachEngine(), keys["google"], None if args.sem_imagens else keys.get("unsplash"), saida,
+        concorrencia=args.concorrencia, taxa=args.taxa, concorrencia_imagens=args.concorrencia_imagens,
+        imagens_dir=args.imagens, variado=args.variar, timeout=args.timeout,
+    )
+    entradas = ler_entradas(args.entrada, args.tom)
+    try:
+        resumo = asyncio.run(runner.run(entradas))
+    except KeyboardInterrupt:
+        imprimir_resumo(runner.resumo(), interrompido=True)
+        return 130
+    imprimir_resumo(resumo)
+    print(f"Resultados em {saida}", file=sys.stderr)
+    return 1 if resumo["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
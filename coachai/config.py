@@ -0,0 +1,137 @@
+# Configuração do CoachAI Espiritual
+#
+# Todas as definições vêm de variáveis de ambiente (com valores padrão) e as
+# chaves de API dos secrets do Streamlit, com as variáveis de ambiente como
+# alternativa para execução fora do Streamlit.
+import json
+import os
+import tempfile
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_flag(name, default="1"):
+    return os.environ.get(name, default) != "0"
+
+
+TEXTO_SURPRESA = "Preciso de uma mensagem de sabedoria e inspiração para o meu dia"
+
+# --- Gemini ---
+GEMINI_MODEL_NAME = os.environ.get("GEMINI_MODEL_NAME", "gemini-2.5-flash-preview-05-20")
+GEMINI_REQUEST_TIMEOUT = _env_float("GEMINI_REQUEST_TIMEOUT", "60")
+GEMINI_TEMPERATURE = os.environ.get("GEMINI_TEMPERATURE")
+GEMINI_MAX_OUTPUT_TOKENS = os.environ.get("GEMINI_MAX_OUTPUT_TOKENS")
+GEMINI_MAX_RETRIES = _env_int("GEMINI_MAX_RETRIES", "1")
+# Cada key (a das secrets ou a que o visitante escreve) tem o seu modelo e cache de imagens;
+# só as usadas mais recentemente ficam em memória
+MAX_CACHED_API_KEYS = _env_int("MAX_CACHED_API_KEYS", "8")
+STREAMING_ENABLED = _env_flag("GEMINI_STREAMING")
+
+# --- Unsplash ---
+UNSPLASH_CONNECT_TIMEOUT = _env_float("UNSPLASH_CONNECT_TIMEOUT", "3.05")
+UNSPLASH_READ_TIMEOUT = _env_float("UNSPLASH_READ_TIMEOUT", "5")
+UNSPLASH_MAX_RETRIES = _env_int("UNSPLASH_MAX_RETRIES", "2")
+UNSPLASH_PER_PAGE = _env_int("UNSPLASH_PER_PAGE", "10")
+
+# --- Imagens (proxy local) ---
+IMAGE_CACHE_DIR = os.environ.get("IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "coachai-imagens"))
+IMAGE_CACHE_MAX_BYTES = _env_int("IMAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+IMAGE_FETCH_TIMEOUT = _env_float("IMAGE_FETCH_TIMEOUT", "4")
+IMAGE_CARD_WIDTH = _env_int("IMAGE_CARD_WIDTH", "640")
+# Hosts das imagens que a API aceita descarregar a pedido dos clientes (CDN do Unsplash)
+IMAGE_ALLOWED_HOSTS = os.environ.get("IMAGE_ALLOWED_HOSTS", "images.unsplash.com").split(",")
+BACKGROUND_IMAGE_URL = os.environ.get("BACKGROUND_IMAGE_URL", "https://i.imgur.com/B1m7gaE.jpeg")
+BACKGROUND_IMAGE_WIDTH = _env_int("BACKGROUND_IMAGE_WIDTH", "1920")
+# Pasta servida pelo Streamlit em /app/static (enableStaticServing em .streamlit/config.toml)
+STATIC_DIR = os.environ.get("STATIC_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static"))
+
+# --- Pipeline e admissão ---
+GENERATION_TIMEOUT = _env_float("GENERATION_TIMEOUT", "60")
+IMAGE_TIMEOUT = _env_float("IMAGE_TIMEOUT", "10")
+SESSION_RATE_PER_SECOND = _env_float("SESSION_RATE_PER_SECOND", "0.2")
+SESSION_BURST = _env_int("SESSION_BURST", "3")
+MAX_CONCURRENT_GENERATIONS = _env_int("MAX_CONCURRENT_GENERATIONS", "8")
+MAX_QUEUED_GENERATIONS = _env_int("MAX_QUEUED_GENERATIONS", "32")
+
+# --- API HTTP (python -m coachai.api) ---
+# Com COACHAI_API_URL definido, a interface deixa de ter motor próprio e usa a API
+API_URL = os.environ.get("COACHAI_API_URL")
+API_TOKEN = os.environ.get("COACHAI_API_TOKEN")
+API_HOST = os.environ.get("API_HOST", "0.0.0.0")
+API_PORT = _env_int("API_PORT", "8000")
+API_WORKERS = _env_int("API_WORKERS", "1")
+
+# --- Geração em lote (python -m coachai.batch) ---
+BATCH_CONCURRENCY = _env_int("BATCH_CONCURRENCY", "4")
+BATCH_RATE_PER_SECOND = _env_float("BATCH_RATE_PER_SECOND", "1")
+BATCH_IMAGE_CONCURRENCY = _env_int("BATCH_IMAGE_CONCURRENCY", "4")
+
+# --- Versículos (índice local) ---
+VERSE_INDEX_ENABLED = _env_flag("VERSE_INDEX_ENABLED")
+VERSE_INDEX_PATH = os.environ.get("VERSE_INDEX_PATH", os.path.join(tempfile.gettempdir(), "coachai-versiculos.idx"))
+VERSE_CORPUS_PATH = os.environ.get("VERSE_CORPUS_PATH")
+VERSE_VECTOR_DIM = _env_int("VERSE_VECTOR_DIM", "0")
+
+# --- Caches e pool ---
+RESPONSE_CACHE_PATH = os.environ.get("RESPONSE_CACHE_PATH")
+# Limiar (0-1) para reaproveitar respostas de textos parecidos; desligado por omissão,
+# porque a semelhança é por caracteres e não pelo sentido do texto
+RESPONSE_CACHE_SIMILARITY = float(os.environ["RESPONSE_CACHE_SIMILARITY"]) \
+    if os.environ.get("RESPONSE_CACHE_SIMILARITY") else None
+WARM_POOL_ENABLED = _env_flag("WARM_POOL_ENABLED")
+WARM_POOL_LOW = _env_int("WARM_POOL_LOW", "1")
+WARM_POOL_HIGH = _env_int("WARM_POOL_HIGH", "3")
+WARM_POOL_PATH = os.environ.get("WARM_POOL_PATH")
+
+# --- Firebase ---
+COUNTER_FLUSH_INTERVAL = _env_float("COUNTER_FLUSH_INTERVAL", "5")
+COUNTER_FLUSH_MAX_PENDING = _env_int("COUNTER_FLUSH_MAX_PENDING", "50")
+STATS_REFRESH_INTERVAL = _env_float("STATS_REFRESH_INTERVAL", "30")
+STATS_MAX_STALENESS = _env_float("STATS_MAX_STALENESS", "120")
+# Espera máxima pela primeira leitura das estatísticas, antes de servir a primeira página
+STATS_INITIAL_TIMEOUT = _env_float("STATS_INITIAL_TIMEOUT", "2")
+# Cópia local do feedback (.jsonl ou SQLite), ex.: feedback_log.jsonl na raiz (ignorado pelo git)
+FEEDBACK_LOG_PATH = os.environ.get("FEEDBACK_LOG_PATH")
+
+# --- Observabilidade ---
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+METRICS_PORT = _env_int("METRICS_PORT", "0")
+SLOW_RERUN_SECONDS = _env_float("SLOW_RERUN_SECONDS", "2")
+PROFILE_SLOW_RERUNS = _env_flag("PROFILE_SLOW_RERUNS", "0")
+
+
+def load_api_keys():
+    """Lê as chaves dos secrets do Streamlit; devolve None se não estiverem configurados.
+
+    Fora do Streamlit (ou sem secrets), usa as variáveis de ambiente equivalentes.
+    """
+    try:
+        import streamlit as st
+        return {
+            'google': st.secrets["GOOGLE_API_KEY"],
+            'unsplash': st.secrets["UNSPLASH_API_KEY"],
+            'formspree': st.secrets["FORMSPREE_ENDPOINT"],
+            'firebase_credentials': st.secrets["firebase"]["credentials"],
+            'firebase_database_url': st.secrets["firebase"]["databaseURL"],
+        }
+    except (ImportError, FileNotFoundError, KeyError):
+        pass
+    if os.environ.get("GOOGLE_API_KEY"):
+        keys = {
+            'google': os.environ.get("GOOGLE_API_KEY"),
+            'unsplash': os.environ.get("UNSPLASH_API_KEY"),
+            'formspree': os.environ.get("FORMSPREE_ENDPOINT"),
+        }
+        # Credenciais da conta de serviço em JSON, para os workers da API fora do Streamlit
+        if os.environ.get("FIREBASE_CREDENTIALS"):
+            keys['firebase_credentials'] = json.loads(os.environ["FIREBASE_CREDENTIALS"])
+            keys['firebase_database_url'] = os.environ.get("FIREBASE_DATABASE_URL")
+        return keys
+    return None
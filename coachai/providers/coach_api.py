@@ -0,0 +1,186 @@
+# Cliente da API HTTP do CoachAI Espiritual (`coachai.api`)
+#
+# Implementa as operações do CoachService sobre HTTP, para que a interface
+# Streamlit seja só um cliente da API: sem motor, sem Firebase e sem as chaves
+# dos fornecedores no processo da interface. Usa um ProviderClient como os
+# restantes fornecedores (ligações reaproveitadas, circuit breaker e métricas).
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from coachai import config, telemetry
+from coachai.providers.http_client import get_client
+from coachai.services.admission import Overloaded
+from coachai.services.pipeline import PipelineResult
+from coachai.services.service import resultado_de_json
+
+# Leituras repetidas em cada rerun (estado, estatísticas, métricas) ficam em cache este tempo
+CACHE_LEITURAS_SEGUNDOS = 5.0
+CACHE_ESTADO_SEGUNDOS = 30.0
+
+
+class RemoteCoachService:
+    """As operações do CoachService, feitas pela API em `base_url`."""
+
+    remoto = True
+    # As chaves dos fornecedores estão nos workers da API
+    pronto = True
+
+    def __init__(self, base_url, token=None, max_imagens=64):
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.client = get_client(
+            "coachai_api", read_timeout=config.GENERATION_TIMEOUT + 10, max_retries=1,
+        )
+        self.max_imagens = max_imagens
+        self._imagens = OrderedDict()
+        self._leituras = {}
+        self._lock = threading.Lock()
+
+    # --- HTTP ---
+    def _pedido(self, metodo, caminho, retries=None, **kwargs):
+        """Pedido à API; só os 5xx contam como falha (e são repetidos); 429 vira Overloaded."""
+        def fazer():
+            response = self.client.session.request(
+                metodo, self.base_url + caminho, headers=self.headers, timeout=self.client.timeout, **kwargs
+            )
+            if response.status_code >= 500 and response.status_code != 503:
+                response.raise_for_status()
+            return response
+
+        response = self.client.call(fazer, retries=retries)
+        if response.status_code == 429:
+            raise Overloaded(response.json().get("error", "Muitos pedidos neste momento."))
+        return response
+
+    def _em_cache(self, chave, ttl, fn):
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._leituras.get(chave)
+            if entrada is not None and entrada[0] > agora:
+                return entrada[1]
+        valor = fn()
+        with self._lock:
+            self._leituras[chave] = (agora + ttl, valor)
+        return valor
+
+    @staticmethod
+    def _sem_falhar(fn, padrao=None, mensagem="Falha no pedido à API"):
+        """Executa `fn`; se a API falhar, regista o erro e devolve `padrao` (a página continua)."""
+        try:
+            return fn()
+        except Overloaded:
+            raise
+        except Exception as e:
+            telemetry.record_error("coachai_api", e, mensagem)
+            return padrao
+
+    # --- Operações ---
+    def estado_base_de_dados(self):
+        def ler():
+            response = self._pedido("GET", "/healthz")
+            response.raise_for_status()
+            return response.json()["firebase"]
+
+        return self._em_cache("estado", CACHE_ESTADO_SEGUNDOS, lambda: self._sem_falhar(
+            ler, "Falha: API indisponível", "Falha ao ler o estado da API"
+        ))
+
+    def aquecer(self):
+        """O pool do "Me Surpreenda" vive nos workers da API."""
+
+    def gerar(self, sentimento, tom, surpresa=False, session_id=None, on_partial=None):
+        """Gera pela API; com `on_partial`, lê o stream NDJSON e entrega os campos parciais.
+
+        Lança Overloaded se a API recusar o pedido (limite da sessão ou excesso de carga).
+        """
+        payload = {"sentimento": sentimento, "tom": tom, "surpresa": surpresa, "session_id": session_id,
+                   "stream": on_partial is not None}
+        try:
+            # A geração não é idempotente (conta mensagens): sem novas tentativas
+            response = self._pedido("POST", "/v1/generate", retries=0, json=payload, stream=on_partial is not None)
+            response.raise_for_status()
+            if on_partial is None:
+                return resultado_de_json(response.json())
+            with response:
+                for linha in response.iter_lines(decode_unicode=True):
+                    if not linha:
+                        continue
+                    mensagem = json.loads(linha)
+                    if "partial" in mensagem:
+                        on_partial(mensagem["partial"])
+                    elif "result" in mensagem:
+                        return resultado_de_json(mensagem["result"])
+            raise ConnectionError("o stream da API terminou sem resultado")
+        except Overloaded:
+            raise
+        except Exception as e:
+            telemetry.record_error("coachai_api", e, "Falha na geração pela API")
+            result = PipelineResult()
+            result.errors["generation"] = str(e)
+            result.exception = e
+            return result
+
+    def buscar_imagem(self, keywords):
+        def buscar():
+            response = self._pedido("GET", "/v1/image-url", params={"keywords": keywords})
+            response.raise_for_status()
+            return response.json()["image_url"]
+
+        return self._sem_falhar(buscar, mensagem="Falha ao buscar a imagem pela API")
+
+    def imagem(self, image_url, keywords):
+        """Bytes da imagem do card; as últimas ficam em memória, porque cada rerun as volta a pedir."""
+        chave = (image_url, keywords)
+        with self._lock:
+            if chave in self._imagens:
+                self._imagens.move_to_end(chave)
+                return self._imagens[chave]
+
+        def descarregar():
+            response = self._pedido("GET", "/v1/image", params={"url": image_url or "", "keywords": keywords})
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return response.content
+
+        dados = self._sem_falhar(descarregar, mensagem="Falha ao descarregar a imagem pela API")
+        if dados:
+            with self._lock:
+                self._imagens[chave] = dados
+                while len(self._imagens) > self.max_imagens:
+                    self._imagens.popitem(last=False)
+        return dados
+
+    # Visitas e avaliações incrementam contadores: como na geração, sem novas tentativas
+    def registrar_visita(self):
+        self._sem_falhar(lambda: self._pedido("POST", "/v1/visit", retries=0).raise_for_status(),
+                         mensagem="Falha ao contar a visita pela API")
+
+    def avaliar(self, tipo, sentimento=None, resposta=None, tom=None):
+        payload = {"tipo": tipo, "sentimento": sentimento, "resposta": resposta, "tom": tom}
+        self._sem_falhar(lambda: self._pedido("POST", "/v1/rate", retries=0, json=payload).raise_for_status(),
+                         mensagem="Falha ao registar a avaliação pela API")
+
+    def estatisticas(self):
+        def ler():
+            response = self._pedido("GET", "/v1/stats")
+            if response.status_code == 503:
+                return None
+            response.raise_for_status()
+            return response.json()
+
+        return self._em_cache("estatisticas", CACHE_LEITURAS_SEGUNDOS, lambda: self._sem_falhar(
+            ler, mensagem="Falha ao ler as estatísticas pela API"
+        ))
+
+    def metricas(self):
+        def ler():
+            response = self._pedido("GET", "/v1/metrics")
+            response.raise_for_status()
+            return response.json()
+
+        return self._em_cache("metricas", CACHE_LEITURAS_SEGUNDOS, lambda: self._sem_falhar(
+            ler, {}, "Falha ao ler as métricas pela API"
+        ))
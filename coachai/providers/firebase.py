@@ -0,0 +1,65 @@
+# Acesso ao Firebase Realtime Database
+#
+# O `firebase_admin` só é importado quando a aplicação é inicializada, para
+# não pesar no arranque de quem não tem o Firebase configurado.
+import threading
+
+from coachai import telemetry
+
+# Caminho de cada contador na base de dados
+COUNTER_PATHS = {
+    "visits": "stats/visits",
+    "messages": "stats/message_count",
+    "likes": "ratings/like_count",
+    "dislikes": "ratings/dislike_count",
+}
+
+_status = None
+_lock = threading.Lock()
+
+
+def init_firebase_app(credentials_info, database_url):
+    """Inicializa a aplicação Firebase se ainda não foi inicializada."""
+    global _status
+    with _lock:
+        if _status == "Conectado":
+            return _status
+        try:
+            import firebase_admin
+            from firebase_admin import credentials
+
+            if not firebase_admin._apps:
+                creds_dict = dict(credentials_info)
+                creds_dict["private_key"] = creds_dict["private_key"].replace('\\n', '\n')
+                cred = credentials.Certificate(creds_dict)
+                firebase_admin.initialize_app(cred, {'databaseURL': database_url})
+            _status = "Conectado"
+        except Exception as e:
+            _status = f"Falha: {e}"
+            telemetry.record_error("firebase", e, "Falha ao inicializar o Firebase")
+        return _status
+
+
+def is_connected():
+    return _status == "Conectado"
+
+
+def reference(path='/'):
+    """Referência da base de dados, ou None se o Firebase não estiver inicializado."""
+    if not is_connected():
+        return None
+    from firebase_admin import db
+    return db.reference(path)
+
+
+def ler_contadores():
+    """Lê só os quatro contadores, com leituras "shallow" que não descarregam subárvores."""
+    with telemetry.span("firebase.read_counters"):
+        stats = reference('stats').get(shallow=True) or {}
+        ratings = reference('ratings').get(shallow=True) or {}
+    return {
+        "visits": stats.get('visits', 0),
+        "messages": stats.get('message_count', 0),
+        "likes": ratings.get('like_count', 0),
+        "dislikes": ratings.get('dislike_count', 0)
+    }
@@ -0,0 +1,153 @@
+# Cliente do Gemini partilhado pelo CoachAI Espiritual
+#
+# Mantém um único GenerativeModel "quente" por API key e os prompts de cada tom
+# já montados no arranque, em vez de os reconstruir a cada pedido. O SDK só é
+# importado na primeira geração, para não pesar no arranque da aplicação.
+import threading
+from collections import OrderedDict
+
+from coachai import config, telemetry
+from coachai.providers.http_client import get_client
+from coachai.services.structured_output import CAMPOS_RESPOSTA, schema_para
+
+# --- Configurações do Modelo ---
+REQUEST_OPTIONS = {"timeout": config.GEMINI_REQUEST_TIMEOUT}
+# Com o índice local de versículos, o modelo já não gera o versículo
+CAMPOS_GERADOS = tuple(
+    campo for campo in CAMPOS_RESPOSTA if not (config.VERSE_INDEX_ENABLED and campo == "versiculo")
+)
+# Modo JSON com schema: o modelo devolve sempre um objeto com os campos gerados.
+# Os restantes parâmetros só são enviados se definidos; senão ficam com o padrão do modelo
+GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": schema_para(CAMPOS_GERADOS),
+}
+if config.GEMINI_TEMPERATURE:
+    GENERATION_CONFIG["temperature"] = float(config.GEMINI_TEMPERATURE)
+if config.GEMINI_MAX_OUTPUT_TOKENS:
+    GENERATION_CONFIG["max_output_tokens"] = int(config.GEMINI_MAX_OUTPUT_TOKENS)
+
+# --- Prompts por Tom ---
+MAPA_TONS = {
+    "amigo": "amigo(a) e acolhedor(a)",
+    "sábio": "sábio(a) e reflexivo(a)",
+    "direto": "direto(a) e conciso(a)",
+    "encorajador": "encorajador(a) e motivacional, como um treinador",
+    "calmo": "calmo(a) e sereno(a), com foco em paz interior e tranquilidade",
+    "poético": "poético(a) e contemplativo(a), usando metáforas e linguagem figurativa",
+    "descontraído": "descontraído(a) e bem-humorado(a), como uma conversa leve e otimista"
+}
+TOM_PADRAO = "acolhedor(a)"
+
+_INSTRUCOES = {
+    "keywords": "Forneça uma string com 3 a 4 palavras-chave em INGLÊS, separadas por vírgula, para a imagem.",
+    "mensagem": "Crie uma mensagem de conforto/inspiração com um tom {tom_formatado}.",
+    "versiculo": "Forneça o texto completo de um versículo bíblico de apoio, seguido pela referência entre parênteses.",
+    "oracao": "Escreva uma oração guiada em primeira pessoa.",
+}
+
+
+def _montar_template(campos):
+    """Template do prompt para os campos pedidos (as chaves literais vão duplamente escapadas)."""
+    chaves = ", ".join(f'"{campo}"' for campo in campos)
+    instrucoes = "".join(
+        f"    {i}.  **{campo}**: {_INSTRUCOES[campo]}\n" for i, campo in enumerate(campos, start=1)
+    )
+    formato = ", ".join(f'"{campo}": "..."' for campo in campos)
+    return (
+        'Você é um Coach Espiritual. Analise o sentimento do usuário: "{{sentimento}}".\n'
+        f"    Sua tarefa é retornar um objeto JSON com {len(campos)} chaves: {chaves}.\n"
+        + instrucoes
+        + "    O JSON deve ter exatamente este formato: {{{{" + formato + "}}}}"
+    )
+
+
+_PROMPT_TEMPLATE = _montar_template(CAMPOS_GERADOS)
+
+# Cada tom fica com o seu template pronto; só falta preencher o sentimento
+PROMPTS_POR_TOM = {
+    tom: _PROMPT_TEMPLATE.format(tom_formatado=descricao) for tom, descricao in MAPA_TONS.items()
+}
+_PROMPT_PADRAO = _PROMPT_TEMPLATE.format(tom_formatado=TOM_PADRAO)
+
+
+def montar_prompt(sentimento_usuario, tom_escolhido):
+    """Preenche o template pré-compilado do tom com o sentimento do usuário."""
+    template = PROMPTS_POR_TOM.get(tom_escolhido, _PROMPT_PADRAO)
+    return template.format(sentimento=sentimento_usuario)
+
+
+def generation_config_para(campos):
+    """Configuração de geração que pede só os campos indicados (usada no reparo)."""
+    return {**GENERATION_CONFIG, "response_schema": schema_para(campos)}
+
+
+# --- Registo de Modelos ---
+# LRU: cada key que um visitante escreve cria um cliente gRPC, que tem de ser fechado ao sair
+_models = OrderedDict()
+_lock = threading.Lock()
+
+
+def _fechar_cliente(client):
+    """Fecha o canal gRPC do cliente (a geração mais longa já terminou quando isto corre)."""
+    close = getattr(getattr(client, "transport", None), "close", None)
+    if close is None:
+        return
+    try:
+        close()
+    except Exception as e:
+        telemetry.record_error("gemini", e, "Erro ao fechar o cliente do Gemini")
+
+
+def get_model(api_key):
+    """Devolve o GenerativeModel associado à API key, criando-o só na primeira vez.
+
+    Cada modelo tem o seu próprio cliente, criado com a key: não se usa o
+    `genai.configure`, que é global ao processo e faria um modelo criado com
+    uma key (ex.: a de outro visitante) usar a key configurada por último.
+    Ficam em memória os `MAX_CACHED_API_KEYS` modelos usados mais recentemente.
+    """
+    import google.generativeai as genai
+    from google.ai import generativelanguage as glm
+
+    with _lock:
+        model = _models.get(api_key)
+        if model is not None:
+            _models.move_to_end(api_key)
+            return model
+        model = genai.GenerativeModel(
+            model_name=config.GEMINI_MODEL_NAME,
+            generation_config=GENERATION_CONFIG,
+        )
+        # Depende de detalhes internos do google-generativeai 0.8.x: o GenerativeModel guarda o
+        # cliente em `_client` e só cria um (com a configuração global) se ainda não houver.
+        # Rever ao atualizar o SDK.
+        model._client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+        _models[api_key] = model
+        while len(_models) > config.MAX_CACHED_API_KEYS:
+            _, antigo = _models.popitem(last=False)
+            # Uma geração com o modelo despejado pode estar em curso: fecha depois do timeout do pedido
+            timer = threading.Timer(config.GEMINI_REQUEST_TIMEOUT, _fechar_cliente, args=(antigo._client,))
+            timer.daemon = True
+            timer.start()
+        return model
+
+
+def get_gemini_client():
+    """Cliente resiliente (novas tentativas e circuit breaker) para as chamadas ao Gemini."""
+    return get_client("gemini", max_retries=config.GEMINI_MAX_RETRIES)
+
+
+def registrar_uso(prompt, texto, usage=None, operacao="generate"):
+    """Regista os tamanhos do pedido/resposta e, se o SDK os devolver, os tokens gastos."""
+    telemetry.observe("coachai_payload_bytes", len(prompt.encode("utf-8")), buckets=telemetry.SIZE_BUCKETS,
+                      provider="gemini", direction="request")
+    telemetry.observe("coachai_payload_bytes", len((texto or "").encode("utf-8")), buckets=telemetry.SIZE_BUCKETS,
+                      provider="gemini", direction="response")
+    if usage is None:
+        return
+    for kind, campo in (("prompt", "prompt_token_count"), ("output", "candidates_token_count")):
+        tokens = getattr(usage, campo, None)
+        if tokens:
+            telemetry.observe("coachai_gemini_tokens", tokens, buckets=telemetry.TOKEN_BUCKETS,
+                              kind=kind, operation=operacao)
@@ -0,0 +1,270 @@
+# Camada de chamadas externas do CoachAI Espiritual
+#
+# Um cliente por fornecedor (Unsplash, Gemini, ...) com sessão HTTP partilhada
+# (keep-alive), timeouts, novas tentativas com backoff exponencial e jitter,
+# circuit breaker e contadores de latência e erros.
+import random
+import sys
+import threading
+import time
+
+from coachai import telemetry
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class ProviderUnavailable(Exception):
+    """O circuit breaker do fornecedor está aberto; a chamada nem foi feita."""
+
+
+class CircuitBreaker:
+    """Abre após `failure_threshold` falhas seguidas e volta a testar após `reset_timeout`.
+
+    No estado meio-aberto só passa uma chamada de teste de cada vez; as
+    restantes são recusadas até essa terminar.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_until = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_until == 0.0:
+                return "closed"
+            return "open" if time.monotonic() < self._opened_until else "half-open"
+
+    @property
+    def available(self):
+        """Indica se uma chamada seria aceite agora (sem ocupar a chamada de teste)."""
+        with self._lock:
+            return self._opened_until == 0.0 or (time.monotonic() >= self._opened_until and not self._probing)
+
+    def allow(self):
+        """Indica se uma chamada pode ser feita (fechado, ou a chamada de teste no meio-aberto)."""
+        with self._lock:
+            if self._opened_until == 0.0:
+                return True
+            if time.monotonic() < self._opened_until or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_until = 0.0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold or self._opened_until:
+                self._opened_until = time.monotonic() + self.reset_timeout
+            self._probing = False
+
+    def release(self):
+        """Termina a chamada de teste sem veredicto (ex.: erro 4xx, que não diz nada sobre o fornecedor)."""
+        with self._lock:
+            self._probing = False
+
+    def trip(self, seconds=None):
+        """Abre o circuito de imediato (ex.: limite de pedidos esgotado)."""
+        with self._lock:
+            self._opened_until = time.monotonic() + (seconds or self.reset_timeout)
+            self._probing = False
+
+
+def _status_of(error):
+    """Código HTTP de um erro de `requests` ou do SDK do Google (google.api_core), se houver."""
+    response = getattr(error, "response", None)
+    if response is not None and getattr(response, "status_code", None):
+        return response.status_code
+    code = getattr(error, "code", None)
+    return code if isinstance(code, int) else None
+
+
+def _network_errors():
+    """Exceções de rede que justificam nova tentativa (inclui as do `requests`, se carregado)."""
+    errors = (ConnectionError, TimeoutError)
+    requests = sys.modules.get("requests")
+    if requests is not None:
+        errors += (requests.ConnectionError, requests.Timeout)
+    return errors
+
+
+class ProviderClient:
+    """Cliente resiliente para um fornecedor externo."""
+
+    def __init__(self, name, connect_timeout=3.05, read_timeout=10.0, max_retries=2,
+                 backoff_base=0.5, backoff_max=8.0, breaker=None, pool_size=10):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.pool_size = pool_size
+        self._session = None
+        self._lock = threading.Lock()
+        self.metrics = {
+            "requests": 0,
+            "errors": 0,
+            "retries": 0,
+            "short_circuited": 0,
+            "latency_total": 0.0,
+            "latency_max": 0.0,
+        }
+
+    @property
+    def session(self):
+        """Sessão HTTP com pool de ligações, criada (e `requests` importado) só no primeiro uso."""
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    # --- Métricas ---
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.metrics[key] += amount
+        telemetry.inc(f"coachai_provider_{key}_total", amount, provider=self.name)
+
+    def _observe(self, seconds, ok, status=None):
+        telemetry.observe("coachai_provider_request_seconds", seconds, provider=self.name,
+                          outcome="ok" if ok else "error")
+        if not ok:
+            telemetry.inc("coachai_provider_request_errors_total", provider=self.name, status=status or "none")
+        with self._lock:
+            self.metrics["requests"] += 1
+            self.metrics["latency_total"] += seconds
+            self.metrics["latency_max"] = max(self.metrics["latency_max"], seconds)
+            if not ok:
+                self.metrics["errors"] += 1
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self.metrics)
+        metrics["latency_avg"] = metrics["latency_total"] / metrics["requests"] if metrics["requests"] else 0.0
+        metrics["breaker"] = self.breaker.state
+        return metrics
+
+    # --- Backoff ---
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        # "Full jitter": espera aleatória até ao teto exponencial
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _retry_after(response):
+        if response is None:
+            return None
+        value = response.headers.get("Retry-After")
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+    # --- Chamadas ---
+    def call(self, fn, retries=None):
+        """Executa `fn()` com circuit breaker, novas tentativas e métricas.
+
+        Serve para SDKs que não usam a sessão HTTP (ex.: Gemini); erros com
+        código 429/5xx, de ligação ou de timeout dão origem a nova tentativa.
+        """
+        retries = self.max_retries if retries is None else retries
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise ProviderUnavailable(f"{self.name} indisponível (circuit breaker aberto)")
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                result = fn()
+            except Exception as e:
+                status = _status_of(e)
+                self._observe(time.perf_counter() - start, ok=False, status=status)
+                retryable = status in RETRYABLE_STATUS or isinstance(e, _network_errors())
+                if not retryable:
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= retries or not self.breaker.allow():
+                    raise
+                attempt += 1
+                self._count("retries")
+                time.sleep(self._backoff(attempt, self._retry_after(getattr(e, "response", None))))
+                continue
+            self._observe(time.perf_counter() - start, ok=True)
+            self.breaker.record_success()
+            return result
+
+    def get(self, url, **kwargs):
+        """GET com a sessão partilhada, timeouts e as mesmas regras de `call`."""
+        kwargs.setdefault("timeout", self.timeout)
+
+        def do_get():
+            response = self.session.get(url, **kwargs)
+            if response.status_code >= 400 and self._limite_esgotado(response):
+                self.breaker.trip()
+            response.raise_for_status()
+            return response
+
+        response = self.call(do_get)
+        # Depois de `call`, que fecha o circuito nas respostas bem-sucedidas
+        if self._limite_esgotado(response):
+            self.breaker.trip()
+        return response
+
+    def _limite_esgotado(self, response):
+        """Limite (por hora) esgotado: não adianta insistir, o circuito fica aberto até ao reset.
+
+        O Unsplash responde 403 (não 429) quando o limite acaba, por isso vale
+        qualquer código; com Retry-After, as novas tentativas já esperam o tempo certo.
+        """
+        return response.headers.get("X-Ratelimit-Remaining") == "0" and self._retry_after(response) is None
+
+
+# --- Registo de Clientes ---
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name, **options):
+    """Devolve o cliente partilhado do fornecedor, criando-o na primeira chamada."""
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            client = ProviderClient(name, **options)
+            _clients[name] = client
+        return client
+
+
+def all_stats():
+    """Métricas de todos os fornecedores registados."""
+    with _clients_lock:
+        clients = list(_clients.values())
+    return {client.name: client.stats() for client in clients}
+
+
+def _gauges():
+    estados = {"closed": 0, "half-open": 1, "open": 2}
+    return {"coachai_provider_breaker_state": [
+        ({"provider": name}, estados[stats["breaker"]]) for name, stats in all_stats().items()
+    ]}
+
+
+telemetry.register_gauges("providers", _gauges)
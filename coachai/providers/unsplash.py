@@ -0,0 +1,51 @@
+# Busca de imagens no Unsplash
+from coachai import config, telemetry
+from coachai.providers.http_client import ProviderUnavailable, get_client
+
+UNSPLASH_SEARCH_URL = "https://api.unsplash.com/search/photos"
+
+
+def get_unsplash_client():
+    """Cliente resiliente (timeouts, novas tentativas e circuit breaker) para o Unsplash."""
+    return get_client(
+        "unsplash",
+        connect_timeout=config.UNSPLASH_CONNECT_TIMEOUT,
+        read_timeout=config.UNSPLASH_READ_TIMEOUT,
+        max_retries=config.UNSPLASH_MAX_RETRIES,
+    )
+
+
+def get_image_client():
+    """Cliente para descarregar as imagens (CDN do Unsplash e fundo da página), separado do da API.
+
+    O timeout é curto e há só uma nova tentativa: se a CDN estiver lenta, a
+    aplicação mostra logo uma imagem local em vez de esperar.
+    """
+    return get_client(
+        "images",
+        connect_timeout=config.UNSPLASH_CONNECT_TIMEOUT,
+        read_timeout=config.IMAGE_FETCH_TIMEOUT,
+        max_retries=1,
+    )
+
+
+def buscar_imagens_no_unsplash(api_key, keywords, per_page=10):
+    """Busca várias imagens de uma vez; devolve a lista de URLs ou None em caso de erro."""
+    try:
+        with telemetry.span("unsplash.search", per_page=per_page) as span:
+            params = {"query": keywords, "page": 1, "per_page": per_page, "orientation": "landscape", "client_id": api_key}
+            response = get_unsplash_client().get(UNSPLASH_SEARCH_URL, params=params)
+            data = response.json()
+            urls = [result["urls"]["regular"] for result in data["results"]]
+            span["results"] = len(urls)
+            conteudo = getattr(response, "content", None)
+            if conteudo is not None:
+                telemetry.observe("coachai_payload_bytes", len(conteudo), buckets=telemetry.SIZE_BUCKETS,
+                                  provider="unsplash", direction="response")
+            return urls
+    except ProviderUnavailable:
+        # Unsplash instável: segue sem imagem em vez de esperar
+        return None
+    except Exception as e:
+        telemetry.record_error("unsplash", e, "Ocorreu um erro na busca do Unsplash")
+        return None
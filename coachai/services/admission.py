@@ -0,0 +1,211 @@
+# Controlo de admissão das gerações do CoachAI Espiritual
+#
+# - pedidos idênticos (texto, tom) em simultâneo partilham uma única geração;
+# - cada sessão tem um limite de pedidos (token bucket);
+# - as gerações correm num pool próprio, com o número de threads do limite de
+#   gerações em curso; a fila de espera é limitada e verificada na submissão.
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class Overloaded(Exception):
+    """Pedido recusado por limite de sessão ou por excesso de carga."""
+
+
+class SingleFlight:
+    """Junta chamadas concorrentes com a mesma chave numa só execução."""
+
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.coalesced_hits = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced_hits += 1
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def submit(self, key, iniciar):
+        """Versão assíncrona de `do`: `iniciar()` agenda a execução e devolve o seu Future.
+
+        Enquanto esse Future não terminar, pedidos com a mesma chave recebem-no
+        em vez de agendarem outra execução.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced_hits += 1
+                return future
+            future = iniciar()
+            self._inflight[key] = future
+
+        def remover(_):
+            with self._lock:
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+
+        future.add_done_callback(remover)
+        return future
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+
+    def take(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class SessionRateLimiter:
+    """Um token bucket por sessão (`rate` pedidos/segundo, rajada até `burst`)."""
+
+    def __init__(self, rate=0.2, burst=3, max_sessions=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_sessions = max_sessions
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def allow(self, session_id):
+        with self._lock:
+            bucket = self._buckets.get(session_id)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[session_id] = bucket
+                while len(self._buckets) > self.max_sessions:
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(session_id)
+            allowed = bucket.take()
+            if not allowed:
+                self.rejected += 1
+            return allowed
+
+
+class ConcurrencyLimiter:
+    """Executa as gerações num pool com `max_concurrent` threads e uma fila de espera limitada.
+
+    A admissão é decidida em `submit`, na thread de quem pede: com a fila cheia
+    o pedido é recusado logo, sem ocupar nenhuma thread. Pedidos que esperaram
+    mais do que `queue_timeout` na fila também são recusados, sem executar.
+    """
+
+    def __init__(self, max_concurrent=8, max_queue=32, queue_timeout=30.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="coachai-geracao")
+        self._lock = threading.Lock()
+        # Pedidos aceites e ainda não terminados (em execução ou à espera de uma thread)
+        self.admitted = 0
+        self.max_queue_depth = 0
+        self.active = 0
+        self.rejected = 0
+
+    @property
+    def queue_depth(self):
+        return max(self.admitted - self.max_concurrent, 0)
+
+    def submit(self, fn, *args):
+        """Agenda `fn(*args)` e devolve o Future; lança Overloaded se a fila estiver cheia."""
+        with self._lock:
+            if self.admitted >= self.max_concurrent + self.max_queue:
+                self.rejected += 1
+                raise Overloaded("Muitos pedidos neste momento. Por favor, tente novamente daqui a pouco.")
+            self.admitted += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            return self._executor.submit(self._executar, time.monotonic(), fn, args)
+        except RuntimeError:
+            # Pool já encerrado (fim do processo)
+            with self._lock:
+                self.admitted -= 1
+            raise
+
+    def _executar(self, submetido_em, fn, args):
+        with self._lock:
+            expirado = time.monotonic() - submetido_em > self.queue_timeout
+            if expirado:
+                self.rejected += 1
+                self.admitted -= 1
+            else:
+                self.active += 1
+        if expirado:
+            raise Overloaded("O serviço está muito ocupado. Por favor, tente novamente daqui a pouco.")
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.admitted -= 1
+
+    def run(self, fn):
+        """Executa `fn` no pool e espera pelo resultado (para quem não usa o pipeline)."""
+        return self.submit(fn).result()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+class AdmissionControl:
+    """Combina coalescência, limite por sessão e limite global de gerações."""
+
+    def __init__(self, rate_limiter=None, concurrency=None):
+        self.single_flight = SingleFlight()
+        self.rate_limiter = rate_limiter or SessionRateLimiter()
+        self.concurrency = concurrency or ConcurrencyLimiter()
+
+    def check_session(self, session_id):
+        """Recusa o pedido se a sessão excedeu o seu limite."""
+        if not self.rate_limiter.allow(session_id):
+            raise Overloaded("Você está pedindo mensagens muito rápido. Aguarde alguns segundos.")
+
+    def submit(self, key, fn):
+        """Agenda `fn` sob o limite global; pedidos com a mesma chave em curso partilham o seu Future.
+
+        Lança Overloaded (na thread de quem pede) se a fila de gerações estiver cheia.
+        """
+        return self.single_flight.submit(key, lambda: self.concurrency.submit(fn))
+
+    def run(self, key, fn):
+        """Como `submit`, mas espera pelo resultado."""
+        return self.submit(key, fn).result()
+
+    def stats(self):
+        return {
+            "coalesced_hits": self.single_flight.coalesced_hits,
+            "in_flight": len(self.single_flight._inflight),
+            "active": self.concurrency.active,
+            "queue_depth": self.concurrency.queue_depth,
+            "max_queue_depth": self.concurrency.max_queue_depth,
+            "rejected_overload": self.concurrency.rejected,
+            "rejected_rate_limit": self.rate_limiter.rejected,
+        }
@@ -0,0 +1,156 @@
+# Agregação de contadores do CoachAI Espiritual
+#
+# Em vez de uma transação no Firebase por evento, os incrementos ficam num
+# buffer em memória e são enviados de uma só vez num update multi-caminho,
+# usando o valor de servidor "increment" (sem contenção entre instâncias).
+import atexit
+import threading
+import time
+
+from coachai import telemetry
+
+
+def server_increment(delta):
+    """Valor de servidor do Realtime Database que soma `delta` ao valor atual."""
+    return {".sv": {"increment": delta}}
+
+
+class CounterBuffer:
+    """Buffer de incrementos com flush periódico, por tamanho e no encerramento.
+
+    `get_root` devolve a referência raiz da base de dados (ex.: `lambda: db.reference('/')`)
+    ou None se a base de dados não estiver disponível; qualquer objeto com um
+    método `update(dict)` serve, o que permite testar com uma referência falsa.
+    """
+
+    def __init__(self, get_root, flush_interval=5.0, max_pending=50, max_attempts=3):
+        self.get_root = get_root
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._pending = {}
+        self._pending_events = 0
+        self._failed_attempts = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        # Acorda a thread de flush antes do intervalo (limite de eventos atingido)
+        self._wake = threading.Event()
+        self._thread = None
+        self._listeners = []
+        self._before_flush = []
+        self.metrics = {
+            "flushes": 0,
+            "flush_errors": 0,
+            "events_written": 0,
+            "lost_writes": 0,
+            "last_flush_seconds": 0.0,
+            "max_flush_seconds": 0.0,
+        }
+
+    def start(self):
+        """Inicia a thread de flush periódico e regista o flush no encerramento."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="counter-flush", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                # O último flush é feito pelo `close`
+                return
+            self.flush()
+
+    def add_flush_listener(self, listener, before=None):
+        """Regista uma função chamada com cada lote ({caminho: delta}) gravado com sucesso.
+
+        Com `before`, o valor que `before()` devolve logo antes do update é passado
+        ao listener como segundo argumento: `listener(batch, before())`.
+        """
+        self._listeners.append((listener, before))
+
+    def increment(self, path, delta=1):
+        """Regista um incremento no buffer; se o limite de eventos for atingido, pede um flush.
+
+        O flush é feito pela thread em segundo plano, nunca na thread de quem
+        incrementa (sem a thread iniciada, é feito aqui mesmo).
+        """
+        with self._lock:
+            self._pending[path] = self._pending.get(path, 0) + delta
+            self._pending_events += 1
+            should_flush = self._pending_events >= self.max_pending
+        if should_flush:
+            if self._thread is None:
+                self.flush()
+            else:
+                self._wake.set()
+
+    def pending(self):
+        """Incrementos ainda não enviados, por caminho."""
+        with self._lock:
+            return dict(self._pending)
+
+    def flush(self):
+        """Envia todos os incrementos pendentes num único update multi-caminho."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return True
+                batch, events = self._pending, self._pending_events
+                self._pending, self._pending_events = {}, 0
+
+            start = time.perf_counter()
+            antes = [before() if before is not None else None for _, before in self._listeners]
+            try:
+                with telemetry.span("firebase.flush_counters", events=events):
+                    root = self.get_root()
+                    if root is None:
+                        raise RuntimeError("base de dados indisponível")
+                    root.update({path: server_increment(delta) for path, delta in batch.items()})
+            except Exception as e:
+                self.metrics["flush_errors"] += 1
+                self._failed_attempts += 1
+                if self._failed_attempts >= self.max_attempts:
+                    # Desiste deste lote para não crescer sem limite
+                    self.metrics["lost_writes"] += events
+                    self._failed_attempts = 0
+                    telemetry.record_error("firebase", e, "Erro ao gravar contadores, eventos perdidos", lost=events)
+                else:
+                    self._requeue(batch, events)
+                    telemetry.record_error("firebase", e, "Erro ao gravar contadores, nova tentativa no próximo flush")
+                return False
+
+            elapsed = time.perf_counter() - start
+            self._failed_attempts = 0
+            self.metrics["flushes"] += 1
+            self.metrics["events_written"] += events
+            self.metrics["last_flush_seconds"] = elapsed
+            self.metrics["max_flush_seconds"] = max(self.metrics["max_flush_seconds"], elapsed)
+            telemetry.observe("coachai_counter_batch_events", events, buckets=(1, 2, 5, 10, 20, 50, 100, 200))
+            for (listener, before), valor in zip(self._listeners, antes):
+                if before is None:
+                    listener(batch)
+                else:
+                    listener(batch, valor)
+            return True
+
+    def _requeue(self, batch, events):
+        with self._lock:
+            for path, delta in batch.items():
+                self._pending[path] = self._pending.get(path, 0) + delta
+            self._pending_events += events
+
+    def close(self, timeout=5.0):
+        """Para a thread periódica e faz um último flush."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        if not self.flush():
+            with self._lock:
+                self.metrics["lost_writes"] += self._pending_events
+                self._pending, self._pending_events = {}, 0
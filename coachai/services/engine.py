@@ -0,0 +1,409 @@
+# Motor do CoachAI Espiritual
+#
+# Junta, num único objeto partilhado pelo processo, a geração com o Gemini, a
+# busca de imagens e os contadores/avaliações do Firebase, independentemente
+# da interface que o usa.
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from coachai import config, telemetry
+from coachai.providers import firebase, gemini, unsplash
+from coachai.services.admission import AdmissionControl, ConcurrencyLimiter, SessionRateLimiter
+from coachai.services.counters import CounterBuffer
+from coachai.services.feedback_log import FeedbackLog, FirebaseSink, local_sink
+from coachai.services.image_resolver import ImageResolver
+from coachai.services.image_store import get_image_store
+from coachai.services.pipeline import GenerationPipeline
+from coachai.services.response_cache import MemoryBackend, ResponseCache, SQLiteBackend, make_cache_key
+from coachai.services.stats_snapshot import StatsSnapshot
+from coachai.services.streaming_json import IncrementalJSONParser
+from coachai.services.structured_output import OutputValidator
+from coachai.services.verse_index import VerseIndex
+from coachai.services.warm_pool import WarmPool
+
+TONS = list(gemini.MAPA_TONS)
+
+
+class CoachEngine:
+    """Serviços partilhados por todas as sessões: caches, limites, pipeline e contadores."""
+
+    def __init__(self):
+        backend = SQLiteBackend(config.RESPONSE_CACHE_PATH) if config.RESPONSE_CACHE_PATH else MemoryBackend()
+        self.response_cache = ResponseCache(backend=backend, similarity_threshold=config.RESPONSE_CACHE_SIMILARITY)
+        self.validator = OutputValidator(campos=gemini.CAMPOS_GERADOS)
+        self.admission = AdmissionControl(
+            rate_limiter=SessionRateLimiter(rate=config.SESSION_RATE_PER_SECOND, burst=config.SESSION_BURST),
+            concurrency=ConcurrencyLimiter(
+                max_concurrent=config.MAX_CONCURRENT_GENERATIONS,
+                max_queue=config.MAX_QUEUED_GENERATIONS,
+            ),
+        )
+        # Imagens e tarefas em segundo plano; as gerações têm o seu pool no ConcurrencyLimiter
+        self.executor = ThreadPoolExecutor(max_workers=16)
+        self.pipeline = GenerationPipeline(
+            self.executor,
+            generation_timeout=config.GENERATION_TIMEOUT,
+            image_timeout=config.IMAGE_TIMEOUT,
+        )
+        # LRU por API key (ver config.MAX_CACHED_API_KEYS)
+        self._resolvers = OrderedDict()
+        self._warm_pools = {}
+        self._counter_buffer = None
+        self._stats_snapshot = None
+        self._feedback_log = None
+        self._verse_index = None
+        self._lock = threading.Lock()
+        telemetry.register_gauges("engine", self._gauges)
+
+    # --- Versículos (índice local) ---
+    @property
+    def verse_index(self):
+        """Índice de versículos (aberto com mmap no primeiro uso); None se estiver desativado."""
+        if not config.VERSE_INDEX_ENABLED:
+            return None
+        with self._lock:
+            if self._verse_index is None:
+                with telemetry.span("verses.open"):
+                    self._verse_index = VerseIndex.abrir(
+                        config.VERSE_INDEX_PATH, corpus_path=config.VERSE_CORPUS_PATH, dim=config.VERSE_VECTOR_DIM
+                    )
+            return self._verse_index
+
+    def escolher_versiculo(self, *textos, aleatorio_se_vazio=True):
+        """Versículo do índice local para o primeiro texto com resultados (ex.: sentimento, keywords)."""
+        index = self.verse_index
+        if index is None:
+            return None
+        with telemetry.span("verses.search", metodo=index.metodo):
+            return index.escolher(*textos, aleatorio_se_vazio=aleatorio_se_vazio)
+
+    def _anexar_versiculo(self, resposta, sentimento_usuario, versiculo=None):
+        """Completa a resposta gerada com o versículo do índice local, se o modelo não o gerou."""
+        if not resposta or "versiculo" in resposta:
+            return resposta
+        versiculo = versiculo or self.escolher_versiculo(sentimento_usuario, resposta.get("keywords", ""))
+        return {**resposta, "versiculo": versiculo or ""}
+
+    # --- Geração (Gemini) ---
+    def _reparar_campos(self, model, prompt_reparo, campos):
+        """Pede ao modelo apenas os campos em falta de uma resposta."""
+        with telemetry.span("gemini.repair", campos=len(campos)):
+            response = gemini.get_gemini_client().call(lambda: model.generate_content(
+                prompt_reparo, generation_config=gemini.generation_config_para(campos),
+                request_options=gemini.REQUEST_OPTIONS
+            ))
+            gemini.registrar_uso(prompt_reparo, response.text, getattr(response, "usage_metadata", None),
+                                 operacao="repair")
+            return response.text
+
+    def gerar_conteudo_espiritual(self, api_key, sentimento_usuario, tom_escolhido):
+        try:
+            with telemetry.span("gemini.generate", tom=tom_escolhido):
+                model = gemini.get_model(api_key)
+                prompt = gemini.montar_prompt(sentimento_usuario, tom_escolhido)
+                response = gemini.get_gemini_client().call(
+                    lambda: model.generate_content(prompt, request_options=gemini.REQUEST_OPTIONS)
+                )
+                gemini.registrar_uso(prompt, response.text, getattr(response, "usage_metadata", None))
+                resposta = self.validator.finalizar(
+                    response.text, prompt, lambda prompt_reparo, campos: self._reparar_campos(model, prompt_reparo, campos)
+                )
+                return self._anexar_versiculo(resposta, sentimento_usuario)
+        except Exception as e:
+            telemetry.record_error("gemini", e, "Ocorreu um erro no Gemini", tom=tom_escolhido)
+            return None
+
+    def gerar_conteudo_espiritual_stream(self, api_key, sentimento_usuario, tom_escolhido,
+                                         on_update=None, on_keywords=None):
+        """Gera o conteúdo em streaming, chamando `on_update` com os campos parciais.
+
+        `on_keywords` é chamado assim que as keywords ficam completas, antes do fim da geração.
+        """
+        try:
+            with telemetry.span("gemini.stream", tom=tom_escolhido) as span:
+                model = gemini.get_model(api_key)
+                prompt = gemini.montar_prompt(sentimento_usuario, tom_escolhido)
+                parser = IncrementalJSONParser()
+                keywords_enviadas = False
+                # O versículo do índice aparece logo no card parcial; se o sentimento não
+                # encontrar nada, tenta-se de novo com as keywords do modelo
+                versiculo = self.escolher_versiculo(sentimento_usuario, aleatorio_se_vazio=False)
+                inicio = time.perf_counter()
+                chunk = None
+                # Em streaming só a abertura do pedido é repetida; uma falha a meio não é refeita
+                stream = gemini.get_gemini_client().call(
+                    lambda: model.generate_content(prompt, stream=True, request_options=gemini.REQUEST_OPTIONS)
+                )
+                for chunk in stream:
+                    if "first_chunk" not in span:
+                        span["first_chunk"] = round(time.perf_counter() - inicio, 4)
+                        telemetry.observe("coachai_gemini_first_chunk_seconds", time.perf_counter() - inicio)
+                    if parser.feed(chunk.text) and on_update:
+                        on_update({**parser.fields, "versiculo": versiculo} if versiculo else parser.fields)
+                    if not keywords_enviadas and "keywords" in parser.complete:
+                        keywords_enviadas = True
+                        if versiculo is None and self.verse_index is not None:
+                            versiculo = self.escolher_versiculo(parser.fields["keywords"])
+                        if on_keywords:
+                            on_keywords(parser.fields["keywords"])
+                # O último pedaço traz a contagem de tokens da resposta completa
+                gemini.registrar_uso(prompt, parser.buffer, getattr(chunk, "usage_metadata", None),
+                                     operacao="stream")
+                resposta = self.validator.finalizar(
+                    parser.result(), prompt,
+                    lambda prompt_reparo, campos: self._reparar_campos(model, prompt_reparo, campos)
+                )
+                return self._anexar_versiculo(resposta, sentimento_usuario, versiculo)
+        except Exception as e:
+            telemetry.record_error("gemini", e, "Ocorreu um erro no Gemini (streaming)", tom=tom_escolhido)
+            return None
+
+    def obter_conteudo_espiritual(self, api_key, sentimento_usuario, tom_escolhido, variado=False,
+                                  on_update=None, on_keywords=None):
+        """Devolve uma resposta do cache quando possível; caso contrário, gera com o Gemini.
+
+        Com `variado=True` (usado no "Me Surpreenda") continua a gerar novas respostas
+        até ter variantes suficientes, e depois sorteia uma delas. Se `on_update` for
+        passado e o streaming estiver ativo, a geração é feita em streaming.
+        """
+        resposta = self._resposta_em_cache(sentimento_usuario, tom_escolhido, variado)
+        if resposta:
+            return resposta
+        # Pedidos idênticos em simultâneo esperam pela mesma geração (e só ela vai para o cache)
+        return self.admission.run(
+            make_cache_key(sentimento_usuario, tom_escolhido),
+            lambda: self._gerar_e_guardar(api_key, sentimento_usuario, tom_escolhido, on_update, on_keywords),
+        )
+
+    def _resposta_em_cache(self, sentimento_usuario, tom_escolhido, variado):
+        cache = self.response_cache
+        if not variado or cache.has_enough_variants(sentimento_usuario, tom_escolhido):
+            return cache.get(sentimento_usuario, tom_escolhido, varied=variado)
+        return None
+
+    def _gerar_e_guardar(self, api_key, sentimento_usuario, tom_escolhido, on_update=None, on_keywords=None):
+        if on_update and config.STREAMING_ENABLED:
+            resposta = self.gerar_conteudo_espiritual_stream(
+                api_key, sentimento_usuario, tom_escolhido, on_update=on_update, on_keywords=on_keywords
+            )
+        else:
+            resposta = self.gerar_conteudo_espiritual(api_key, sentimento_usuario, tom_escolhido)
+        if resposta:
+            self.response_cache.set(sentimento_usuario, tom_escolhido, resposta)
+        return resposta
+
+    def executar_geracao(self, google_key, unsplash_key, sentimento_usuario, tom_escolhido, variado=False,
+                         on_partial=None):
+        """Executa o pipeline completo (geração, imagem e contador) e devolve o PipelineResult.
+
+        O cache é consultado na thread de quem pede; só as gerações passam pelo
+        controlo de admissão, que as recusa logo se a fila estiver cheia.
+        """
+        resolver = self.get_image_resolver(unsplash_key)
+        resposta = self._resposta_em_cache(sentimento_usuario, tom_escolhido, variado)
+        if resposta:
+            def gerar(on_update, on_keywords):
+                return resposta
+            submeter = None
+        else:
+            def gerar(on_update, on_keywords):
+                return self._gerar_e_guardar(
+                    google_key, sentimento_usuario, tom_escolhido,
+                    on_update=on_update if on_partial else None, on_keywords=on_keywords
+                )
+
+            def submeter(fn):
+                return self.admission.submit(make_cache_key(sentimento_usuario, tom_escolhido), fn)
+
+        return self.pipeline.run(
+            gerar,
+            buscar_imagem=lambda keywords: self.preparar_imagem(resolver.resolve(keywords)),
+            apos_sucesso=[self.increment_message_count],
+            on_partial=on_partial,
+            submeter=submeter,
+        )
+
+    # --- Imagens (Unsplash) ---
+    def get_image_resolver(self, api_key):
+        """Cache de imagens partilhado por todas as sessões, um por API key."""
+        with self._lock:
+            resolver = self._resolvers.get(api_key)
+            if resolver is not None:
+                self._resolvers.move_to_end(api_key)
+                return resolver
+            resolver = ImageResolver(
+                lambda keywords, per_page: unsplash.buscar_imagens_no_unsplash(api_key, keywords, per_page),
+                per_page=config.UNSPLASH_PER_PAGE,
+            )
+            self._resolvers[api_key] = resolver
+            # Os resolvers só guardam resultados em memória (a sessão HTTP é partilhada): basta despejar
+            while len(self._resolvers) > config.MAX_CACHED_API_KEYS:
+                self._resolvers.popitem(last=False)
+            return resolver
+
+    def buscar_imagem_no_unsplash(self, api_key, keywords):
+        """Devolve um URL de imagem para as keywords, reaproveitando buscas anteriores."""
+        return self.preparar_imagem(self.get_image_resolver(api_key).resolve(keywords))
+
+    # --- Imagens (proxy local) ---
+    @property
+    def image_store(self):
+        """Cache em disco das imagens já redimensionadas (partilhada pelo processo)."""
+        return get_image_store()
+
+    def preparar_imagem(self, image_url):
+        """Descarrega e redimensiona já a imagem do card, para que o rerun a leia do disco."""
+        if image_url:
+            self.image_store.variante(image_url, config.IMAGE_CARD_WIDTH)
+        return image_url
+
+    def imagem_do_card(self, image_url, keywords):
+        """Bytes da imagem do card (local, se a do Unsplash não estiver disponível)."""
+        return self.image_store.para_card(image_url, keywords, config.IMAGE_CARD_WIDTH)
+
+    # --- Pool do "Me Surpreenda" ---
+    def get_warm_pool(self, google_key, unsplash_key):
+        """Pool de respostas prontas por tom, reabastecido em segundo plano."""
+        with self._lock:
+            pool = self._warm_pools.get((google_key, unsplash_key))
+            if pool is not None:
+                return pool
+        resolver = self.get_image_resolver(unsplash_key)
+
+        def produzir(tom):
+            # Passa pelo limite global para não competir com os pedidos dos usuários
+            resposta = self.admission.concurrency.run(
+                lambda: self.gerar_conteudo_espiritual(google_key, config.TEXTO_SURPRESA, tom)
+            )
+            if resposta:
+                resposta = {**resposta, "image_url": self.preparar_imagem(resolver.resolve(resposta["keywords"]))}
+            return resposta
+
+        with self._lock:
+            pool = self._warm_pools.get((google_key, unsplash_key))
+            if pool is None:
+                pool = WarmPool(
+                    TONS,
+                    produzir,
+                    low_watermark=config.WARM_POOL_LOW,
+                    high_watermark=config.WARM_POOL_HIGH,
+                    persist_path=config.WARM_POOL_PATH,
+                ).start()
+                self._warm_pools[(google_key, unsplash_key)] = pool
+            return pool
+
+    # --- Contadores e avaliações (Firebase) ---
+    @property
+    def counter_buffer(self):
+        """Buffer de contadores com flush periódico em segundo plano (criado no primeiro uso)."""
+        with self._lock:
+            if self._counter_buffer is None:
+                self._counter_buffer = CounterBuffer(
+                    firebase.reference,
+                    flush_interval=config.COUNTER_FLUSH_INTERVAL,
+                    max_pending=config.COUNTER_FLUSH_MAX_PENDING,
+                ).start()
+            return self._counter_buffer
+
+    @property
+    def feedback_log(self):
+        """Registo de feedback; grava no Firebase e, opcionalmente, num ficheiro local."""
+        with self._lock:
+            if self._feedback_log is None:
+                sinks = []
+                if firebase.is_connected():
+                    sinks.append(FirebaseSink(firebase.reference))
+                if config.FEEDBACK_LOG_PATH:
+                    sinks.append(local_sink(config.FEEDBACK_LOG_PATH))
+                self._feedback_log = FeedbackLog(sinks).start()
+            return self._feedback_log
+
+    @property
+    def stats_snapshot(self):
+        """Snapshot das estatísticas, atualizado em segundo plano."""
+        counter_buffer = self.counter_buffer
+        with self._lock:
+            if self._stats_snapshot is None:
+                caminhos = {caminho: nome for nome, caminho in firebase.COUNTER_PATHS.items()}
+
+                def por_nome(deltas):
+                    return {caminhos[caminho]: delta for caminho, delta in deltas.items() if caminho in caminhos}
+
+                snapshot = StatsSnapshot(
+                    firebase.ler_contadores,
+                    pending=lambda: por_nome(counter_buffer.pending()),
+                    refresh_interval=config.STATS_REFRESH_INTERVAL,
+                    max_staleness=config.STATS_MAX_STALENESS,
+                )
+                # Os lotes gravados passam do buffer para o snapshot, sem o invalidar
+                # (nem contar duas vezes, se um refresh os leu entretanto)
+                counter_buffer.add_flush_listener(
+                    lambda batch, versao: snapshot.apply(por_nome(batch), versao), before=snapshot.version
+                )
+                self._stats_snapshot = snapshot
+            snapshot = self._stats_snapshot
+        # Fora do lock do motor: a primeira leitura pode demorar até STATS_INITIAL_TIMEOUT
+        return snapshot.start(config.STATS_INITIAL_TIMEOUT)
+
+    def increment_visitor_count(self):
+        """Incrementa o contador de visitas (gravado no próximo flush)."""
+        if firebase.is_connected():
+            self.counter_buffer.increment(firebase.COUNTER_PATHS["visits"])
+
+    def increment_message_count(self):
+        """Incrementa o contador de mensagens geradas (gravado no próximo flush)."""
+        if firebase.is_connected():
+            self.counter_buffer.increment(firebase.COUNTER_PATHS["messages"])
+
+    def handle_rating(self, rating_type, user_input=None, response_data=None, tom=None):
+        """Processa as avaliações 'like' e 'dislike'."""
+        if firebase.is_connected():
+            self.counter_buffer.increment(f'ratings/{rating_type}_count')
+        if rating_type == 'dislike':
+            # Os detalhes ficam em `feedback/`, fora da subárvore `ratings` lida nas estatísticas
+            self.feedback_log.record(rating_type, user_input, response_data, tom)
+
+    def get_app_stats(self):
+        """Devolve as estatísticas da aplicação (visitas, mensagens, avaliações) sem bloquear."""
+        return self.stats_snapshot.get()
+
+    # --- Métricas ---
+    def metricas(self):
+        """Estado dos serviços do motor, por componente (só os que já foram criados)."""
+        dados = {
+            "admission": self.admission.stats(),
+            "validator": self.validator.stats(),
+            "response_cache": self.response_cache.stats(),
+        }
+        if self._counter_buffer is not None:
+            dados["counters"] = {**self._counter_buffer.metrics, "pending_paths": len(self._counter_buffer.pending())}
+        if self._stats_snapshot is not None:
+            dados["stats_snapshot"] = {**self._stats_snapshot.metrics, "age": self._stats_snapshot.age()}
+        if self._feedback_log is not None:
+            dados["feedback_log"] = dict(self._feedback_log.metrics)
+        if self._verse_index is not None:
+            dados["verse_index"] = {
+                "verses": len(self._verse_index), "terms": self._verse_index.n_termos,
+                "bytes": self._verse_index.nbytes, "vectors": self._verse_index.dim,
+            }
+        dados["image_store"] = self.image_store.stats()
+        with self._lock:
+            resolvers = list(self._resolvers.values())
+            pools = list(self._warm_pools.values())
+        for i, resolver in enumerate(resolvers):
+            dados[f"image_resolver_{i}"] = resolver.stats()
+        for i, pool in enumerate(pools):
+            dados[f"warm_pool_{i}"] = {**pool.metrics, "levels": pool.levels()}
+        return dados
+
+    def _gauges(self):
+        gauges = {}
+        for componente, valores in self.metricas().items():
+            for nome, valor in valores.items():
+                if isinstance(valor, dict):
+                    # Ex.: níveis do pool por tom, exportados com o tom como label
+                    valor = [({"key": chave}, v) for chave, v in valor.items()]
+                gauges[f"coachai_{componente}_{nome}"] = valor
+        return gauges
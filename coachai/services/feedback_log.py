@@ -0,0 +1,221 @@
+# Registo de feedback (avaliações negativas) do CoachAI Espiritual
+#
+# Os detalhes de cada "Não Gostei" ficam fora da subárvore `ratings`, num
+# caminho próprio só de escrita, com registos de tamanho limitado e gravados
+# em lote. Opcionalmente, também são gravados num ficheiro local para análise.
+import atexit
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from coachai import telemetry
+
+FEEDBACK_PATH = "feedback/dislikes"
+MAX_TEXT_LENGTH = 280
+
+
+def truncar(texto, limite=MAX_TEXT_LENGTH):
+    texto = texto or ""
+    return texto if len(texto) <= limite else texto[:limite - 1] + "…"
+
+
+def response_id(response_data):
+    """Identificador estável de uma resposta (hash do seu conteúdo)."""
+    payload = json.dumps(response_data or {}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def make_record(rating_type, user_input, response_data, tom=None):
+    """Registo compacto: hash da resposta e excertos, em vez do payload completo."""
+    response_data = response_data or {}
+    return {
+        "rating": rating_type,
+        "response_id": response_id(response_data),
+        "user_input": truncar(user_input),
+        "mensagem": truncar(response_data.get("mensagem")),
+        "versiculo": truncar(response_data.get("versiculo"), 160),
+        "keywords": truncar(response_data.get("keywords"), 80),
+        "tom": tom,
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+# --- Destinos dos registos ---
+class FirebaseSink:
+    """Grava um lote de registos num único update multi-caminho."""
+
+    def __init__(self, get_root, path=FEEDBACK_PATH):
+        self.get_root = get_root
+        self.path = path
+
+    def write(self, records):
+        root = self.get_root()
+        if root is None:
+            raise RuntimeError("base de dados indisponível")
+        root.update({f"{self.path}/{record['id']}": record for record in records})
+
+
+class JSONLSink:
+    """Acrescenta os registos a um ficheiro JSONL local."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, records):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class SQLiteSink:
+    """Grava os registos numa tabela SQLite local."""
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS feedback ("
+            "id TEXT PRIMARY KEY, rating TEXT, response_id TEXT, user_input TEXT, mensagem TEXT, "
+            "versiculo TEXT, keywords TEXT, tom TEXT, timestamp TEXT)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def write(self, records):
+        campos = ("id", "rating", "response_id", "user_input", "mensagem", "versiculo", "keywords", "tom", "timestamp")
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO feedback ({', '.join(campos)}) VALUES ({', '.join('?' * len(campos))})",
+                [tuple(record.get(campo) for campo in campos) for record in records],
+            )
+            self._conn.commit()
+
+
+def local_sink(path):
+    """Escolhe o destino local pela extensão do ficheiro (.jsonl ou SQLite)."""
+    return JSONLSink(path) if path.endswith(".jsonl") else SQLiteSink(path)
+
+
+# --- Registo em lote ---
+class FeedbackLog:
+    """Acumula registos de feedback e grava-os em lote em todos os destinos.
+
+    O flush é feito pela thread em segundo plano (acordada antes do intervalo
+    quando há `max_pending` registos). Se um destino falhar, os seus registos
+    voltam a ser tentados nos flushes seguintes, até `max_attempts` vezes; só
+    depois contam em `dropped`. Os registos têm id próprio, por isso regravar
+    um lote no Firebase ou no SQLite não cria duplicados.
+    """
+
+    def __init__(self, sinks, flush_interval=10.0, max_pending=20, max_buffer=1000, max_attempts=3):
+        self.sinks = list(sinks)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_buffer = max_buffer
+        self.max_attempts = max_attempts
+        self._pending = []
+        # Por destino: registos que falharam e nº de tentativas seguidas falhadas
+        self._retry = [[] for _ in self.sinks]
+        self._failed_attempts = [0] * len(self.sinks)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self.metrics = {"records_written": 0, "write_errors": 0, "retried": 0, "dropped": 0}
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="feedback-flush", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                # O último flush é feito pelo `close`
+                return
+            self.flush()
+
+    def record(self, rating_type, user_input, response_data, tom=None):
+        """Adiciona um registo ao buffer; se o limite for atingido, pede um flush.
+
+        Como nos contadores, o flush é feito pela thread em segundo plano, nunca
+        na thread do pedido (sem a thread iniciada, é feito aqui mesmo).
+        """
+        record = make_record(rating_type, user_input, response_data, tom)
+        record["id"] = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+        with self._lock:
+            self._pending.append(record)
+            if len(self._pending) > self.max_buffer:
+                self._pending.pop(0)
+                self.metrics["dropped"] += 1
+            should_flush = len(self._pending) >= self.max_pending
+        if should_flush:
+            if self._thread is None:
+                self.flush()
+            else:
+                self._wake.set()
+
+    def pending(self):
+        """Nº de registos por gravar (novos e a repetir, somados por destino)."""
+        with self._lock:
+            return len(self._pending) * len(self.sinks) + sum(len(retry) for retry in self._retry)
+
+    def flush(self):
+        """Grava os registos novos e os que falharam antes; devolve False se algum destino falhar."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            ok = True
+            for i, sink in enumerate(self.sinks):
+                registos = self._retry[i] + batch
+                if not registos:
+                    continue
+                try:
+                    sink.write(registos)
+                except Exception as e:
+                    ok = False
+                    self._falhou(i, registos, e)
+                    continue
+                self._retry[i], self._failed_attempts[i] = [], 0
+                if i == 0:
+                    # Cada registo conta uma vez: a do destino principal (o Firebase)
+                    self.metrics["records_written"] += len(registos)
+            return ok
+
+    def _falhou(self, i, registos, erro):
+        nome = type(self.sinks[i]).__name__
+        self.metrics["write_errors"] += 1
+        self._failed_attempts[i] += 1
+        if self._failed_attempts[i] >= self.max_attempts:
+            # Desiste destes registos neste destino para não crescer sem limite
+            self._retry[i], self._failed_attempts[i] = [], 0
+            self.metrics["dropped"] += len(registos)
+            telemetry.record_error("feedback", erro, "Erro ao gravar feedback, registos perdidos", sink=nome,
+                                   lost=len(registos))
+            return
+        excesso = max(len(registos) - self.max_buffer, 0)
+        self._retry[i] = registos[excesso:]
+        self.metrics["retried"] += len(self._retry[i])
+        self.metrics["dropped"] += excesso
+        telemetry.record_error("feedback", erro, "Erro ao gravar feedback, nova tentativa no próximo flush", sink=nome)
+
+    def close(self, timeout=5.0):
+        """Para a thread periódica e faz um último flush; o que ainda falhar conta como perdido."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self.flush()
+        with self._flush_lock:
+            perdidos = sum(len(retry) for retry in self._retry)
+            self._retry = [[] for _ in self.sinks]
+            self._failed_attempts = [0] * len(self.sinks)
+            self.metrics["dropped"] += perdidos
@@ -0,0 +1,76 @@
+# Resolução de imagens do CoachAI Espiritual
+#
+# Guarda os resultados de cada busca no Unsplash (keywords -> lista de URLs)
+# para que keywords repetidas alternem entre imagens sem novas chamadas à API.
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalizar_keywords(keywords):
+    """Chave estável para um conjunto de keywords, independente de maiúsculas e espaços."""
+    partes = [parte.strip().lower() for parte in (keywords or "").split(",")]
+    return ", ".join(parte for parte in partes if parte)
+
+
+class ImageResolver:
+    """Cache partilhado keywords -> resultados, com TTL, tamanho limitado e rotação.
+
+    `fetch(keywords, per_page)` deve devolver a lista de URLs encontrados
+    (vazia se não houver resultados) ou None em caso de erro.
+    """
+
+    def __init__(self, fetch, per_page=10, ttl_seconds=3600, max_entries=256):
+        self.fetch = fetch
+        self.per_page = per_page
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_cached(self, key):
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry["created_at"] > self.ttl_seconds:
+            del self._results[key]
+            return None
+        self._results.move_to_end(key)
+        return entry
+
+    def resolve(self, keywords):
+        """Devolve um URL de imagem para as keywords, alternando entre os resultados em cache."""
+        key = normalizar_keywords(keywords)
+        if not key:
+            return None
+        with self._lock:
+            entry = self._get_cached(key)
+            if entry is not None:
+                self.hits += 1
+                return self._next_url(entry)
+            self.misses += 1
+
+        urls = self.fetch(key, self.per_page)
+        if urls is None:
+            return None
+        with self._lock:
+            entry = {"created_at": time.time(), "urls": urls, "next": 0}
+            self._results[key] = entry
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+            return self._next_url(entry)
+
+    @staticmethod
+    def _next_url(entry):
+        urls = entry["urls"]
+        if not urls:
+            return None
+        url = urls[entry["next"] % len(urls)]
+        entry["next"] += 1
+        return url
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._results)}
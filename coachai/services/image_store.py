@@ -0,0 +1,355 @@
+# Proxy local de imagens do CoachAI Espiritual
+#
+# Cada imagem mostrada (a do card, vinda do Unsplash, e o fundo da página) é
+# descarregada uma única vez para uma cache em disco com tamanho limitado (LRU)
+# e reduzida à largura em que é mostrada, em WebP (ou JPEG, sem suporte a WebP
+# no Pillow). Se o download falhar ou demorar, usa-se uma das imagens locais de
+# `data/imagens`, escolhida pelas keywords.
+import contextlib
+import hashlib
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from coachai import config, telemetry
+from coachai.providers import unsplash
+from coachai.services.admission import SingleFlight
+from coachai.services.image_resolver import normalizar_keywords
+
+IMAGENS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "imagens")
+INDICE_IMAGENS = os.path.join(IMAGENS_DIR, "imagens.tsv")
+FUNDO_LOCAL = "fundo.webp"
+# URLs das imagens locais, para passarem pela mesma cache de variantes que as remotas
+LOCAL_PREFIX = "local:"
+# Imagens maiores do que isto não são guardadas (nem redimensionadas)
+MAX_ORIGINAL_BYTES = 15 * 1024 * 1024
+# Depois de uma falha, o URL não é tentado de novo durante este tempo (os reruns usam logo a local)
+RETRY_FAILED_AFTER = 120.0
+
+
+class DiskLRU:
+    """Ficheiros numa pasta com tamanho total limitado; os menos usados recentemente saem primeiro.
+
+    A ordem de uso é a data de modificação dos ficheiros (atualizada a cada
+    leitura), por isso sobrevive a reinícios do processo.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.metrics = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        existentes = []
+        for entry in os.scandir(directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                existentes.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, nome, tamanho in sorted(existentes):
+            self._entries[nome] = tamanho
+            self.total_bytes += tamanho
+
+    def _path(self, nome):
+        return os.path.join(self.directory, nome)
+
+    def get(self, nome):
+        """Conteúdo do ficheiro `nome`, ou None se não estiver na cache."""
+        with self._lock:
+            if nome not in self._entries:
+                self.metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(nome)
+        try:
+            with open(self._path(nome), "rb") as f:
+                dados = f.read()
+            os.utime(self._path(nome))
+        except OSError:
+            # Apagado por fora (ou por outro processo que partilha a pasta)
+            with self._lock:
+                self.total_bytes -= self._entries.pop(nome, 0)
+                self.metrics["misses"] += 1
+            return None
+        with self._lock:
+            self.metrics["hits"] += 1
+        return dados
+
+    def put(self, nome, dados):
+        """Grava `nome` de forma atómica e remove os ficheiros mais antigos acima do limite."""
+        tmp_path = f"{self._path(nome)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(dados)
+            os.replace(tmp_path, self._path(nome))
+        except OSError as e:
+            telemetry.record_error("image_cache", e, "Não foi possível gravar na cache de imagens")
+            return
+        with self._lock:
+            self.total_bytes += len(dados) - self._entries.pop(nome, 0)
+            self._entries[nome] = len(dados)
+            self.metrics["writes"] += 1
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                antigo, tamanho = self._entries.popitem(last=False)
+                self.total_bytes -= tamanho
+                self.metrics["evictions"] += 1
+                try:
+                    os.remove(self._path(antigo))
+                except OSError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {**self.metrics, "entries": len(self._entries), "bytes": self.total_bytes,
+                    "max_bytes": self.max_bytes}
+
+
+def url_permitida(url):
+    """Indica se `url` é uma imagem que se pode descarregar a pedido de um cliente (HTTPS num host permitido)."""
+    try:
+        partes = urlsplit(url)
+    except ValueError:
+        return False
+    return partes.scheme == "https" and partes.hostname in config.IMAGE_ALLOWED_HOSTS
+
+
+def descarregar(client, url, limite=MAX_ORIGINAL_BYTES):
+    """Bytes de `url`, lidos aos poucos; desiste assim que passarem de `limite`."""
+    response = client.get(url, stream=True)
+    with contextlib.closing(response):
+        tamanho = response.headers.get("Content-Length", "")
+        if tamanho.isdigit() and int(tamanho) > limite:
+            raise ValueError(f"imagem com {tamanho} bytes")
+        partes, total = [], 0
+        for parte in response.iter_content(64 * 1024):
+            total += len(parte)
+            if total > limite:
+                raise ValueError(f"imagem com mais de {limite} bytes")
+            partes.append(parte)
+    return b"".join(partes)
+
+
+def formato_variantes():
+    """Formato das variantes: WebP se o Pillow o suportar, senão JPEG; None sem Pillow."""
+    try:
+        from PIL import features
+    except ImportError:
+        return None
+    return "webp" if features.check("webp") else "jpeg"
+
+
+def redimensionar(dados, largura, formato):
+    """Reduz a imagem à `largura` (mantendo a proporção) e codifica-a em `formato`.
+
+    Sem Pillow devolve os bytes originais; imagens mais estreitas não são ampliadas.
+    """
+    if formato is None:
+        return dados
+    import io
+
+    from PIL import Image
+
+    with Image.open(io.BytesIO(dados)) as img:
+        # Em JPEG, o draft descodifica logo numa escala reduzida (muito mais rápido)
+        img.draft("RGB", (largura, largura))
+        img = img.convert("RGB")
+        if img.width > largura:
+            img = img.resize((largura, round(img.height * largura / img.width)), Image.LANCZOS)
+        saida = io.BytesIO()
+        if formato == "webp":
+            img.save(saida, "WEBP", quality=80, method=4)
+        else:
+            img.save(saida, "JPEG", quality=82, optimize=True, progressive=True)
+        return saida.getvalue()
+
+
+class ImagensLocais:
+    """Conjunto de imagens incluído na aplicação, escolhido pelas keywords da resposta."""
+
+    def __init__(self, directory=IMAGENS_DIR, indice=INDICE_IMAGENS):
+        self.directory = directory
+        self.imagens = []
+        with open(indice, encoding="utf-8") as f:
+            for linha in f:
+                if not linha.strip() or linha.startswith("#"):
+                    continue
+                nome, tags = linha.rstrip("\n").split("\t")
+                self.imagens.append((nome, self._palavras(tags)))
+
+    @staticmethod
+    def _palavras(keywords):
+        return set(normalizar_keywords(keywords).replace(",", " ").split())
+
+    def escolher(self, keywords):
+        """Nome da imagem com mais palavras em comum com as keywords.
+
+        Em caso de empate (ou sem nenhuma em comum), a escolha depende só das
+        keywords, para que a mesma resposta mostre sempre a mesma imagem.
+        """
+        palavras = self._palavras(keywords)
+        melhor = max(len(palavras & tags) for _, tags in self.imagens)
+        candidatas = [nome for nome, tags in self.imagens if len(palavras & tags) == melhor]
+        return candidatas[zlib.crc32(normalizar_keywords(keywords).encode("utf-8")) % len(candidatas)]
+
+    def ler(self, nome):
+        """Bytes da imagem `nome` da pasta; None se não existir ou se o nome sair da pasta."""
+        caminho = os.path.realpath(os.path.join(self.directory, nome))
+        if os.path.dirname(caminho) != os.path.realpath(self.directory):
+            return None
+        try:
+            with open(caminho, "rb") as f:
+                return f.read()
+        except OSError as e:
+            telemetry.record_error("images", e, "Não foi possível ler a imagem local")
+            return None
+
+
+class ImageStore:
+    """Variantes redimensionadas de imagens remotas ou locais, guardadas numa DiskLRU.
+
+    `fetch(url)` deve devolver os bytes da imagem (ou lançar uma exceção).
+    Pedidos simultâneos da mesma variante fazem um único download.
+    """
+
+    def __init__(self, cache, fetch, locais=None, formato="auto"):
+        self.cache = cache
+        self.fetch = fetch
+        self.locais = locais or ImagensLocais()
+        self.formato = formato_variantes() if formato == "auto" else formato
+        self.extensao = {"webp": "webp", "jpeg": "jpg"}.get(self.formato, "img")
+        self.fallbacks = 0
+        self._flight = SingleFlight()
+        self._falhas = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _chave(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+
+    def variante(self, url, largura):
+        """Bytes da imagem de `url` com a `largura` pedida; None se não for possível obtê-la."""
+        nome = f"{self._chave(url)}-{largura}.{self.extensao}"
+        dados = self.cache.get(nome)
+        if dados is not None:
+            return dados
+        return self._flight.do(nome, lambda: self._criar_variante(url, largura, nome))
+
+    def _criar_variante(self, url, largura, nome):
+        original = self._original(url)
+        if original is None:
+            return None
+        try:
+            with telemetry.span("images.resize", width=largura, format=self.formato or "original"):
+                dados = redimensionar(original, largura, self.formato)
+        except Exception as e:
+            telemetry.record_error("images", e, "Não foi possível redimensionar a imagem")
+            return None
+        self.cache.put(nome, dados)
+        telemetry.observe("coachai_image_variant_bytes", len(dados), buckets=telemetry.SIZE_BUCKETS)
+        return dados
+
+    def _original(self, url):
+        """Bytes originais da imagem (da cache, da pasta local ou descarregados uma vez)."""
+        if url.startswith(LOCAL_PREFIX):
+            return self.locais.ler(url[len(LOCAL_PREFIX):])
+        nome = f"{self._chave(url)}.orig"
+        dados = self.cache.get(nome)
+        if dados is not None:
+            return dados
+        with self._lock:
+            if self._falhas.get(url, 0.0) > time.monotonic():
+                return None
+        try:
+            with telemetry.span("images.fetch") as span:
+                dados = self.fetch(url)
+                span["bytes"] = len(dados)
+            if len(dados) > MAX_ORIGINAL_BYTES:
+                raise ValueError(f"imagem com {len(dados)} bytes")
+        except Exception as e:
+            # Inclui ProviderUnavailable: com o circuito aberto usa-se logo a imagem local
+            telemetry.record_error("images", e, "Não foi possível descarregar a imagem")
+            with self._lock:
+                self._falhas[url] = time.monotonic() + RETRY_FAILED_AFTER
+                while len(self._falhas) > 256:
+                    self._falhas.popitem(last=False)
+            return None
+        self.cache.put(nome, dados)
+        return dados
+
+    def para_card(self, url, keywords, largura):
+        """Imagem do card: a do Unsplash se estiver disponível, senão a local das keywords."""
+        dados = self.variante(url, largura) if url else None
+        if dados is None:
+            self.fallbacks += 1
+            telemetry.inc("coachai_image_fallbacks_total", kind="card")
+            dados = self.variante(LOCAL_PREFIX + self.locais.escolher(keywords), largura)
+        return dados
+
+    def publicar_fundo(self, url, largura, destino):
+        """Grava em `destino` o fundo da página reduzido (ou o fundo local, se `url` falhar).
+
+        Devolve False se não foi possível gravar o ficheiro.
+        """
+        dados = self.variante(url, largura) if url else None
+        if dados is None:
+            telemetry.inc("coachai_image_fallbacks_total", kind="background")
+            dados = self.variante(LOCAL_PREFIX + FUNDO_LOCAL, largura)
+        if dados is None:
+            return False
+        try:
+            with open(destino, "rb") as f:
+                if f.read() == dados:
+                    return True
+        except OSError:
+            pass
+        try:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            tmp_path = f"{destino}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(dados)
+            os.replace(tmp_path, destino)
+        except OSError as e:
+            telemetry.record_error("image_cache", e, "Não foi possível publicar o fundo da página")
+            return False
+        return True
+
+    def stats(self):
+        return {**self.cache.stats(), "format": self.formato or "original", "fallbacks": self.fallbacks,
+                "coalesced": self._flight.coalesced_hits}
+
+
+# --- Registo (um por processo) ---
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_image_store():
+    """ImageStore partilhado pelo processo, criado no primeiro uso (a interface e o motor usam o mesmo)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            cdn = unsplash.get_image_client()
+            _store = ImageStore(
+                DiskLRU(config.IMAGE_CACHE_DIR, config.IMAGE_CACHE_MAX_BYTES),
+                lambda url: descarregar(cdn, url),
+            )
+        return _store
+
+
+def publicar_fundo(destino):
+    """Publica o fundo da página em `destino` (pasta estática do Streamlit).
+
+    Se ainda não existir, grava logo o fundo local; o remoto é descarregado e
+    reduzido numa thread em segundo plano e substitui-o quando estiver pronto.
+    Devolve False se não foi possível gravar o fundo local.
+    """
+    store = get_image_store()
+    publicado = os.path.exists(destino) or store.publicar_fundo(None, config.BACKGROUND_IMAGE_WIDTH, destino)
+    threading.Thread(
+        target=store.publicar_fundo, args=(config.BACKGROUND_IMAGE_URL, config.BACKGROUND_IMAGE_WIDTH, destino),
+        name="coachai-fundo", daemon=True,
+    ).start()
+    return publicado
@@ -0,0 +1,158 @@
+# Pipeline de geração do CoachAI Espiritual
+#
+# Sobrepõe as etapas de uma geração (Gemini, Unsplash e escritas no Firebase)
+# num pool de threads, com timeout por etapa e medição do tempo de cada uma.
+import queue
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from coachai import telemetry
+
+
+class PipelineResult:
+    """Resultado de uma execução do pipeline."""
+
+    def __init__(self):
+        self.conteudo = None
+        self.image_url = None
+        self.timings = {}
+        self.errors = {}
+        self.exception = None
+
+    @property
+    def ok(self):
+        return self.conteudo is not None
+
+
+class GenerationPipeline:
+    """Executa geração, busca de imagem e tarefas pós-geração como etapas concorrentes.
+
+    - a geração corre numa thread do pool (ou no pool de gerações, via `submeter`);
+      as atualizações parciais são entregues ao `on_partial` na thread que chamou
+      `run` (a do script do Streamlit);
+    - a busca de imagem começa assim que as keywords são conhecidas;
+    - as tarefas de `apos_sucesso` (ex.: contadores) são "fire-and-forget".
+    """
+
+    def __init__(self, executor, generation_timeout=60.0, image_timeout=10.0):
+        self.executor = executor
+        self.generation_timeout = generation_timeout
+        self.image_timeout = image_timeout
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    # --- Métricas ---
+    def _record(self, stage, seconds, ok=True):
+        with self._lock:
+            entry = self._stats.setdefault(stage, {"count": 0, "errors": 0, "total": 0.0, "max": 0.0})
+            entry["count"] += 1
+            entry["total"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            if not ok:
+                entry["errors"] += 1
+
+    def _timed(self, stage, timings, fn, *args):
+        start = time.perf_counter()
+        ok = False
+        try:
+            value = fn(*args)
+            ok = value is not None
+            return value
+        finally:
+            elapsed = time.perf_counter() - start
+            if timings is not None:
+                timings[stage] = elapsed
+            self._record(stage, elapsed, ok)
+
+    def _fire_and_forget(self, fn):
+        start = time.perf_counter()
+        try:
+            fn()
+            self._record(fn.__name__, time.perf_counter() - start)
+        except Exception as e:
+            self._record(fn.__name__, time.perf_counter() - start, ok=False)
+            telemetry.record_error("pipeline", e, "Erro na tarefa em segundo plano", task=fn.__name__)
+
+    def stats(self):
+        """Tempos agregados por etapa (contagem, erros, média e máximo em segundos)."""
+        with self._lock:
+            return {
+                stage: {**entry, "avg": entry["total"] / entry["count"] if entry["count"] else 0.0}
+                for stage, entry in self._stats.items()
+            }
+
+    # --- Execução ---
+    def run(self, gerar, buscar_imagem=None, apos_sucesso=(), on_partial=None, submeter=None):
+        """Executa uma geração completa.
+
+        `gerar(on_update, on_keywords)` deve devolver o dicionário de conteúdo ou None;
+        `buscar_imagem(keywords)` devolve o URL da imagem ou None. `submeter(fn)`
+        agenda a geração e devolve o seu Future (por omissão, no pool do pipeline);
+        se recusar o pedido (ex.: Overloaded), o resultado traz logo esse erro.
+        O tempo da etapa "generation" inclui a espera na fila.
+        """
+        result = PipelineResult()
+        inicio = time.perf_counter()
+        updates = queue.Queue()
+        image_futures = {}
+
+        def iniciar_imagem(keywords):
+            if buscar_imagem and keywords and keywords not in image_futures:
+                image_futures[keywords] = self.executor.submit(
+                    self._timed, "image", result.timings, buscar_imagem, keywords
+                )
+
+        def on_update(campos):
+            updates.put(dict(campos))
+
+        inicio_geracao = time.perf_counter()
+        try:
+            gen_future = (submeter or self.executor.submit)(lambda: gerar(on_update, iniciar_imagem))
+        except Exception as e:
+            result.errors["generation"] = str(e)
+            result.exception = e
+            result.timings["total"] = time.perf_counter() - inicio
+            return result
+        deadline = time.monotonic() + self.generation_timeout
+        while not gen_future.done():
+            restante = deadline - time.monotonic()
+            if restante <= 0:
+                result.errors["generation"] = "timeout"
+                self._record("generation_timeout", self.generation_timeout, ok=False)
+                result.timings["total"] = time.perf_counter() - inicio
+                return result
+            try:
+                campos = updates.get(timeout=min(0.05, restante))
+            except queue.Empty:
+                continue
+            if on_partial:
+                on_partial(campos)
+
+        try:
+            result.conteudo = gen_future.result()
+        except Exception as e:
+            result.errors["generation"] = str(e)
+            result.exception = e
+        result.timings["generation"] = time.perf_counter() - inicio_geracao
+        self._record("generation", result.timings["generation"], result.ok)
+        if not result.ok:
+            result.timings["total"] = time.perf_counter() - inicio
+            return result
+
+        for tarefa in apos_sucesso:
+            self.executor.submit(self._fire_and_forget, tarefa)
+
+        keywords = result.conteudo.get("keywords")
+        iniciar_imagem(keywords)
+        image_future = image_futures.get(keywords)
+        if image_future is not None:
+            try:
+                result.image_url = image_future.result(timeout=self.image_timeout)
+            except FutureTimeoutError:
+                result.errors["image"] = "timeout"
+            except Exception as e:
+                result.errors["image"] = str(e)
+
+        result.timings["total"] = time.perf_counter() - inicio
+        return result
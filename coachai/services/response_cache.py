@@ -0,0 +1,212 @@
+# Cache de respostas do CoachAI Espiritual
+#
+# Evita chamadas repetidas ao Gemini para pares (sentimento, tom) iguais ou
+# muito parecidos, como os textos dos botões de sugestão e o "Me Surpreenda".
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from difflib import SequenceMatcher
+
+
+def normalizar_texto(texto):
+    """Normaliza o texto do usuário: minúsculas, sem acentos, pontuação ou espaços extra."""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r"[^\w\s]", " ", texto.lower())
+    return " ".join(texto.split())
+
+
+# Palavras que invertem o sentido do texto: "estou triste" e "não estou triste"
+# são muito parecidos carácter a carácter, mas não podem partilhar a resposta
+NEGACOES = frozenset({"nao", "nem", "nunca", "jamais", "sem", "nada", "ninguem", "nenhum", "nenhuma"})
+
+
+def make_cache_key(sentimento, tom):
+    """Chave de cache a partir do texto normalizado e do tom."""
+    return f"{tom}|{normalizar_texto(sentimento)}"
+
+
+# --- Backends de armazenamento ---
+class MemoryBackend:
+    """Armazenamento em memória com despejo LRU e TTL."""
+
+    def __init__(self, max_entries=500, ttl_seconds=6 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        created_at, values = entry
+        if self.ttl_seconds and time.time() - created_at > self.ttl_seconds:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return values
+
+    def set(self, key, values):
+        # Novas variantes não renovam o TTL: a entrada expira a contar da primeira
+        created_at = self._data[key][0] if key in self._data else time.time()
+        self._data[key] = (created_at, values)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def keys(self):
+        return list(self._data.keys())
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """Armazenamento em SQLite local, que sobrevive a reinícios do servidor."""
+
+    def __init__(self, path="response_cache.sqlite3", max_entries=2000, ttl_seconds=24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, created_at REAL, accessed_at REAL, payload TEXT)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        row = self._conn.execute(
+            "SELECT created_at, payload FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        created_at, payload = row
+        if self.ttl_seconds and time.time() - created_at > self.ttl_seconds:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+            return None
+        self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return json.loads(payload)
+
+    def set(self, key, values):
+        now = time.time()
+        # Novas variantes não renovam o TTL: created_at fica o da primeira
+        self._conn.execute(
+            "INSERT INTO cache (key, created_at, accessed_at, payload) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET accessed_at = excluded.accessed_at, payload = excluded.payload",
+            (key, now, now, json.dumps(values, ensure_ascii=False)),
+        )
+        # Remove as entradas menos usadas recentemente quando passa do limite
+        self._conn.execute(
+            "DELETE FROM cache WHERE key NOT IN "
+            "(SELECT key FROM cache ORDER BY accessed_at DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        self._conn.commit()
+
+    def keys(self):
+        return [row[0] for row in self._conn.execute("SELECT key FROM cache")]
+
+    def clear(self):
+        self._conn.execute("DELETE FROM cache")
+        self._conn.commit()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+# --- Cache de respostas ---
+class ResponseCache:
+    """Cache de respostas geradas, com busca exata e, opcionalmente, por similaridade.
+
+    Cada chave guarda até `variants_per_key` respostas diferentes, para que
+    pedidos repetidos (ex.: "Me Surpreenda") possam receber uma resposta variada.
+    A busca por similaridade (`similarity_threshold`) compara caracteres, não o
+    sentido, por isso só é usada se configurada; textos com negações diferentes
+    nunca são considerados parecidos.
+    """
+
+    def __init__(self, backend=None, similarity_threshold=None, variants_per_key=3):
+        self.backend = backend or MemoryBackend()
+        self.similarity_threshold = similarity_threshold
+        self.variants_per_key = variants_per_key
+        self.hits = 0
+        self.misses = 0
+        self.similar_hits = 0
+        self._lock = threading.Lock()
+
+    def _find_similar_key(self, key, keys):
+        """Chave de `keys` (do mesmo tom) mais parecida com `key`, se passar do limiar."""
+        tom, _, texto = key.partition("|")
+        negacoes = NEGACOES.intersection(texto.split())
+        best_key, best_ratio = None, 0.0
+        for other in keys:
+            other_tom, _, other_texto = other.partition("|")
+            if other_tom != tom or NEGACOES.intersection(other_texto.split()) != negacoes:
+                continue
+            ratio = SequenceMatcher(None, texto, other_texto).ratio()
+            if ratio > best_ratio:
+                best_key, best_ratio = other, ratio
+        if best_ratio >= self.similarity_threshold:
+            return best_key
+        return None
+
+    def get(self, sentimento, tom, varied=False):
+        """Retorna uma resposta em cache ou None. Com `varied=True`, sorteia entre as variantes."""
+        key = make_cache_key(sentimento, tom)
+        with self._lock:
+            values = self.backend.get(key)
+            keys = self.backend.keys() if values is None and self.similarity_threshold else None
+        if keys:
+            # A comparação com todas as chaves é O(n): faz-se fora do lock
+            similar_key = self._find_similar_key(key, keys)
+            if similar_key is not None:
+                with self._lock:
+                    values = self.backend.get(similar_key)
+                    if values:
+                        self.similar_hits += 1
+        with self._lock:
+            if not values:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return random.choice(values) if varied else values[-1]
+
+    def has_enough_variants(self, sentimento, tom):
+        """Indica se a chave já tem o número desejado de respostas variadas."""
+        with self._lock:
+            values = self.backend.get(make_cache_key(sentimento, tom)) or []
+        return len(values) >= self.variants_per_key
+
+    def set(self, sentimento, tom, resposta):
+        """Guarda uma resposta, mantendo no máximo `variants_per_key` variantes por chave."""
+        key = make_cache_key(sentimento, tom)
+        with self._lock:
+            values = list(self.backend.get(key) or [])
+            values.append(resposta)
+            self.backend.set(key, values[-self.variants_per_key:])
+
+    def clear(self):
+        with self._lock:
+            self.backend.clear()
+            self.hits = self.misses = self.similar_hits = 0
+
+    def stats(self):
+        """Contadores de acertos e falhas do cache."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "similar_hits": self.similar_hits,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self.backend),
+        }
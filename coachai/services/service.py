@@ -0,0 +1,122 @@
+# Camada de serviço do CoachAI Espiritual
+#
+# As operações que as interfaces usam (gerar, imagem, visitas, avaliações,
+# estatísticas), sem estado de sessão: tudo o que é preciso vem nos argumentos.
+# A interface Streamlit usa o CoachService diretamente (motor no próprio
+# processo) ou o RemoteCoachService de `providers.coach_api`, que fala com a
+# API HTTP de `coachai.api`; a API, por sua vez, serve este mesmo CoachService.
+from coachai import config
+from coachai.providers import firebase
+from coachai.providers.http_client import all_stats
+from coachai.services.admission import Overloaded
+from coachai.services.pipeline import PipelineResult
+from coachai.services.structured_output import CAMPOS_RESPOSTA
+
+
+# --- Resultados em JSON (API <-> cliente remoto) ---
+def resultado_para_json(result):
+    """PipelineResult em JSON; a exceção, se houver, vai como tipo e mensagem."""
+    dados = {
+        "conteudo": result.conteudo,
+        "image_url": result.image_url,
+        "timings": result.timings,
+        "errors": result.errors,
+    }
+    if result.exception is not None:
+        dados["exception"] = {"type": type(result.exception).__name__, "message": str(result.exception)}
+    return dados
+
+
+def resultado_de_json(dados):
+    """Reconstrói o PipelineResult devolvido pela API (Overloaded volta a ser Overloaded)."""
+    result = PipelineResult()
+    result.conteudo = dados.get("conteudo")
+    result.image_url = dados.get("image_url")
+    result.timings = dados.get("timings") or {}
+    result.errors = dados.get("errors") or {}
+    excecao = dados.get("exception")
+    if excecao:
+        tipo = Overloaded if excecao.get("type") == "Overloaded" else RuntimeError
+        result.exception = tipo(excecao.get("message", ""))
+    return result
+
+
+class CoachService:
+    """Operações do CoachAI sobre um CoachEngine do próprio processo, com as chaves dadas.
+
+    Com `usar_pool=False` (chaves introduzidas pelo visitante na barra lateral)
+    não se cria o pool do "Me Surpreenda", que gera respostas em segundo plano
+    e as cobraria à key desse visitante.
+    """
+
+    remoto = False
+
+    def __init__(self, engine, keys, usar_pool=True):
+        self.engine = engine
+        self.keys = keys or {}
+        self.usar_pool = usar_pool and config.WARM_POOL_ENABLED
+        self.google_key = self.keys.get("google")
+        self.unsplash_key = self.keys.get("unsplash")
+
+    @property
+    def pronto(self):
+        """Indica se há chaves para gerar (Gemini e Unsplash)."""
+        return bool(self.google_key and self.unsplash_key)
+
+    def estado_base_de_dados(self):
+        """Inicializa o Firebase (uma vez por processo) e devolve o estado da ligação."""
+        creds = self.keys.get("firebase_credentials")
+        url = self.keys.get("firebase_database_url")
+        if not (creds and url):
+            return "Não Configurado"
+        return firebase.init_firebase_app(creds, url)
+
+    def aquecer(self):
+        """Põe o pool do "Me Surpreenda" a encher em segundo plano."""
+        if self.pronto and self.usar_pool:
+            self.engine.get_warm_pool(self.google_key, self.unsplash_key)
+
+    def gerar(self, sentimento, tom, surpresa=False, session_id=None, on_partial=None):
+        """Gera (ou tira do pool/cache) uma resposta e devolve o PipelineResult.
+
+        Lança Overloaded se a sessão `session_id` excedeu o seu limite de pedidos.
+        """
+        if session_id:
+            self.engine.admission.check_session(session_id)
+        # O "Me Surpreenda" usa primeiro uma resposta já pronta do pool do tom
+        if surpresa and self.usar_pool:
+            pronta = self.engine.get_warm_pool(self.google_key, self.unsplash_key).pop(tom)
+            if pronta:
+                self.engine.increment_message_count()
+                result = PipelineResult()
+                result.conteudo = {campo: pronta[campo] for campo in CAMPOS_RESPOSTA}
+                result.image_url = pronta.get("image_url")
+                result.timings = {"warm_pool": 0.0}
+                return result
+        return self.engine.executar_geracao(
+            self.google_key, self.unsplash_key, sentimento, tom, variado=surpresa, on_partial=on_partial
+        )
+
+    def buscar_imagem(self, keywords):
+        return self.engine.buscar_imagem_no_unsplash(self.unsplash_key, keywords)
+
+    def imagem(self, image_url, keywords):
+        """Bytes da imagem do card, já no tamanho de exibição."""
+        return self.engine.imagem_do_card(image_url, keywords)
+
+    def registrar_visita(self):
+        self.engine.increment_visitor_count()
+
+    def avaliar(self, tipo, sentimento=None, resposta=None, tom=None):
+        self.engine.handle_rating(tipo, sentimento, resposta, tom)
+
+    def estatisticas(self):
+        """Visitas, mensagens e avaliações; None sem Firebase."""
+        return self.engine.get_app_stats() if firebase.is_connected() else None
+
+    def metricas(self):
+        return {
+            "engine": self.engine.metricas(),
+            "pipeline": self.engine.pipeline.stats(),
+            "providers": all_stats(),
+        }
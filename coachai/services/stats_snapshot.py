@@ -0,0 +1,122 @@
+# Snapshot partilhado das estatísticas do CoachAI Espiritual
+#
+# Uma thread em segundo plano lê periodicamente os contadores do Firebase;
+# as sessões leem sempre o último snapshot em memória, sem esperar pela rede.
+import threading
+import time
+
+from coachai import telemetry
+
+STATS_VAZIAS = {"visits": 0, "messages": 0, "likes": 0, "dislikes": 0}
+
+
+class StatsSnapshot:
+    """Estatísticas atualizadas em segundo plano, com limite de desatualização.
+
+    - `read()` lê os contadores da base de dados (chamado só pela thread de refresh);
+    - `pending()` devolve incrementos locais ainda não gravados, somados na leitura,
+      para que as escritas apareçam logo sem invalidar o snapshot;
+    - cada refresh muda a `version()`: um lote gravado só é aplicado com `apply` se
+      nenhum refresh (que já o pode ter lido) tiver acontecido desde antes da escrita.
+    """
+
+    def __init__(self, read, pending=None, refresh_interval=30.0, max_staleness=120.0):
+        self.read = read
+        self.pending = pending or (lambda: {})
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self._values = dict(STATS_VAZIAS)
+        self._updated_at = None
+        self._version = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._first_read = threading.Event()
+        self._first_read_deadline = 0.0
+        self._thread = None
+        self.metrics = {
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "skipped_deltas": 0,
+            "last_refresh_seconds": 0.0,
+            "max_refresh_seconds": 0.0,
+        }
+
+    def start(self, timeout=2.0):
+        """Inicia a thread de refresh e espera até `timeout` segundos pela primeira leitura.
+
+        Assim a primeira página do processo já mostra os valores reais; se a base
+        de dados demorar mais, serve os valores vazios até o refresh terminar.
+        """
+        with self._lock:
+            if self._thread is None:
+                # Um só prazo para todas as chamadas: depois dele, `start` já não bloqueia
+                self._first_read_deadline = time.monotonic() + timeout
+                self._thread = threading.Thread(target=self._run, name="stats-refresh", daemon=True)
+                self._thread.start()
+        if not self._first_read.is_set():
+            self._first_read.wait(max(self._first_read_deadline - time.monotonic(), 0))
+        return self
+
+    def _run(self):
+        while True:
+            self.refresh()
+            self._first_read.set()
+            self._wakeup.wait(self.refresh_interval)
+            self._wakeup.clear()
+
+    def refresh(self):
+        """Lê os contadores da base de dados e substitui o snapshot."""
+        start = time.perf_counter()
+        try:
+            values = self.read()
+        except Exception as e:
+            self.metrics["refresh_errors"] += 1
+            telemetry.record_error("firebase", e, "Erro ao buscar estatísticas")
+            return False
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._values = {**STATS_VAZIAS, **values}
+            self._updated_at = time.time()
+            self._version += 1
+        self.metrics["refreshes"] += 1
+        self.metrics["last_refresh_seconds"] = elapsed
+        self.metrics["max_refresh_seconds"] = max(self.metrics["max_refresh_seconds"], elapsed)
+        return True
+
+    def version(self):
+        """Nº de refreshes aplicados; lido antes de gravar um lote e passado depois ao `apply`."""
+        with self._lock:
+            return self._version
+
+    def apply(self, deltas, version=None):
+        """Aplica incrementos já gravados ao snapshot, sem esperar pelo próximo refresh.
+
+        Se entretanto houve um refresh (a `version` mudou), os valores lidos podem
+        já incluir o lote: não o soma outra vez.
+        """
+        with self._lock:
+            if version is not None and version != self._version:
+                self.metrics["skipped_deltas"] += 1
+                return False
+            for nome, delta in deltas.items():
+                self._values[nome] = self._values.get(nome, 0) + delta
+            return True
+
+    def age(self):
+        """Segundos desde o último refresh bem-sucedido (None se ainda não houve nenhum)."""
+        with self._lock:
+            return None if self._updated_at is None else time.time() - self._updated_at
+
+    def is_stale(self):
+        age = self.age()
+        return age is None or age > self.max_staleness
+
+    def get(self):
+        """Devolve as estatísticas atuais sem bloquear; pede um refresh se estiverem desatualizadas."""
+        if self.is_stale():
+            self._wakeup.set()
+        with self._lock:
+            values = dict(self._values)
+        for nome, delta in self.pending().items():
+            values[nome] = values.get(nome, 0) + delta
+        return values
@@ -0,0 +1,121 @@
+# Parser incremental de JSON para a geração em streaming
+#
+# O Gemini devolve o objeto JSON aos pedaços; este parser extrai os valores
+# (mesmo incompletos) das chaves de texto à medida que vão chegando.
+import json
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+def _read_string(text, pos):
+    """Lê uma string JSON a partir de `pos` (logo após as aspas de abertura).
+
+    Devolve (valor, posição_final, completa). Se a string ainda não terminou,
+    devolve o que já existe com `completa=False`.
+    """
+    chars = []
+    i = pos
+    while i < len(text):
+        c = text[i]
+        if c == '"':
+            return "".join(chars), i + 1, True
+        if c == "\\":
+            if i + 1 >= len(text):
+                break
+            esc = text[i + 1]
+            if esc == "u":
+                if i + 6 > len(text):
+                    break
+                try:
+                    codigo = int(text[i + 2:i + 6], 16)
+                except ValueError:
+                    i += 6
+                    continue
+                i += 6
+                if 0xD800 <= codigo < 0xDC00:
+                    # Emojis vêm como par de surrogates (🙏): espera pela segunda metade
+                    if i + 6 > len(text) and text.startswith("\\u"[:len(text) - i], i):
+                        i -= 6
+                        break
+                    if text.startswith("\\u", i):
+                        try:
+                            baixo = int(text[i + 2:i + 6], 16)
+                        except ValueError:
+                            baixo = 0
+                        if 0xDC00 <= baixo < 0xE000:
+                            codigo = 0x10000 + ((codigo - 0xD800) << 10) + (baixo - 0xDC00)
+                            i += 6
+                chars.append(chr(codigo))
+                continue
+            chars.append(_ESCAPES.get(esc, esc))
+            i += 2
+            continue
+        chars.append(c)
+        i += 1
+    return "".join(chars), len(text), False
+
+
+class IncrementalJSONParser:
+    """Acumula pedaços de um objeto JSON plano e expõe os campos já recebidos.
+
+    `fields` contém o valor atual (possivelmente parcial) de cada chave e
+    `complete` o conjunto de chaves cujo valor já terminou.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields = {}
+        self.complete = set()
+
+    def feed(self, chunk):
+        """Adiciona um pedaço de texto e devolve as chaves que mudaram."""
+        self.buffer += chunk
+        before = dict(self.fields)
+        self._scan()
+        return [key for key, value in self.fields.items() if before.get(key) != value]
+
+    def _scan(self):
+        text = self.buffer
+        start = text.find("{")
+        if start < 0:
+            return
+        i = start + 1
+        while i < len(text):
+            c = text[i]
+            if c != '"':
+                i += 1
+                continue
+            key, i, key_done = _read_string(text, i + 1)
+            if not key_done:
+                return
+            colon = text.find(":", i)
+            if colon < 0:
+                return
+            i = colon + 1
+            while i < len(text) and text[i].isspace():
+                i += 1
+            if i >= len(text):
+                return
+            if text[i] != '"':
+                # Valores que não são strings são ignorados até ao próximo separador
+                while i < len(text) and text[i] not in ",}":
+                    i += 1
+                continue
+            value, i, value_done = _read_string(text, i + 1)
+            self.fields[key] = value
+            if value_done:
+                self.complete.add(key)
+            else:
+                return
+            while i < len(text) and text[i] not in ",}":
+                i += 1
+            i += 1
+
+    def result(self):
+        """Tenta interpretar o buffer completo como objeto; se falhar, devolve os campos extraídos."""
+        cleaned = self.buffer.strip().replace("```json", "").replace("```", "")
+        try:
+            data = json.loads(cleaned)
+        except ValueError:
+            return dict(self.fields)
+        return data if isinstance(data, dict) else dict(self.fields)
@@ -0,0 +1,130 @@
+# Saída estruturada do CoachAI Espiritual
+#
+# Define o modelo da resposta (schema usado no modo JSON do Gemini), valida os
+# campos gerados e, se só alguns falharem, pede ao modelo apenas esses campos
+# em vez de refazer a geração inteira.
+import json
+import re
+import threading
+
+from coachai import telemetry
+
+# As keywords vêm primeiro para que, em streaming, a busca da imagem comece cedo
+CAMPOS_RESPOSTA = ("keywords", "mensagem", "versiculo", "oracao")
+
+
+def schema_para(campos):
+    """Schema JSON (subconjunto OpenAPI aceite pelo Gemini) para os campos indicados."""
+    return {
+        "type": "object",
+        "properties": {campo: {"type": "string"} for campo in campos},
+        "required": list(campos),
+    }
+
+
+RESPONSE_SCHEMA = schema_para(CAMPOS_RESPOSTA)
+
+
+def extrair_json(texto):
+    """Interpreta o texto do modelo como objeto JSON; devolve None se não for possível."""
+    texto = (texto or "").strip().replace("```json", "").replace("```", "")
+    try:
+        data = json.loads(texto)
+    except ValueError:
+        # Tolera texto à volta do objeto
+        match = re.search(r"\{.*\}", texto, re.DOTALL)
+        if not match:
+            return None
+        try:
+            data = json.loads(match.group(0))
+        except ValueError:
+            return None
+    return data if isinstance(data, dict) else None
+
+
+def validar_resposta(data, campos=CAMPOS_RESPOSTA):
+    """Devolve (campos_validos, campos_em_falta) de uma resposta possivelmente parcial."""
+    validos = {}
+    for campo in campos:
+        valor = (data or {}).get(campo)
+        if isinstance(valor, str) and valor.strip():
+            validos[campo] = valor.strip()
+    em_falta = [campo for campo in campos if campo not in validos]
+    return validos, em_falta
+
+
+def montar_prompt_reparo(prompt_original, validos, em_falta):
+    """Prompt que pede só os campos em falta, mantendo os que já são válidos como contexto."""
+    return (
+        f"{prompt_original}\n\n"
+        f"Você já tem estes campos válidos: {json.dumps(validos, ensure_ascii=False)}.\n"
+        f"Devolva APENAS um objeto JSON com as chaves em falta: {', '.join(em_falta)}."
+    )
+
+
+class OutputValidator:
+    """Valida respostas e faz no máximo uma passagem de reparo, contando falhas e reparos.
+
+    `campos` são os campos que o modelo deve gerar (por padrão, todos os da resposta).
+    """
+
+    def __init__(self, campos=CAMPOS_RESPOSTA):
+        self.campos = tuple(campos)
+        self._lock = threading.Lock()
+        self.metrics = {
+            "responses": 0,
+            "parse_failures": 0,
+            "repairs_attempted": 0,
+            "repairs_succeeded": 0,
+            "wasted_generations": 0,
+        }
+
+    def _count(self, key):
+        with self._lock:
+            self.metrics[key] += 1
+
+    def finalizar(self, data, prompt_original, reparar=None):
+        """Valida `data` (dict ou texto); se faltar algo, chama `reparar(prompt, campos)` uma vez.
+
+        `reparar` deve devolver o texto (ou dict) gerado para os campos pedidos.
+        Devolve a resposta completa ou None.
+        """
+        self._count("responses")
+        if isinstance(data, str):
+            data = extrair_json(data)
+        if not isinstance(data, dict):
+            # Listas ou escalares (JSON válido, mas não um objeto) contam como resposta inválida
+            data = None
+        validos, em_falta = validar_resposta(data, self.campos)
+        if not em_falta:
+            return validos
+
+        self._count("parse_failures")
+        if reparar is None:
+            self._count("wasted_generations")
+            return None
+        self._count("repairs_attempted")
+        try:
+            reparo = reparar(montar_prompt_reparo(prompt_original, validos, em_falta), em_falta)
+        except Exception as e:
+            telemetry.record_error("gemini", e, "Erro no reparo da resposta")
+            reparo = None
+        if isinstance(reparo, str):
+            reparo = extrair_json(reparo)
+        if not isinstance(reparo, dict):
+            reparo = None
+        reparados, _ = validar_resposta(reparo, em_falta)
+        validos.update(reparados)
+        if all(campo in validos for campo in self.campos):
+            self._count("repairs_succeeded")
+            return validos
+        self._count("wasted_generations")
+        return None
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self.metrics)
+        total = metrics["responses"]
+        metrics["parse_failure_rate"] = metrics["parse_failures"] / total if total else 0.0
+        metrics["wasted_rate"] = metrics["wasted_generations"] / total if total else 0.0
+        return metrics
@@ -0,0 +1,313 @@
+# Índice local de versículos do CoachAI Espiritual
+#
+# Em vez de o Gemini gerar o versículo token a token (e, às vezes, trocar a
+# referência), o versículo é escolhido num corpus de domínio público incluído
+# no pacote. O corpus é compilado num ficheiro binário compacto, aberto com
+# mmap: textos, índice invertido por termo e, opcionalmente, vetores TF-IDF
+# ("hashing trick") para busca com NumPy, se estiver instalado.
+#
+# Recompilar à mão: python -m coachai.services.verse_index [destino]
+import hashlib
+import math
+import mmap
+import os
+import random
+import re
+import struct
+import sys
+import unicodedata
+import zlib
+from array import array
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "versiculos.tsv")
+
+MAGIC = b"CAVI"
+VERSION = 1
+VECTOR_DIM = 512
+MIN_SCORE = 0.05
+# magic, versão, dimensão dos vetores, nº de versículos, nº de termos,
+# 6 offsets de secção (versos, textos, termos, nomes dos termos, postings, vetores), checksum
+_HEADER = struct.Struct("<4sHHII6I32s")
+_TERM = struct.Struct("<IIIIf")     # offset do nome, tamanho, offset dos postings, nº de postings, idf
+_POSTING = struct.Struct("<If")     # versículo, peso
+_SEP = "\x1f"
+
+_STOPWORDS = set("""
+a o as os um uma uns umas de do da dos das em no na nos nas num numa por pelo pela pelos pelas para pra
+com sem que e ou mas se me te lhe lhes vos eu tu ele ela nos eles elas meu minha meus minhas teu tua
+seu sua seus suas ao aos estou esta estar estava sou ser foi era muito muita pouco mais menos como quando
+isso isto este esta esse essa aquele aquela ja nao sim tem ter tenho tao so ate sobre the and of to in
+for with my am is are be it on at an this that
+""".split())
+
+
+# --- Termos ---
+def _sem_acentos(texto):
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+
+
+def _radical(palavra):
+    """Radical simples: sem plural e cortado a 5 letras (ex.: "tristeza"/"triste" -> "trist")."""
+    if len(palavra) > 4 and palavra.endswith("s"):
+        palavra = palavra[:-1]
+    return palavra[:5]
+
+
+def termos(texto):
+    """Termos indexáveis de um texto em português ou inglês."""
+    palavras = re.findall(r"[a-z]+", _sem_acentos((texto or "").lower()))
+    return [_radical(p) for p in palavras if len(p) > 2 and p not in _STOPWORDS]
+
+
+def _contar(lista):
+    contagem = {}
+    for termo in lista:
+        contagem[termo] = contagem.get(termo, 0) + 1
+    return contagem
+
+
+def _dimensao(termo, dim):
+    return zlib.crc32(termo.encode("ascii")) % dim
+
+
+# --- Compilação ---
+def ler_corpus(path=CORPUS_PATH):
+    """Lê o TSV (referência, texto, temas); linhas vazias e começadas por '#' são ignoradas."""
+    entradas = []
+    with open(path, encoding="utf-8") as f:
+        for linha in f:
+            linha = linha.rstrip("\n")
+            if not linha.strip() or linha.startswith("#"):
+                continue
+            referencia, texto, temas = (linha.split("\t") + ["", ""])[:3]
+            entradas.append((referencia.strip(), texto.strip(), temas.strip()))
+    return entradas
+
+
+def checksum_para(fonte, dim):
+    return hashlib.sha256(fonte + struct.pack("<HH", VERSION, dim)).digest()
+
+
+def compilar(entradas, checksum=b"", dim=0):
+    """Compila o corpus no formato binário lido por `VerseIndex` (dim=0 não grava vetores)."""
+    # Os temas contam a dobrar: descrevem melhor a situação do que as palavras do texto
+    documentos = [_contar(termos(texto) + 2 * termos(temas)) for _, texto, temas in entradas]
+    n = len(documentos)
+    df = _contar(termo for doc in documentos for termo in doc)
+    idf = {termo: math.log(1 + n / freq) for termo, freq in df.items()}
+
+    postings, vetores = {}, array("f")
+    for i, doc in enumerate(documentos):
+        pesos = {termo: (1 + math.log(tf)) * idf[termo] for termo, tf in doc.items()}
+        norma = math.sqrt(sum(p * p for p in pesos.values())) or 1.0
+        for termo, peso in pesos.items():
+            postings.setdefault(termo, []).append((i, peso / norma))
+        if dim:
+            vetor = [0.0] * dim
+            for termo, peso in pesos.items():
+                vetor[_dimensao(termo, dim)] += peso
+            norma_vetor = math.sqrt(sum(v * v for v in vetor)) or 1.0
+            vetores.extend(v / norma_vetor for v in vetor)
+
+    textos = bytearray()
+    offsets = array("I", [0])
+    for referencia, texto, _ in entradas:
+        textos += f"{referencia}{_SEP}{texto}".encode("utf-8")
+        offsets.append(len(textos))
+
+    nomes, tabela, blocos = bytearray(), bytearray(), bytearray()
+    for termo in sorted(postings):
+        nome = termo.encode("ascii")
+        lista = postings[termo]
+        tabela += _TERM.pack(len(nomes), len(nome), len(blocos), len(lista), idf[termo])
+        nomes += nome
+        for i, peso in lista:
+            blocos += _POSTING.pack(i, peso)
+
+    off_versos = _HEADER.size
+    off_textos = off_versos + len(offsets) * 4
+    off_termos = off_textos + len(textos)
+    off_nomes = off_termos + len(tabela)
+    off_postings = off_nomes + len(nomes)
+    off_vetores = off_postings + len(blocos)
+    padding = (-off_vetores) % 4
+    off_vetores += padding
+    header = _HEADER.pack(MAGIC, VERSION, dim, n, len(postings), off_versos, off_textos, off_termos,
+                          off_nomes, off_postings, off_vetores, checksum.ljust(32, b"\0")[:32])
+    return b"".join([header, offsets.tobytes(), bytes(textos), bytes(tabela), bytes(nomes), bytes(blocos),
+                     b"\0" * padding, vetores.tobytes()])
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+# --- Leitura ---
+class VerseIndex:
+    """Índice de versículos sobre um buffer (mmap do ficheiro compilado, ou bytes)."""
+
+    def __init__(self, buffer, usar_vetores=True):
+        self._buf = buffer
+        self.nbytes = len(buffer)
+        if self.nbytes < _HEADER.size:
+            raise ValueError("ficheiro de índice de versículos truncado")
+        (magic, versao, self.dim, self.n_versiculos, self.n_termos, self._off_versos, self._off_textos,
+         self._off_termos, self._off_nomes, self._off_postings, self._off_vetores,
+         self.checksum) = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or versao != VERSION:
+            raise ValueError("ficheiro de índice de versículos inválido")
+        self._validar_secoes()
+        self._offsets = memoryview(buffer)[self._off_versos:self._off_textos].cast("I")
+        self._vetores = None
+        np = _numpy() if usar_vetores and self.dim else None
+        if np is not None:
+            # Sem cópia: a matriz lê diretamente do mmap
+            self._np = np
+            self._vetores = np.frombuffer(buffer, dtype=np.float32, count=self.n_versiculos * self.dim,
+                                          offset=self._off_vetores).reshape(self.n_versiculos, self.dim)
+        self.metodo = "vetores" if self._vetores is not None else "indice_invertido"
+
+    def _validar_secoes(self):
+        """Confirma que as secções do cabeçalho cabem no buffer (ficheiro truncado ou corrompido)."""
+        fim_vetores = self._off_vetores + self.n_versiculos * self.dim * 4
+        if not (_HEADER.size == self._off_versos <= self._off_textos <= self._off_termos <= self._off_nomes
+                <= self._off_postings <= self._off_vetores <= fim_vetores <= self.nbytes):
+            raise ValueError("ficheiro de índice de versículos truncado")
+        if (self._off_textos - self._off_versos != (self.n_versiculos + 1) * 4
+                or self._off_nomes - self._off_termos != self.n_termos * _TERM.size
+                or struct.unpack_from("<I", self._buf, self._off_textos - 4)[0] > self._off_termos - self._off_textos):
+            raise ValueError("ficheiro de índice de versículos inválido")
+
+    @classmethod
+    def abrir(cls, path=None, corpus_path=None, dim=0, usar_vetores=True):
+        """Abre o índice compilado em `path` com mmap, recompilando-o se o corpus mudou.
+
+        Com `dim` > 0 são gravados vetores dessa dimensão, usados na busca se o NumPy
+        estiver disponível. Sem `path` (ou se não for possível gravar), o índice fica só em memória.
+        """
+        corpus_path = corpus_path or CORPUS_PATH
+        with open(corpus_path, "rb") as f:
+            checksum = checksum_para(f.read(), dim)
+        buffer = cls._mmap_se_atual(path, checksum) if path else None
+        if buffer is not None:
+            try:
+                return cls(buffer, usar_vetores=usar_vetores)
+            except ValueError:
+                # Ficheiro corrompido com o checksum certo: recompila por cima
+                buffer.close()
+        dados = compilar(ler_corpus(corpus_path), checksum, dim)
+        buffer = dados
+        if path:
+            try:
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(dados)
+                os.replace(tmp_path, path)
+                buffer = cls._mmap_se_atual(path, checksum) or dados
+            except OSError:
+                pass
+        return cls(buffer, usar_vetores=usar_vetores)
+
+    @staticmethod
+    def _mmap_se_atual(path, checksum):
+        try:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(buffer) < _HEADER.size or _HEADER.unpack_from(buffer, 0)[-1] != checksum:
+            buffer.close()
+            return None
+        return buffer
+
+    def __len__(self):
+        return self.n_versiculos
+
+    def versiculo(self, i):
+        """(referência, texto) do versículo `i`."""
+        inicio, fim = self._offsets[i], self._offsets[i + 1]
+        dados = bytes(self._buf[self._off_textos + inicio:self._off_textos + fim]).decode("utf-8")
+        referencia, texto = dados.split(_SEP, 1)
+        return referencia, texto
+
+    def formatar(self, i):
+        """Texto completo seguido da referência entre parênteses (o formato mostrado na página)."""
+        referencia, texto = self.versiculo(i)
+        return f"{texto} ({referencia})"
+
+    # --- Busca ---
+    def _termo(self, termo):
+        """Procura binária na tabela de termos; devolve (offset dos postings, nº, idf) ou None."""
+        alvo = termo.encode("ascii")
+        baixo, alto = 0, self.n_termos
+        while baixo < alto:
+            meio = (baixo + alto) // 2
+            off_nome, tamanho, off_post, count, idf = _TERM.unpack_from(self._buf, self._off_termos + meio * _TERM.size)
+            nome = bytes(self._buf[self._off_nomes + off_nome:self._off_nomes + off_nome + tamanho])
+            if nome == alvo:
+                return off_post, count, idf
+            if nome < alvo:
+                baixo = meio + 1
+            else:
+                alto = meio
+        return None
+
+    def _buscar_indice(self, pesos):
+        scores = {}
+        for termo, peso in pesos.items():
+            entrada = self._termo(termo)
+            if entrada is None:
+                continue
+            off_post, count, idf = entrada
+            for j in range(count):
+                i, peso_doc = _POSTING.unpack_from(self._buf, self._off_postings + off_post + j * _POSTING.size)
+                scores[i] = scores.get(i, 0.0) + peso * idf * peso_doc
+        return scores
+
+    def _buscar_vetores(self, pesos, k):
+        np = self._np
+        consulta = np.zeros(self.dim, dtype=np.float32)
+        for termo, peso in pesos.items():
+            entrada = self._termo(termo)
+            if entrada is not None:
+                consulta[_dimensao(termo, self.dim)] += peso * entrada[2]
+        if not consulta.any():
+            return {}
+        scores = self._vetores @ (consulta / np.linalg.norm(consulta))
+        melhores = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+        return {int(i): float(scores[i]) for i in melhores}
+
+    def buscar(self, texto, k=5):
+        """Os `k` versículos mais próximos do texto, como [(score, índice)] por ordem decrescente."""
+        pesos = {termo: 1 + math.log(tf) for termo, tf in _contar(termos(texto)).items()}
+        if not pesos:
+            return []
+        scores = self._buscar_vetores(pesos, k) if self._vetores is not None else self._buscar_indice(pesos)
+        melhores = sorted(((s, i) for i, s in scores.items() if s >= MIN_SCORE), reverse=True)
+        return melhores[:k]
+
+    def escolher(self, *textos, k=5, rng=None, aleatorio_se_vazio=True):
+        """Escolhe um versículo para o primeiro texto com resultados (ex.: sentimento, depois keywords).
+
+        Sorteia entre os `k` melhores, com peso pelo score, para variar entre pedidos
+        parecidos. Sem resultados, devolve um versículo ao acaso (ou None).
+        """
+        rng = rng or random
+        for texto in textos:
+            resultados = self.buscar(texto, k)
+            if resultados:
+                scores, indices = zip(*resultados)
+                return self.formatar(rng.choices(indices, weights=scores)[0])
+        if aleatorio_se_vazio and self.n_versiculos:
+            return self.formatar(rng.randrange(self.n_versiculos))
+        return None
+
+
+if __name__ == "__main__":
+    destino = sys.argv[1] if len(sys.argv) > 1 else None
+    index = VerseIndex.abrir(destino, dim=VECTOR_DIM)
+    print(f"{len(index)} versículos, {index.n_termos} termos, {index.nbytes} bytes, busca: {index.metodo}")
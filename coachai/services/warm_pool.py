@@ -0,0 +1,132 @@
+# Pool de respostas prontas para o "Me Surpreenda"
+#
+# O pedido do botão surpresa não depende do usuário, por isso mantemos por tom
+# algumas respostas já geradas (com a imagem resolvida). O botão retira uma de
+# imediato e o pool é reabastecido em segundo plano, uma geração de cada vez.
+import json
+import os
+import random
+import threading
+import time
+
+from coachai import telemetry
+
+
+class WarmPool:
+    """Respostas pré-geradas por tom, com marcas de nível baixo/alto e persistência opcional.
+
+    `produzir(tom)` deve devolver um dicionário de resposta (incluindo `image_url`) ou None.
+    """
+
+    def __init__(self, tons, produzir, low_watermark=2, high_watermark=5, persist_path=None,
+                 refill_pause=1.0, max_backoff=600.0):
+        self.tons = list(tons)
+        self.produzir = produzir
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.persist_path = persist_path
+        self.refill_pause = refill_pause
+        self.max_backoff = max_backoff
+        self._falhas_seguidas = 0
+        self._pools = {tom: [] for tom in self.tons}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.metrics = {"hits": 0, "misses": 0, "produced": 0, "errors": 0}
+        self._load()
+
+    # --- Persistência ---
+    def _load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, encoding="utf-8") as f:
+                data = json.load(f)
+            for tom, respostas in data.items():
+                if tom in self._pools:
+                    self._pools[tom] = respostas[:self.high_watermark]
+        except (OSError, ValueError) as e:
+            telemetry.record_error("warm_pool", e, "Erro ao carregar o pool de respostas")
+
+    def _save(self):
+        if not self.persist_path:
+            return
+        with self._lock:
+            data = {tom: list(respostas) for tom, respostas in self._pools.items()}
+        tmp_path = f"{self.persist_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            telemetry.record_error("warm_pool", e, "Erro ao gravar o pool de respostas")
+
+    # --- Reabastecimento ---
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="warm-pool", daemon=True)
+            self._thread.start()
+        return self
+
+    def _next_tom_to_fill(self):
+        """Tom mais vazio abaixo do nível alto; prioriza os que estão abaixo do nível baixo."""
+        with self._lock:
+            niveis = {tom: len(respostas) for tom, respostas in self._pools.items()}
+        candidatos = [tom for tom, nivel in niveis.items() if nivel < self.high_watermark]
+        if not candidatos:
+            return None
+        return min(candidatos, key=lambda tom: niveis[tom])
+
+    def _run(self):
+        while True:
+            tom = self._next_tom_to_fill()
+            if tom is None:
+                # Cheio: espera até alguém retirar uma resposta
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            try:
+                resposta = self.produzir(tom)
+            except Exception as e:
+                resposta = None
+                telemetry.record_error("warm_pool", e, "Erro ao gerar resposta para o pool", tom=tom)
+            if resposta:
+                with self._lock:
+                    self._pools[tom].append(resposta)
+                self.metrics["produced"] += 1
+                self._falhas_seguidas = 0
+                self._save()
+                # Uma geração de cada vez, com pausa, para espalhar a carga no Gemini
+                self._wakeup.wait(self.refill_pause)
+                self._wakeup.clear()
+            else:
+                self.metrics["errors"] += 1
+                self._falhas_seguidas += 1
+                # Falhas seguidas (ex.: key inválida ou quota esgotada): backoff exponencial,
+                # sem ser interrompido pelos pedidos que esvaziam o pool
+                time.sleep(self.pausa_apos_falha())
+
+    def pausa_apos_falha(self):
+        """Espera antes da próxima tentativa: 10x a pausa normal, a dobrar a cada falha seguida."""
+        return min(self.refill_pause * 10 * 2 ** (self._falhas_seguidas - 1), self.max_backoff)
+
+    # --- Consumo ---
+    def pop(self, tom):
+        """Retira uma resposta pronta do tom, ou None se o pool estiver vazio."""
+        with self._lock:
+            respostas = self._pools.get(tom) or []
+            resposta = respostas.pop(random.randrange(len(respostas))) if respostas else None
+            nivel = len(respostas)
+        if resposta is None:
+            self.metrics["misses"] += 1
+        else:
+            self.metrics["hits"] += 1
+        if nivel < self.low_watermark:
+            self._wakeup.set()
+        if resposta is not None:
+            self._save()
+        return resposta
+
+    def levels(self):
+        with self._lock:
+            return {tom: len(respostas) for tom, respostas in self._pools.items()}
@@ -0,0 +1,326 @@
+# Métricas, spans e logs estruturados do CoachAI Espiritual
+#
+# Um registo em memória, por processo, de contadores e histogramas com labels,
+# exportável no formato de texto do Prometheus. Os spans medem as chamadas
+# externas e os reruns do script; os erros são contados por fornecedor e
+# registados como logs JSON. Sem dependências além da biblioteca padrão.
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+from coachai import config
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+# Exceções que o Streamlit usa para controlar o fluxo do script (st.rerun, st.stop)
+_CONTROL_FLOW = {"RerunException", "StopException"}
+
+logger = logging.getLogger("coachai")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.propagate = False
+logger.setLevel(config.LOG_LEVEL)
+
+
+# --- Logs estruturados ---
+def log_event(event, level=logging.INFO, **fields):
+    """Escreve uma linha JSON com o evento e os campos dados."""
+    if logger.isEnabledFor(level):
+        record = {"ts": round(time.time(), 3), "level": logging.getLevelName(level), "event": event, **fields}
+        logger.log(level, json.dumps(record, ensure_ascii=False, default=str))
+
+
+def record_error(provider, error, message=None, **fields):
+    """Conta um erro do fornecedor/componente e regista-o como log estruturado."""
+    inc("coachai_errors_total", provider=provider, error=type(error).__name__)
+    log_event("error", logging.WARNING, provider=provider, message=message,
+              error=type(error).__name__, detail=str(error), **fields)
+
+
+# --- Métricas ---
+class Histogram:
+    """Histograma com limites fixos (acumulados só na exportação, como no Prometheus)."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, limite in enumerate(self.buckets):
+            if value <= limite:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Quantil aproximado, por interpolação linear dentro do intervalo."""
+        if not self.count:
+            return None
+        alvo = q * self.count
+        acumulado, inferior = 0, 0.0
+        for limite, n in zip(self.buckets, self.counts):
+            if n and acumulado + n >= alvo:
+                return inferior + (limite - inferior) * (alvo - acumulado) / n
+            acumulado += n
+            inferior = limite
+        return self.buckets[-1]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "avg": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pares = list(labels) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pares) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Contadores e histogramas por nome e labels, mais gauges calculados na leitura."""
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def register_gauges(self, source, collect):
+        """Regista `collect()`, que devolve {nome: valor} ou {nome: [(labels, valor)]}.
+
+        Registar de novo a mesma `source` substitui a anterior.
+        """
+        with self._lock:
+            self._gauges[source] = collect
+
+    def _collect_gauges(self):
+        with self._lock:
+            collectors = list(self._gauges.items())
+        gauges = {}
+        for source, collect in collectors:
+            try:
+                valores = collect()
+            except Exception as e:
+                log_event("gauge_error", logging.WARNING, source=source, detail=str(e))
+                continue
+            for name, value in valores.items():
+                series = value if isinstance(value, list) else [({}, value)]
+                for labels, v in series:
+                    if isinstance(v, (int, float)) and not isinstance(v, bool):
+                        gauges[(name, _labels_key(labels))] = v
+        return gauges
+
+    def snapshot(self):
+        """Cópia legível das métricas, para a página de administração."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: h.summary() for key, h in self._histograms.items()}
+        return {"counters": counters, "histograms": histograms, "gauges": self._collect_gauges()}
+
+    def prometheus_text(self):
+        """Todas as métricas no formato de texto do Prometheus."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (h.buckets, list(h.counts), h.sum, h.count)) for key, h in self._histograms.items()
+            )
+        gauges = sorted(self._collect_gauges().items())
+
+        linhas, tipos = [], set()
+
+        def tipo(name, kind):
+            if name not in tipos:
+                tipos.add(name)
+                linhas.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            tipo(name, "counter")
+            linhas.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            tipo(name, "histogram")
+            acumulado = 0
+            for limite, n in zip(buckets, counts):
+                acumulado += n
+                linhas.append(f"{name}_bucket{_format_labels(labels, [('le', str(limite))])} {acumulado}")
+            linhas.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {count}")
+            linhas.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            linhas.append(f"{name}_count{_format_labels(labels)} {count}")
+        for (name, labels), value in gauges:
+            tipo(name, "gauge")
+            linhas.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(linhas) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+register_gauges = REGISTRY.register_gauges
+snapshot = REGISTRY.snapshot
+prometheus_text = REGISTRY.prometheus_text
+
+
+# --- Spans ---
+@contextmanager
+def span(name, **fields):
+    """Mede um bloco: histograma `coachai_span_seconds{span, outcome}` e log em DEBUG.
+
+    Devolve um dicionário onde o bloco pode juntar campos ao log (ex.: tamanhos).
+    """
+    extra = dict(fields)
+    outcome = "ok"
+    start = time.perf_counter()
+    try:
+        yield extra
+    except BaseException as e:
+        if type(e).__name__ not in _CONTROL_FLOW:
+            outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        observe("coachai_span_seconds", elapsed, span=name, outcome=outcome)
+        log_event("span", logging.DEBUG, span=name, outcome=outcome, seconds=round(elapsed, 4), **extra)
+
+
+# --- Reruns e profiler ---
+class SamplingProfiler:
+    """Amostra periodicamente a pilha de uma thread e conta as pilhas vistas."""
+
+    def __init__(self, thread_id, interval=0.005, max_depth=40):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="rerun-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            pilha = []
+            while frame is not None and len(pilha) < self.max_depth:
+                code = frame.f_code
+                pilha.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if pilha:
+                self.stacks[";".join(reversed(pilha))] += 1
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+
+# Últimos reruns lentos (com o perfil, se o profiler estiver ativo)
+slow_reruns = deque(maxlen=20)
+
+
+@contextmanager
+def rerun():
+    """Mede um rerun do script; os que passam de SLOW_RERUN_SECONDS ficam em `slow_reruns`."""
+    profiler = SamplingProfiler(threading.get_ident()).start() if config.PROFILE_SLOW_RERUNS else None
+    start = time.perf_counter()
+    try:
+        with span("rerun"):
+            yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe("coachai_rerun_seconds", elapsed)
+        stacks = profiler.stop() if profiler is not None else None
+        if elapsed >= config.SLOW_RERUN_SECONDS:
+            inc("coachai_slow_reruns_total")
+            entrada = {"ts": time.time(), "seconds": elapsed}
+            if stacks:
+                entrada["top_stacks"] = stacks.most_common(15)
+                entrada["samples"] = sum(stacks.values())
+            slow_reruns.append(entrada)
+            log_event("slow_rerun", logging.WARNING, seconds=round(elapsed, 3), samples=entrada.get("samples"))
+
+
+# --- Exportação HTTP ---
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def start_http_exporter(port, host="0.0.0.0"):
+    """Serve `GET /metrics` (texto do Prometheus) numa thread à parte; só arranca uma vez."""
+    global _exporter
+    with _exporter_lock:
+        if _exporter is not None:
+            return _exporter
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+        _exporter = server
+        log_event("metrics_exporter_started", port=port)
+        return server
@@ -0,0 +1,44 @@
+# Relatório de tempos de arranque do CoachAI Espiritual
+#
+# Regista quanto tempo demoram os imports e o primeiro render do processo,
+# para detetar regressões no arranque a frio.
+import time
+
+_PROCESS_START = time.perf_counter()
+_marks = []
+_first_render = None
+
+
+def mark(name, since=None):
+    """Regista a duração de uma etapa de arranque (desde `since` ou desde a marca anterior).
+
+    Depois do primeiro render as marcas são ignoradas, porque os reruns reexecutam o script.
+    """
+    if _first_render is not None:
+        return
+    now = time.perf_counter()
+    start = since if since is not None else (_marks[-1][2] if _marks else _PROCESS_START)
+    _marks.append((name, now - start, now))
+
+
+def first_render_done():
+    """Marca o fim do primeiro render do processo e imprime o relatório (só uma vez)."""
+    global _first_render
+    if _first_render is not None:
+        return
+    _first_render = time.perf_counter() - _PROCESS_START
+    print(format_report())
+
+
+def report():
+    """Tempos de arranque em segundos, por etapa, mais o total até ao primeiro render."""
+    data = {name: seconds for name, seconds, _ in _marks}
+    data["first_render"] = _first_render
+    return data
+
+
+def format_report():
+    linhas = [f"  {name}: {seconds * 1000:.1f} ms" for name, seconds, _ in _marks]
+    if _first_render is not None:
+        linhas.append(f"  first_render: {_first_render * 1000:.1f} ms")
+    return "Tempos de arranque do CoachAI Espiritual:\n" + "\n".join(linhas)
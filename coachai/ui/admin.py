@@ -0,0 +1,107 @@
+# Página de administração do CoachAI Espiritual
+#
+# Não aparece na navegação: abre-se com `?admin=<ADMIN_TOKEN>` no URL e só
+# existe se a variável ADMIN_TOKEN estiver definida. O token sai do URL logo
+# no primeiro rerun e a sessão fica marcada como de administração.
+import secrets
+import time
+
+import streamlit as st
+
+from coachai import config, telemetry, timing
+
+
+def is_admin_request():
+    """Indica se a sessão abriu a página com o token de administração correto."""
+    if not config.ADMIN_TOKEN:
+        return False
+    token = st.query_params.get("admin")
+    if token is not None:
+        # Não deixa o token na barra de endereço (nem no histórico dos reruns seguintes)
+        del st.query_params["admin"]
+        st.session_state["admin"] = secrets.compare_digest(token.encode("utf-8"), config.ADMIN_TOKEN.encode("utf-8"))
+    return st.session_state.get("admin", False)
+
+
+def _linhas(series, campos):
+    """Converte {(nome, labels): valor} em linhas de tabela."""
+    linhas = []
+    for (nome, labels), valor in sorted(series.items()):
+        linha = {"métrica": nome, **dict(labels)}
+        linha.update(valor if isinstance(valor, dict) else {campos: valor})
+        linhas.append(linha)
+    return linhas
+
+
+def render_resumo(servico):
+    """Tempos por etapa, fila de gerações, saída do modelo e estado dos fornecedores, numa linha cada."""
+    for etapa, tempos in servico.get("pipeline", {}).items():
+        st.caption(f"{etapa}: média {tempos['avg']:.2f}s, máx. {tempos['max']:.2f}s ({tempos['count']} execuções)")
+    motor = servico.get("engine")
+    if motor:
+        admissao = motor["admission"]
+        st.caption(
+            f"fila: {admissao['queue_depth']} (máx. {admissao['max_queue_depth']}), "
+            f"coalescidos: {admissao['coalesced_hits']}, recusados: "
+            f"{admissao['rejected_overload'] + admissao['rejected_rate_limit']}"
+        )
+        saida = motor["validator"]
+        st.caption(
+            f"respostas: {saida['responses']}, falhas de parsing: {saida['parse_failures']}, "
+            f"reparos: {saida['repairs_succeeded']}/{saida['repairs_attempted']}, "
+            f"desperdiçadas: {saida['wasted_rate']:.0%}"
+        )
+    for fornecedor, metricas in servico.get("providers", {}).items():
+        st.caption(
+            f"{fornecedor}: {metricas['requests']} pedidos, {metricas['errors']} erros, "
+            f"média {metricas['latency_avg']:.2f}s, circuito {metricas['breaker']}"
+        )
+
+
+def render(service):
+    st.title("📊 Métricas do CoachAI Espiritual")
+    dados = telemetry.snapshot()
+    # Com a API (COACHAI_API_URL), motor e fornecedores são os do worker que respondeu
+    servico = service.metricas()
+
+    st.subheader("Resumo")
+    render_resumo(servico)
+
+    st.subheader("Spans e latências")
+    if dados["histograms"]:
+        st.dataframe(_linhas(dados["histograms"], "valor"), use_container_width=True)
+    else:
+        st.caption("Ainda sem medições neste processo.")
+
+    st.subheader("Contadores (erros por fornecedor, tentativas, ...)")
+    if dados["counters"]:
+        st.dataframe(_linhas(dados["counters"], "total"), use_container_width=True)
+
+    st.subheader("Fornecedores")
+    st.json(servico.get("providers", {}))
+
+    st.subheader("Serviços do motor")
+    st.json(servico.get("engine", {}))
+    st.json({"pipeline": servico.get("pipeline", {})}, expanded=False)
+
+    st.subheader("Arranque do processo")
+    st.json(timing.report())
+
+    st.subheader(f"Reruns lentos (≥ {config.SLOW_RERUN_SECONDS:.1f}s)")
+    if not telemetry.slow_reruns:
+        st.caption("Nenhum rerun lento registado.")
+    for entrada in reversed(telemetry.slow_reruns):
+        quando = time.strftime("%H:%M:%S", time.localtime(entrada["ts"]))
+        with st.expander(f"{quando} · {entrada['seconds']:.2f}s"):
+            if "top_stacks" in entrada:
+                st.code("\n".join(f"{n:>5}  {pilha}" for pilha, n in entrada["top_stacks"]), language="text")
+            else:
+                st.caption("Ative PROFILE_SLOW_RERUNS=1 para amostrar a pilha dos reruns lentos.")
+
+    st.subheader("Exportação (Prometheus)")
+    texto = telemetry.prometheus_text()
+    st.download_button("Descarregar métricas", texto, file_name="coachai_metrics.txt", mime="text/plain")
+    with st.expander("Ver texto"):
+        st.code(texto, language="text")
+    if config.METRICS_PORT:
+        st.caption(f"Também disponível em http://<host>:{config.METRICS_PORT}/metrics")
@@ -0,0 +1,364 @@
+# Interface do Usuário (UI) do CoachAI Espiritual
+#
+# `render()` é chamado pelo app.py em cada rerun do Streamlit; o motor e as
+# chaves são inicializados uma única vez por processo via `st.cache_resource`
+# (o Firebase tem a sua própria inicialização única em `providers.firebase`).
+# Com COACHAI_API_URL definido, a página é só um cliente da API HTTP
+# (`coachai.api`): tudo passa pela mesma interface de serviço.
+import os
+import uuid
+
+import streamlit as st
+
+from coachai import config, telemetry
+from coachai.providers.coach_api import RemoteCoachService
+from coachai.services import image_store
+from coachai.services.admission import Overloaded
+from coachai.services.engine import TONS, CoachEngine
+from coachai.services.service import CoachService
+from coachai.ui import admin
+from coachai.ui.styles import style_tag
+
+
+# --- Recursos (inicializados uma vez por processo) ---
+@st.cache_resource
+def get_engine():
+    """Motor partilhado por todas as sessões (e o exportador de métricas, se configurado)."""
+    if config.METRICS_PORT:
+        telemetry.start_http_exporter(config.METRICS_PORT)
+    return CoachEngine()
+
+
+@st.cache_resource
+def get_remote_service():
+    """Cliente da API, partilhado por todas as sessões (ligações reaproveitadas)."""
+    if config.METRICS_PORT:
+        telemetry.start_http_exporter(config.METRICS_PORT)
+    return RemoteCoachService(config.API_URL, config.API_TOKEN)
+
+
+def get_service(api_keys):
+    """A API remota, se configurada; senão o motor deste processo com as chaves da sessão.
+
+    O pool do "Me Surpreenda" só é usado com as chaves configuradas (secrets ou
+    ambiente), nunca com as introduzidas por um visitante na barra lateral.
+    """
+    if config.API_URL:
+        return get_remote_service()
+    return CoachService(get_engine(), api_keys, usar_pool=carregar_chaves() is not None)
+
+
+@st.cache_resource
+def carregar_estilo():
+    """Bloco <style>, com o fundo publicado uma vez por processo na pasta estática."""
+    nome = f"fundo.{image_store.get_image_store().extensao}"
+    if image_store.publicar_fundo(os.path.join(config.STATIC_DIR, nome)):
+        return style_tag(f"app/static/{nome}")
+    return style_tag()
+
+
+@st.cache_resource
+def carregar_chaves():
+    """Chaves dos secrets (ou do ambiente); None se for preciso pedi-las na barra lateral."""
+    return config.load_api_keys()
+
+
+# --- Configuração das API Keys ---
+def get_api_keys():
+    keys = carregar_chaves()
+    if keys is not None:
+        return keys
+    # As chaves dos fornecedores estão nos workers da API; aqui só o Formspree, se houver
+    if config.API_URL:
+        return {}
+    keys = {}
+    st.sidebar.header("🔑 Configuração de API Keys")
+    keys['google'] = st.sidebar.text_input("Sua Google API Key", type="password")
+    keys['unsplash'] = st.sidebar.text_input("Sua Unsplash API Key", type="password")
+    keys['formspree'] = st.sidebar.text_input("Seu Endpoint do Formspree", type="password")
+    st.sidebar.warning("A configuração do Firebase só funciona em produção.")
+    return keys
+
+
+def render_card_conteudo(conteudo):
+    """HTML do card de conteúdo; aceita respostas parciais durante o streaming."""
+    return f"""<div class="content-card">
+            <p>{conteudo.get("mensagem", "")}</p><hr>
+            <p><b>📖 Versículo de Apoio:</b> {conteudo.get('versiculo', '')}</p><hr>
+            <p><b>🙏 Oração Guiada:</b> {conteudo.get('oracao', '')}</p>
+        </div>"""
+
+
+# Funções para atualizar a caixa de texto
+def set_text_conforto():
+    st.session_state.sentimento_input = "Estou a passar por um momento difícil e sinto-me um pouco triste."
+def set_text_inspiracao():
+    st.session_state.sentimento_input = "Gostaria de uma mensagem de motivação para começar bem o meu dia."
+def set_text_perspectiva():
+    st.session_state.sentimento_input = "Estou a enfrentar uma decisão importante e sinto-me um pouco perdido(a)."
+
+
+# --- Secções da página ---
+def render_estado_firebase(service):
+    """Inicializa o Firebase, conta a visita e mostra o estado na barra lateral."""
+    # A inicialização só acontece uma vez por processo; depois só devolve o estado
+    firebase_status = service.estado_base_de_dados()
+    if firebase_status == "Não Configurado":
+        return firebase_status
+    if firebase_status == "Conectado":
+        if 'visitor_counted' not in st.session_state:
+            service.registrar_visita()
+            st.session_state.visitor_counted = True
+        st.sidebar.success("✅ Base de Dados: Ativa")
+    else:
+        st.sidebar.error("❌ Base de Dados: Falhou")
+        st.sidebar.caption(f"Detalhe: {firebase_status}")
+    return firebase_status
+
+
+def render_controles():
+    """Escolha do tom e caixa de texto; devolve o tom escolhido."""
+    st.markdown('<p class="title"></p>', unsafe_allow_html=True)
+    st.markdown('<p class="subtitle">Seu assistente pessoal para bem-estar interior e reflexão.</p>', unsafe_allow_html=True)
+
+    # Inicializa o estado da sessão para a caixa de texto
+    if 'sentimento_input' not in st.session_state:
+        st.session_state.sentimento_input = ""
+
+    _, col_controles, _ = st.columns([1, 2, 1])
+    with col_controles:
+        st.subheader("1. Escolha o tom do seu guia")
+        tom = st.selectbox(
+            label="Tom do Guia",
+            options=TONS,
+            format_func=lambda x: x.capitalize(),
+            label_visibility="collapsed"
+        )
+
+        st.subheader("2. Descreva sua necessidade")
+
+        st.write("Precisa de ajuda para começar? Escolha um ponto de partida:")
+        st.markdown('<div class="suggestion-buttons">', unsafe_allow_html=True)
+        b_col1, b_col2, b_col3 = st.columns(3)
+        with b_col1:
+            st.button("Preciso de Conforto", on_click=set_text_conforto, use_container_width=True)
+        with b_col2:
+            st.button("Busco Inspiração", on_click=set_text_inspiracao, use_container_width=True)
+        with b_col3:
+            st.button("Quero uma Perspectiva", on_click=set_text_perspectiva, use_container_width=True)
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        st.text_area(
+            "Necessidade",
+            placeholder="Ou escreva livremente como se sente...",
+            height=130,
+            key="sentimento_input",
+            label_visibility="collapsed"
+        )
+    return tom
+
+
+def render_botoes_acao():
+    # --- Botões de Ação Principal ---
+    _, col_botoes_acao, _ = st.columns([1, 2, 1])
+    with col_botoes_acao:
+        st.markdown('<div id="action-buttons-marker"></div>', unsafe_allow_html=True)
+        b_acao1, b_acao2 = st.columns(2)
+        with b_acao1:
+            if st.button("Receber Mensagem", use_container_width=True, key="main_button"):
+                if not st.session_state.sentimento_input:
+                    st.warning("Por favor, descreva como você está se sentindo.")
+                else:
+                    st.session_state.acao = ("gerar", st.session_state.sentimento_input)
+
+        with b_acao2:
+            if st.button("✨ Me Surpreenda", use_container_width=True, key="surprise_button"):
+                st.session_state.acao = ("surpresa", config.TEXTO_SURPRESA)
+
+
+def guardar_resposta(conteudo, image_url, texto_para_ia, tom):
+    st.session_state.last_response = conteudo
+    st.session_state.last_image_url = image_url
+    st.session_state.last_input = texto_para_ia
+    st.session_state.last_tom = tom
+    st.session_state.rated = False
+
+
+def processar_acao(service, tom):
+    """Lógica para gerar a mensagem baseada na ação do botão."""
+    acao_tipo, texto_para_ia = st.session_state.acao
+    del st.session_state.acao # Limpa a ação para evitar re-execução
+
+    if not service.pronto:
+        st.error("Por favor, configure as chaves de API na barra lateral.")
+        return
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+
+    card_parcial = st.empty()
+
+    def mostrar_parcial(campos):
+        card_parcial.markdown(render_card_conteudo(campos), unsafe_allow_html=True)
+
+    # O "Me Surpreenda" usa primeiro uma resposta já pronta do pool do tom (no serviço)
+    try:
+        with st.spinner("Conectando-se com a sabedoria do universo..."):
+            resultado = service.gerar(
+                texto_para_ia, tom, surpresa=(acao_tipo == "surpresa"),
+                session_id=st.session_state.session_id, on_partial=mostrar_parcial
+            )
+    except Overloaded as e:
+        st.warning(str(e))
+        return
+    card_parcial.empty()
+
+    if resultado.errors.get("generation") == "timeout":
+        st.error("A geração demorou demasiado. Por favor, tente novamente.")
+    elif isinstance(resultado.exception, Overloaded):
+        st.warning(str(resultado.exception))
+    if resultado.ok:
+        guardar_resposta(resultado.conteudo, resultado.image_url, texto_para_ia, tom)
+
+
+def render_resposta(service):
+    # --- Exibição do Conteúdo Gerado ---
+    conteudo_gerado = st.session_state.last_response
+    st.success("Aqui está uma mensagem para você:")
+    col_texto, col_imagem = st.columns([1.5, 1])
+    with col_texto:
+        st.markdown(render_card_conteudo(conteudo_gerado), unsafe_allow_html=True)
+    with col_imagem:
+        # A imagem é resolvida uma única vez por resposta e guardada com ela,
+        # para que reruns (ex.: 👍/👎) não gastem novas chamadas ao Unsplash
+        if 'last_image_url' not in st.session_state:
+            with st.spinner("Buscando uma imagem para sua reflexão..."):
+                st.session_state.last_image_url = service.buscar_imagem(conteudo_gerado["keywords"])
+        # Servida a partir da cache local, já no tamanho do card (ou uma imagem
+        # local, se o Unsplash falhou); o mesmo conteúdo mantém o mesmo URL de media
+        imagem = service.imagem(st.session_state.last_image_url, conteudo_gerado["keywords"])
+        if imagem:
+            with st.container(key="card_imagem"):
+                st.image(imagem, caption="Uma imagem para sua reflexão.", width="stretch")
+        else:
+            st.warning("Não foi possível encontrar uma imagem reflexiva no momento.")
+
+    # --- Seção de Avaliação da Resposta (Like/Dislike) ---
+    if not st.session_state.get('rated', False):
+        st.write("A resposta foi útil?")
+        r_col1, r_col2, r_col3 = st.columns([1,1,5])
+        if r_col1.button("👍 Gostei"):
+            service.avaliar("like")
+            st.session_state.rated = True
+            st.rerun()
+        if r_col2.button("👎 Não Gostei"):
+            service.avaliar("dislike", st.session_state.last_input, st.session_state.last_response,
+                            st.session_state.get('last_tom'))
+            st.session_state.rated = True
+            st.rerun()
+    else:
+        st.info("Obrigado pelo seu feedback sobre esta mensagem!")
+
+
+def render_feedback_geral(formspree_endpoint):
+    # --- Seção de Feedback Geral ---
+    st.markdown("---")
+    _, col_form, _ = st.columns([1, 2, 1])
+    with col_form:
+        st.subheader("💬 Deixe seu Feedback Geral")
+        if formspree_endpoint:
+            form_html = f"""
+            <div class="feedback-form">
+                <form action="{formspree_endpoint}" method="POST">
+                    <input tabindex="-1" type="email" name="email" placeholder="Seu e-mail (opcional)">
+                    <select tabindex="-1" name="tipo">
+                        <option>Elogio</option><option>Crítica Construtiva</option><option>Sugestão de Melhoria</option><option>Relatar um Erro</option>
+                    </select>
+                    <textarea tabindex="-1" name="message" placeholder="Sua mensagem" required></textarea>
+                    <button tabindex="-1" type="submit">Enviar Feedback</button>
+                </form>
+            </div>
+            """
+            st.markdown(form_html, unsafe_allow_html=True)
+        else:
+            st.warning("A funcionalidade de feedback não está configurada.")
+
+
+def render_estatisticas(app_stats):
+    # Exibe as estatísticas da aplicação
+    stats_html = f"""
+    <div style='text-align: center; font-size: 1em; color: #FFFFFF;'>
+        👁️ Visitas: <strong>{app_stats['visits']}</strong> &nbsp;&nbsp;&nbsp; ✉️ Mensagens Geradas: <strong>{app_stats['messages']}</strong>
+    </div>
+    """
+    st.markdown(stats_html, unsafe_allow_html=True)
+
+    total_ratings = app_stats['likes'] + app_stats['dislikes']
+    if total_ratings > 0:
+        satisfaction_rate = app_stats['likes'] / total_ratings
+        st.markdown(f"""
+        <div style='text-align: center; font-size: 1em; color: #FFFFFF; margin-top: 10px;'>
+            <strong>Taxa de Satisfação ({total_ratings} avaliações)</strong><br>
+            👍 {app_stats['likes']} Gostaram &nbsp;&nbsp;&nbsp; 👎 {app_stats['dislikes']} Não Gostaram
+        </div>
+        """, unsafe_allow_html=True)
+        st.progress(satisfaction_rate)
+
+
+def render_sobre_o_criador():
+    # --- NOVA SEÇÃO: Sobre o Criador ---
+    st.markdown("---")
+    _, col_creator, _ = st.columns([1, 2, 1])
+    with col_creator:
+        st.subheader("👨‍💻 Sobre o Criador")
+        st.markdown("""
+        <div class="content-card">
+            <p>Olá! Sou Estevão Gonçalves, Analista de Sistemas e um entusiasta da tecnologia com foco em automação de processos e gestão de TI. Atualmente, estou a aprofundar os meus conhecimentos em Análise e Desenvolvimento de Sistemas.</p>
+            <p>Além da minha carreira em tecnologia, sou Presbítero na ICB Vista Linda, amante da teologia e produtor semanal de estudos para células. O CoachAI Espiritual nasceu da união dessas duas paixões: explorar como a Inteligência Artificial pode ser usada para criar ferramentas que oferecem apoio, conforto e inspiração no nosso dia a dia.</p>
+            <p>
+                Conecte-se comigo no <a href="https://www.linkedin.com/in/estevaorev" target="_blank" style="color: #3498db; text-decoration: none; font-weight: bold;">LinkedIn</a>
+                ou acompanhe os meus estudos no meu canal do <a href="https://www.youtube.com/@estevaorev" target="_blank" style="color: #FF0000; text-decoration: none; font-weight: bold;">YouTube</a>.
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+
+
+# --- Página ---
+def render():
+    st.markdown(carregar_estilo(), unsafe_allow_html=True)
+    if admin.is_admin_request():
+        admin.render(get_service(carregar_chaves()))
+        return
+
+    api_keys = get_api_keys()
+    service = get_service(api_keys)
+
+    firebase_status = render_estado_firebase(service)
+    app_stats = service.estatisticas() if firebase_status == "Conectado" else None
+
+    tom = render_controles()
+    render_botoes_acao()
+
+    # Mantém o pool do "Me Surpreenda" a encher em segundo plano desde a primeira visita
+    service.aquecer()
+
+    if 'acao' in st.session_state:
+        processar_acao(service, tom)
+
+    if 'last_response' in st.session_state:
+        render_resposta(service)
+
+    render_feedback_geral(api_keys.get('formspree'))
+
+    # --- Rodapé ---
+    st.markdown("---")
+    if app_stats is not None:
+        render_estatisticas(app_stats)
+
+    render_sobre_o_criador()
+
+    st.markdown(
+        "<div style='text-align: center; font-size: 0.9em; color: #E0E0E0; padding: 20px;'>"
+        "Lembre-se: O CoachAI Espiritual é uma ferramenta de apoio e não substitui aconselhamento profissional."
+        "</div>",
+        unsafe_allow_html=True
+    )
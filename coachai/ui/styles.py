@@ -0,0 +1,152 @@
+# Estilos CSS customizados do CoachAI Espiritual
+#
+# O bloco <style> é montado uma única vez por processo (`style_tag`); o Streamlit
+# exige que seja reenviado em cada rerun, mas já não é reconstruído. A imagem de
+# fundo é servida pela própria aplicação (ver `services.image_store`).
+CSS = """
+/* 1. Aplica a imagem de fundo com uma camada escura mais forte */
+.stApp {
+    background-size: contain;
+    background-position: center top;
+    background-repeat: no-repeat;
+    background-attachment: fixed;
+    background-color: #0c0c14;
+}
+
+/* 2. Remove o fundo branco padrão dos elementos do Streamlit */
+[data-testid="stHeader"], [data-testid="stToolbar"] {
+    background: none;
+}
+
+[data-testid="stAppViewContainer"] > .main {
+    background: none;
+}
+
+/* 3. Ajusta a cor e adiciona sombra a todo o texto para garantir a legibilidade */
+h1, h2, h3, h4, h5, h6, p, .stRadio, .stTextArea, .stSelectbox, .stTextInput, .stMarkdown {
+    color: #28a745 !important;
+    text-shadow: 1px 1px 6px rgba(0, 0, 0, 0.8); /* Sombra preta para contraste */
+}
+
+/* Garante que os captions do radio button também fiquem brancos e com sombra */
+[data-testid="stCaptionContainer"] {
+    color: #E0E0E0 !important;
+    text-shadow: 1px 1px 6px rgba(0, 0, 0, 0.8);
+}
+
+/* Estilo dos cards de conteúdo */
+.content-card {
+    background-color: rgba(15, 23, 42, 0.7);
+    border-radius: 15px;
+    padding: 25px;
+    margin-bottom: 20px;
+    box-shadow: 0 4px 12px rgba(0, 0, 0, 0.1);
+    border: 1px solid rgba(255, 255, 255, 0.2);
+    backdrop-filter: blur(10px);
+}
+
+/* Estilo do título principal - removido para não sobrepor o texto da imagem */
+.title {
+   display: none;
+}
+
+/* Estilo do subtítulo */
+.subtitle {
+    text-align: center;
+    font-size: 1.2em;
+    color: #E0E0E0;
+    margin-bottom: 20px;
+    padding-top: 250px;
+}
+
+/* --- ESTILO UNIFICADO PARA OS BOTÕES DE AÇÃO --- */
+
+/* Esconde o marcador */
+#action-buttons-marker {
+    display: none;
+}
+
+/* Seleciona TODOS os botões na secção de ações e aplica o estilo "fantasma" verde */
+#action-buttons-marker + [data-testid="stHorizontalBlock"] button {
+    background-color: transparent !important;
+    background-image: none !important;
+    color: #28a745 !important; /* Texto verde */
+    border: 2px solid #28a745 !important; /* Borda verde */
+    border-radius: 25px !important;
+    padding: 12px 30px !important;
+    font-size: 1.1em !important;
+    font-weight: bold !important;
+    box-shadow: none !important;
+    transition: all 0.3s ease !important;
+}
+#action-buttons-marker + [data-testid="stHorizontalBlock"] button:hover {
+    background-color: #28a745 !important; /* Fundo verde sólido no hover */
+    color: #FFFFFF !important; /* Texto branco no hover */
+    border-color: #28a745 !important; /* Borda verde no hover */
+    transform: translateY(-2px) !important;
+}
+
+/* Estilos para os botões de sugestão */
+.suggestion-buttons button {
+    background-color: transparent !important;
+    background-image: none !important;
+    color: #E0E0E0 !important;
+    border: 1px solid #3498db !important;
+    font-weight: normal !important;
+    font-size: 0.9em !important;
+    padding: 8px 10px !important;
+    border-radius: 15px !important;
+    transition: all 0.3s ease !important;
+}
+
+.suggestion-buttons button:hover {
+    background-color: rgba(52, 152, 219, 0.2) !important;
+    border-color: #FFFFFF !important;
+}
+
+
+/* Estilos para o formulário HTML */
+.feedback-form input, .feedback-form select, .feedback-form textarea {
+    width: 100%;
+    padding: 10px;
+    margin-bottom: 10px;
+    border-radius: 5px;
+    border: 1px solid #ccc;
+    color: #000000; /* Texto preto para os campos do formulário */
+}
+.feedback-form button {
+    width: 100%;
+    padding: 10px;
+    border-radius: 5px;
+    border: none;
+    background-color: #28a745;
+    color: white;
+    font-weight: bold;
+    cursor: pointer;
+}
+
+/* Card da imagem: mesmo visual do .content-card, à volta do st.image */
+.st-key-card_imagem {
+    background-color: rgba(15, 23, 42, 0.7);
+    border-radius: 15px;
+    padding: 25px;
+    border: 1px solid rgba(255, 255, 255, 0.2);
+    backdrop-filter: blur(10px);
+}
+
+.st-key-card_imagem img {
+    border-radius: 10px;
+}
+"""
+
+FUNDO_CSS = """
+.stApp {{
+    background-image: linear-gradient(rgba(0,0,0,0.7), rgba(0,0,0,0.7)), url("{url}");
+}}
+"""
+
+
+def style_tag(fundo_url=None):
+    """Bloco <style> completo; sem `fundo_url` fica só a cor de fundo."""
+    fundo = FUNDO_CSS.format(url=fundo_url) if fundo_url else ""
+    return f"<style>{CSS}{fundo}</style>"
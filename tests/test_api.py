@@ -0,0 +1,78 @@
+import pytest
+
+pytest.importorskip("starlette")
+from starlette.testclient import TestClient
+
+from coachai import api, config
+
+
+class ServicoFalso:
+    """Regista as chamadas; basta para testar a validação dos pedidos."""
+
+    def __init__(self):
+        self.chamadas = []
+
+    def gerar(self, *args):
+        self.chamadas.append(("gerar", args))
+        raise AssertionError("a validação devia ter recusado o pedido")
+
+    def avaliar(self, *args):
+        self.chamadas.append(("avaliar", args))
+
+
+@pytest.fixture
+def servico(monkeypatch):
+    monkeypatch.setattr(config, "API_TOKEN", None)
+    servico = ServicoFalso()
+    api.app.state.service = servico
+    return servico
+
+
+@pytest.fixture
+def cliente(servico):
+    # Sem `with`: o lifespan (motor e Firebase) não corre
+    return TestClient(api.app)
+
+
+@pytest.mark.parametrize("corpo", [
+    {"sentimento": 5, "tom": "amigo"},
+    {"sentimento": ["triste"], "tom": "amigo"},
+    {"sentimento": "triste", "tom": ["amigo"]},
+    {"sentimento": "triste", "tom": "amigo", "session_id": ["a"]},
+    {"sentimento": "triste", "tom": "amigo", "session_id": 7, "stream": True},
+    {"sentimento": "   ", "tom": "amigo"},
+    {"sentimento": "triste", "tom": "outro"},
+])
+def test_gerar_recusa_campos_com_tipo_errado(cliente, servico, corpo):
+    response = cliente.post("/v1/generate", json=corpo)
+    assert response.status_code == 422
+    assert "error" in response.json()
+    assert servico.chamadas == []
+
+
+@pytest.mark.parametrize("corpo", [
+    {"tipo": "dislike", "resposta": "x"},
+    {"tipo": "dislike", "resposta": ["x"]},
+    {"tipo": "dislike", "sentimento": 123},
+    {"tipo": "like", "tom": {"a": 1}},
+    {"tipo": "dislike", "resposta": {"mensagem": 5}},
+    {"tipo": "outro"},
+])
+def test_avaliar_recusa_antes_de_contar(cliente, servico, corpo):
+    response = cliente.post("/v1/rate", json=corpo)
+    assert response.status_code == 422
+    assert servico.chamadas == []
+
+
+def test_avaliar_aceita_pedido_valido(cliente, servico):
+    resposta = {"mensagem": "m", "versiculo": "v", "keywords": "k", "oracao": "o"}
+    response = cliente.post("/v1/rate", json={"tipo": "dislike", "sentimento": "triste", "resposta": resposta,
+                                              "tom": "amigo"})
+    assert response.status_code == 204
+    assert servico.chamadas == [("avaliar", ("dislike", "triste", resposta, "amigo"))]
+
+
+@pytest.mark.parametrize("corpo, status", [("não é json", 400), ("[1, 2]", 400)])
+def test_corpo_invalido(cliente, corpo, status):
+    response = cliente.post("/v1/generate", content=corpo, headers={"content-type": "application/json"})
+    assert response.status_code == status
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from coachai.batch import BatchRunner, compactar_saida, ler_entradas
+
+
+class MotorFalso:
+    """Motor síncrono com latência fixa, que mede as gerações em simultâneo."""
+
+    def __init__(self, latencia=0.0, falhar=()):
+        self.latencia = latencia
+        self.falhar = set(falhar)
+        self.em_curso = 0
+        self.max_em_curso = 0
+        self._lock = threading.Lock()
+
+        class _Cache:
+            def stats(self):
+                return {}
+
+        self.response_cache = _Cache()
+
+    def obter_conteudo_espiritual(self, google_key, sentimento, tom, variado=False):
+        with self._lock:
+            self.em_curso += 1
+            self.max_em_curso = max(self.max_em_curso, self.em_curso)
+        try:
+            time.sleep(self.latencia)
+            if sentimento in self.falhar:
+                return None
+            return {"keywords": "luz", "mensagem": f"para {sentimento}", "versiculo": "v", "oracao": "o"}
+        finally:
+            with self._lock:
+                self.em_curso -= 1
+
+
+def correr(motor, entradas, saida, **kwargs):
+    runner = BatchRunner(motor, "g", None, str(saida), taxa=0, **kwargs)
+    return runner, asyncio.run(runner.run(entradas))
+
+
+def ler_saida(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f]
+
+
+def test_ler_entradas_jsonl_com_tipos_errados_nao_interrompe(tmp_path):
+    path = tmp_path / "pedidos.jsonl"
+    path.write_text("\n".join([
+        json.dumps({"id": 1, "sentimento": "triste", "tom": " Amigo "}),
+        json.dumps({"sentimento": 5}),
+        json.dumps({"sentimento": ["x"], "tom": None}),
+        "isto não é JSON",
+        "[1, 2]",
+        "",
+    ]), encoding="utf-8")
+    entradas = ler_entradas(str(path), "calmo")
+    assert entradas == [
+        {"id": "1", "sentimento": "triste", "tom": "amigo"},
+        {"id": "2", "sentimento": "5", "tom": "calmo"},
+        {"id": "3", "sentimento": "", "tom": "calmo"},
+        {"id": "4", "sentimento": "", "tom": "calmo"},
+        {"id": "5", "sentimento": "", "tom": "calmo"},
+    ]
+
+
+def test_ler_entradas_csv(tmp_path):
+    path = tmp_path / "pedidos.csv"
+    path.write_text("id,sentimento,tom\na,Estou triste,Calmo\n,Preciso de força,\n", encoding="utf-8")
+    assert ler_entradas(str(path), "amigo") == [
+        {"id": "a", "sentimento": "Estou triste", "tom": "calmo"},
+        {"id": "2", "sentimento": "Preciso de força", "tom": "amigo"},
+    ]
+
+
+def test_compactar_saida_fica_com_o_ultimo_por_id(tmp_path):
+    path = tmp_path / "saida.jsonl"
+    path.write_text(
+        '{"id": "1", "status": "error"}\n{"id": "2", "status": "ok"}\n{"id": "1", "status": "ok"}\n{"id": "3", "sta',
+        encoding="utf-8",
+    )
+    compactar_saida(str(path))
+    assert ler_saida(path) == [{"id": "2", "status": "ok"}, {"id": "1", "status": "ok"}]
+
+
+def test_retoma_repete_as_falhas_sem_duplicar_ids(tmp_path):
+    saida = tmp_path / "saida.jsonl"
+    entradas = [{"id": str(i), "sentimento": f"s{i}", "tom": "amigo"} for i in range(4)]
+    entradas.append({"id": "x", "sentimento": "", "tom": "amigo"})
+    correr(MotorFalso(falhar={"s1", "s2"}), entradas, saida)
+    assert sorted(r["id"] for r in ler_saida(saida) if r["status"] == "ok") == ["0", "3"]
+
+    runner, resumo = correr(MotorFalso(), entradas, saida)
+    assert resumo["skipped"] == 2
+    resultados = ler_saida(saida)
+    assert sorted(r["id"] for r in resultados) == ["0", "1", "2", "3", "x"]
+    assert {r["id"]: r["status"] for r in resultados} == {"0": "ok", "1": "ok", "2": "ok", "3": "ok", "x": "error"}
+
+
+def test_timeout_nao_ultrapassa_a_concorrencia(tmp_path):
+    motor = MotorFalso(latencia=0.3)
+    entradas = [{"id": str(i), "sentimento": f"s{i}", "tom": "amigo"} for i in range(6)]
+    runner, resumo = correr(motor, entradas, tmp_path / "saida.jsonl", concorrencia=2, timeout=0.05)
+    assert resumo["error"] == 6
+    assert motor.max_em_curso == 2
+    assert {r["erro"] for r in ler_saida(tmp_path / "saida.jsonl")} == {"timeout"}
+
+
+def test_entrada_invalida(tmp_path):
+    saida = tmp_path / "saida.jsonl"
+    correr(MotorFalso(), [{"id": "1", "sentimento": "x", "tom": "outro"}], saida)
+    assert ler_saida(saida)[0]["erro"] == "invalid_input"
@@ -0,0 +1,124 @@
+import threading
+
+import pytest
+
+from benchmarks.fakes import FakeDatabase
+from coachai.services.counters import CounterBuffer
+
+
+@pytest.fixture
+def db():
+    return FakeDatabase(latency=0.0, seed=1)
+
+
+def buffer_para(db, **kwargs):
+    return CounterBuffer(lambda: db.reference("/"), **kwargs)
+
+
+def test_incrementos_sao_enviados_num_unico_update(db):
+    buffer = buffer_para(db, max_pending=100)
+    for _ in range(5):
+        buffer.increment("contadores/visitas")
+    buffer.increment("contadores/mensagens", 2)
+
+    assert db.calls.snapshot() == {}
+    assert buffer.flush()
+
+    assert db.calls.snapshot() == {"firebase_updates": 1}
+    assert db.tree == {"contadores": {"visitas": 5, "mensagens": 2}}
+    assert buffer.pending() == {}
+    assert buffer.metrics["events_written"] == 6
+
+
+def test_incrementos_somam_ao_valor_existente(db):
+    db.tree = {"contadores": {"visitas": 10}}
+    buffer = buffer_para(db)
+    buffer.increment("contadores/visitas", 3)
+    buffer.flush()
+    assert db.tree["contadores"]["visitas"] == 13
+
+
+def test_limite_de_eventos_acorda_a_thread_de_flush(db):
+    threads = []
+    gravado = threading.Event()
+    referencia = db.reference("/")
+    update_original = referencia.update
+
+    def update(valor):
+        threads.append(threading.current_thread().name)
+        update_original(valor)
+        gravado.set()
+
+    referencia.update = update
+    buffer = CounterBuffer(lambda: referencia, flush_interval=60.0, max_pending=3).start()
+    try:
+        for _ in range(3):
+            buffer.increment("contadores/visitas")
+        assert gravado.wait(2.0)
+        assert threads == ["counter-flush"]
+        assert db.tree == {"contadores": {"visitas": 3}}
+    finally:
+        buffer.close()
+
+
+def test_flush_falhado_fica_pendente_e_e_repetido(db):
+    buffer = buffer_para(db, max_attempts=3)
+    buffer.increment("contadores/visitas", 4)
+
+    db.failure_rate = 1.0
+    assert not buffer.flush()
+    assert buffer.pending() == {"contadores/visitas": 4}
+    assert buffer.metrics["flush_errors"] == 1
+
+    buffer.increment("contadores/visitas")
+    db.failure_rate = 0.0
+    assert buffer.flush()
+    assert db.tree == {"contadores": {"visitas": 5}}
+    assert buffer.metrics["lost_writes"] == 0
+
+
+def test_lote_e_descartado_depois_de_max_attempts(db):
+    buffer = buffer_para(db, max_attempts=2)
+    buffer.increment("contadores/visitas", 2)
+    buffer.increment("contadores/likes")
+    db.failure_rate = 1.0
+    assert not buffer.flush()
+    assert not buffer.flush()
+    assert buffer.pending() == {}
+    # Conta eventos (chamadas a increment), não a soma dos deltas
+    assert buffer.metrics["lost_writes"] == 2
+
+
+def test_base_de_dados_indisponivel_conta_como_falha():
+    buffer = CounterBuffer(lambda: None)
+    buffer.increment("contadores/visitas")
+    assert not buffer.flush()
+    assert buffer.pending() == {"contadores/visitas": 1}
+
+
+def test_close_faz_o_ultimo_flush(db):
+    buffer = buffer_para(db, flush_interval=60.0).start()
+    buffer.increment("contadores/visitas")
+    buffer.increment("contadores/likes")
+    buffer.close()
+
+    assert not buffer._thread.is_alive()
+    assert db.tree == {"contadores": {"visitas": 1, "likes": 1}}
+
+
+def test_close_sem_base_de_dados_conta_eventos_perdidos(db):
+    buffer = buffer_para(db, flush_interval=60.0).start()
+    buffer.increment("contadores/visitas", 3)
+    db.failure_rate = 1.0
+    buffer.close()
+    assert buffer.pending() == {}
+    assert buffer.metrics["lost_writes"] == 1
+
+
+def test_listeners_recebem_o_lote_gravado(db):
+    lotes = []
+    buffer = buffer_para(db)
+    buffer.add_flush_listener(lotes.append)
+    buffer.increment("contadores/visitas")
+    buffer.flush()
+    assert lotes == [{"contadores/visitas": 1}]
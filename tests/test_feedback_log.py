@@ -0,0 +1,119 @@
+import json
+import sqlite3
+import threading
+
+import pytest
+
+from benchmarks.fakes import FakeDatabase
+from coachai.services.feedback_log import FeedbackLog, FirebaseSink, local_sink, make_record
+
+RESPOSTA = {"mensagem": "m" * 500, "versiculo": "v", "keywords": "luz", "oracao": "o"}
+
+
+class SinkFalhado:
+    """Destino que falha as primeiras `falhas` escritas e guarda as restantes."""
+
+    def __init__(self, falhas=0):
+        self.falhas = falhas
+        self.escritas = []
+
+    def write(self, records):
+        if self.falhas:
+            self.falhas -= 1
+            raise ConnectionError("falha simulada")
+        self.escritas.append([record["id"] for record in records])
+
+
+def test_make_record_trunca_e_nao_guarda_o_payload():
+    record = make_record("dislike", "triste", RESPOSTA, "amigo")
+    assert len(record["mensagem"]) == 280
+    assert "oracao" not in record
+    assert record["tom"] == "amigo"
+    assert make_record("dislike", "x", RESPOSTA)["response_id"] == record["response_id"]
+
+
+def test_lote_gravado_num_unico_update():
+    db = FakeDatabase(latency=0.0, seed=1)
+    log = FeedbackLog([FirebaseSink(lambda: db.reference("/"))])
+    for _ in range(3):
+        log.record("dislike", "triste", RESPOSTA, "amigo")
+    assert log.flush()
+    assert db.calls.snapshot() == {"firebase_updates": 1}
+    assert len(db.tree["feedback"]["dislikes"]) == 3
+    assert log.metrics["records_written"] == 3
+
+
+def test_record_nao_grava_na_thread_do_pedido():
+    sink = SinkFalhado()
+    log = FeedbackLog([sink], flush_interval=60, max_pending=2).start()
+    escrito = threading.Event()
+    thread_do_flush = []
+    original = sink.write
+
+    def write(records):
+        thread_do_flush.append(threading.current_thread().name)
+        original(records)
+        escrito.set()
+
+    sink.write = write
+    log.record("dislike", "a", RESPOSTA)
+    log.record("dislike", "b", RESPOSTA)
+    assert escrito.wait(2)
+    assert thread_do_flush == ["feedback-flush"]
+    log.close()
+
+
+def test_falha_volta_a_ser_tentada_no_proximo_flush():
+    sink = SinkFalhado(falhas=1)
+    log = FeedbackLog([sink])
+    log.record("dislike", "a", RESPOSTA)
+    assert not log.flush()
+    assert log.pending() == 1
+    log.record("dislike", "b", RESPOSTA)
+    assert log.flush()
+    assert [len(lote) for lote in sink.escritas] == [2]
+    assert log.metrics == {"records_written": 2, "write_errors": 1, "retried": 1, "dropped": 0}
+
+
+def test_desiste_apos_max_attempts_e_conta_como_perdido():
+    sink = SinkFalhado(falhas=10)
+    log = FeedbackLog([sink], max_attempts=2)
+    log.record("dislike", "a", RESPOSTA)
+    assert not log.flush()
+    assert not log.flush()
+    assert log.pending() == 0
+    assert log.metrics["dropped"] == 1
+    assert log.metrics["write_errors"] == 2
+
+
+def test_so_o_destino_que_falhou_repete():
+    bom, mau = SinkFalhado(), SinkFalhado(falhas=1)
+    log = FeedbackLog([bom, mau])
+    log.record("dislike", "a", RESPOSTA)
+    log.flush()
+    log.record("dislike", "b", RESPOSTA)
+    log.flush()
+    assert [len(lote) for lote in bom.escritas] == [1, 1]
+    assert [len(lote) for lote in mau.escritas] == [2]
+
+
+def test_close_conta_o_que_fica_por_gravar():
+    log = FeedbackLog([SinkFalhado(falhas=10)]).start()
+    log.record("dislike", "a", RESPOSTA)
+    log.close()
+    assert log.metrics["dropped"] == 1
+    assert log.pending() == 0
+
+
+@pytest.mark.parametrize("nome", ["feedback.jsonl", "feedback.sqlite3"])
+def test_destinos_locais(tmp_path, nome):
+    path = str(tmp_path / nome)
+    log = FeedbackLog([local_sink(path)])
+    log.record("dislike", "triste", RESPOSTA, "amigo")
+    assert log.flush()
+    if nome.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            linhas = [json.loads(linha) for linha in f]
+    else:
+        linhas = sqlite3.connect(path).execute("SELECT tom FROM feedback").fetchall()
+    assert len(linhas) == 1
@@ -0,0 +1,55 @@
+import sys
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeGemini
+from coachai import config
+from coachai.providers import gemini
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    for nome in ("google", "google.generativeai", "google.ai", "google.ai.generativelanguage"):
+        if nome in sys.modules:
+            monkeypatch.setitem(sys.modules, nome, sys.modules[nome])
+        else:
+            monkeypatch.delitem(sys.modules, nome, raising=False)
+    monkeypatch.setattr(gemini, "_models", type(gemini._models)())
+    monkeypatch.setattr(config, "MAX_CACHED_API_KEYS", 2)
+    monkeypatch.setattr(config, "GEMINI_REQUEST_TIMEOUT", 0.0)
+    return FakeGemini(latency=0.0, first_chunk_latency=0.0, seed=1).install()
+
+
+class Transporte:
+    def __init__(self):
+        self.fechado = False
+
+    def close(self):
+        self.fechado = True
+
+
+def test_um_modelo_e_um_cliente_por_key(fake):
+    a = gemini.get_model("key-a")
+    assert gemini.get_model("key-a") is a
+    assert a._client.client_options == {"api_key": "key-a"}
+    assert gemini.get_model("key-b")._client.client_options == {"api_key": "key-b"}
+    assert fake.calls.snapshot()["gemini_clients_created"] == 2
+
+
+def test_keys_antigas_sao_despejadas_e_o_cliente_fechado(fake):
+    a = gemini.get_model("key-a")
+    a._client.transport = Transporte()
+    gemini.get_model("key-b")
+    gemini.get_model("key-a")  # a passa a ser a mais recente
+    b_transporte = gemini._models["key-b"]._client.transport = Transporte()
+
+    gemini.get_model("key-c")
+
+    assert list(gemini._models) == ["key-a", "key-c"]
+    for _ in range(100):
+        if b_transporte.fechado:
+            break
+        time.sleep(0.01)
+    assert b_transporte.fechado
+    assert not a._client.transport.fechado
@@ -0,0 +1,73 @@
+import threading
+import time
+
+from benchmarks.fakes import FakeDatabase, FakeReference
+from coachai.services.counters import CounterBuffer
+from coachai.services.stats_snapshot import STATS_VAZIAS, StatsSnapshot
+
+
+def test_start_espera_pela_primeira_leitura():
+    snapshot = StatsSnapshot(lambda: {"visits": 7, "messages": 3}, refresh_interval=60).start(timeout=2)
+    assert snapshot.get() == {**STATS_VAZIAS, "visits": 7, "messages": 3}
+    assert snapshot.version() == 1
+
+
+def test_start_nao_bloqueia_alem_do_timeout():
+    liberar = threading.Event()
+
+    def ler():
+        liberar.wait(5)
+        return {"visits": 1}
+
+    snapshot = StatsSnapshot(ler, refresh_interval=60)
+    inicio = time.monotonic()
+    snapshot.start(timeout=0.1)
+    assert snapshot.get() == STATS_VAZIAS
+    # As chamadas seguintes partilham o mesmo prazo
+    snapshot.start(timeout=0.1)
+    snapshot.start(timeout=0.1)
+    assert time.monotonic() - inicio < 0.5
+    liberar.set()
+
+
+def test_start_com_erro_na_leitura_nao_bloqueia():
+    def ler():
+        raise ConnectionError("falha simulada")
+
+    snapshot = StatsSnapshot(ler, refresh_interval=60).start(timeout=2)
+    assert snapshot.get() == STATS_VAZIAS
+    assert snapshot.metrics["refresh_errors"] == 1
+
+
+def test_apply_ignora_lote_se_houve_refresh_entretanto():
+    snapshot = StatsSnapshot(lambda: {"visits": 10})
+    snapshot.refresh()
+    versao = snapshot.version()
+    assert snapshot.apply({"visits": 2}, versao)
+    assert snapshot.get()["visits"] == 12
+
+    versao = snapshot.version()
+    snapshot.refresh()  # já inclui o lote gravado
+    assert not snapshot.apply({"visits": 2}, versao)
+    assert snapshot.get()["visits"] == 10
+    assert snapshot.metrics["skipped_deltas"] == 1
+
+
+def test_refresh_durante_o_flush_nao_conta_o_lote_duas_vezes(monkeypatch):
+    db = FakeDatabase(latency=0.0, seed=1)
+    db.tree = {"contadores": {"visitas": 5}}
+    buffer = CounterBuffer(lambda: db.reference("/"))
+    snapshot = StatsSnapshot(lambda: {"visits": db.reference("contadores/visitas").get()})
+    snapshot.refresh()
+    buffer.add_flush_listener(lambda batch, versao: snapshot.apply({"visits": batch["contadores/visitas"]}, versao),
+                              before=snapshot.version)
+    update = FakeReference.update
+
+    def update_e_refresh(self, value):
+        update(self, value)
+        snapshot.refresh()  # a thread de refresh lê entre o update e o listener
+
+    monkeypatch.setattr(FakeReference, "update", update_e_refresh)
+    buffer.increment("contadores/visitas", 3)
+    assert buffer.flush()
+    assert snapshot.get()["visits"] == 8
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from coachai.services.streaming_json import IncrementalJSONParser
+
+
+def alimentar(*pedacos):
+    parser = IncrementalJSONParser()
+    for pedaco in pedacos:
+        parser.feed(pedaco)
+    return parser
+
+
+def test_campos_completos_num_unico_pedaco():
+    parser = alimentar('{"mensagem": "Olá", "oracao": "Amém"}')
+    assert parser.fields == {"mensagem": "Olá", "oracao": "Amém"}
+    assert parser.complete == {"mensagem", "oracao"}
+    assert parser.result() == {"mensagem": "Olá", "oracao": "Amém"}
+
+
+def test_feed_devolve_so_as_chaves_que_mudaram():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"mensagem": "Ol') == ["mensagem"]
+    assert parser.feed('á", "ora') == ["mensagem"]
+    assert parser.feed('cao": "A') == ["oracao"]
+    assert parser.feed("") == []
+
+
+@pytest.mark.parametrize("escape, esperado", [
+    (r"\"", '"'), (r"\\", "\\"), (r"\/", "/"), (r"\n", "\n"), (r"\t", "\t"),
+    (r"\r", "\r"), (r"\b", "\b"), (r"\f", "\f"), (r"\u00e9", "é"),
+])
+def test_escapes(escape, esperado):
+    texto = '{"mensagem": "a' + escape + 'b"}'
+    parser = alimentar(texto)
+    assert parser.fields["mensagem"] == f"a{esperado}b" == json.loads(texto)["mensagem"]
+
+
+def test_par_de_surrogates_vira_um_so_caractere():
+    texto = r'{"mensagem": "Paz \ud83d\ude4f"}'
+    assert alimentar(texto).fields["mensagem"] == "Paz 🙏" == json.loads(texto)["mensagem"]
+
+
+@pytest.mark.parametrize("corte", range(len(r'{"m": "caf\u00e9 \ud83d\ude4f!"}') + 1))
+def test_escapes_partidos_entre_pedacos(corte):
+    texto = r'{"m": "caf\u00e9 \ud83d\ude4f!"}'
+    parser = IncrementalJSONParser()
+    parser.feed(texto[:corte])
+    # O valor parcial nunca traz metade de um escape
+    parcial = parser.fields.get("m", "")
+    assert "\\" not in parcial and "café 🙏!".startswith(parcial)
+    parser.feed(texto[corte:])
+    assert parser.fields == {"m": "café 🙏!"}
+    assert parser.complete == {"m"}
+
+
+def test_texto_partido_caractere_a_caractere():
+    original = {"keywords": "luz, paz", "mensagem": 'Ele disse: "Não temas"\n', "oracao": "Senhor\\"}
+    parser = alimentar(*json.dumps(original))
+    assert parser.fields == original
+    assert parser.complete == set(original)
+
+
+def test_valores_que_nao_sao_strings_sao_ignorados():
+    parser = alimentar('{"n": 3, "ok": true, "lista": null, "mensagem": "x"}')
+    assert parser.fields == {"mensagem": "x"}
+    assert parser.result() == {"n": 3, "ok": True, "lista": None, "mensagem": "x"}
+
+
+def test_stream_truncado_devolve_os_campos_parciais():
+    parser = alimentar('{"mensagem": "Tudo bem", "oracao": "Senhor, dai-me')
+    assert parser.complete == {"mensagem"}
+    assert parser.result() == {"mensagem": "Tudo bem", "oracao": "Senhor, dai-me"}
+
+
+def test_stream_truncado_no_nome_da_chave():
+    parser = alimentar('{"mensagem": "Tudo bem", "ora')
+    assert parser.result() == {"mensagem": "Tudo bem"}
+
+
+def test_result_aceita_bloco_de_codigo_markdown():
+    parser = alimentar('```json\n{"mensagem": "x"}\n```')
+    assert parser.result() == {"mensagem": "x"}
+
+
+@pytest.mark.parametrize("texto", ["", "não é JSON", "[1, 2", '{"mensagem" "x"}', "{{{", '"solto"'])
+def test_stream_malformado_nao_lanca_excecao(texto):
+    parser = IncrementalJSONParser()
+    parser.feed(texto)
+    assert isinstance(parser.result(), dict)
+
+
+@pytest.mark.parametrize("texto", ['[{"mensagem": "x"}]', "5", '"texto"', "null"])
+def test_json_que_nao_e_objeto_devolve_os_campos(texto):
+    parser = alimentar(texto)
+    assert parser.result() == parser.fields
+
+
+def test_escape_unicode_invalido_e_ignorado():
+    parser = alimentar(r'{"mensagem": "a\uzzzzb"}')
+    assert parser.fields["mensagem"] == "ab"
+    assert parser.complete == {"mensagem"}
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from coachai.services.structured_output import CAMPOS_RESPOSTA, OutputValidator, extrair_json
+
+COMPLETA = {"keywords": "luz", "mensagem": "m", "versiculo": "v", "oracao": "o"}
+
+
+def test_resposta_completa_em_texto():
+    validator = OutputValidator()
+    assert validator.finalizar(json.dumps(COMPLETA), "prompt") == COMPLETA
+    assert validator.stats()["parse_failures"] == 0
+
+
+def test_extrair_json_tolera_texto_a_volta():
+    assert extrair_json('Aqui está: {"mensagem": "m"} Amém') == {"mensagem": "m"}
+    assert extrair_json("[1, 2]") is None
+
+
+@pytest.mark.parametrize("data", [[{"a": 1}], [COMPLETA], 5, "texto", None, "[1, 2]", True])
+def test_resposta_que_nao_e_objeto_passa_pelo_reparo(data):
+    validator = OutputValidator()
+    pedidos = []
+
+    def reparar(prompt, campos):
+        pedidos.append(campos)
+        return COMPLETA
+
+    assert validator.finalizar(data, "prompt", reparar) == COMPLETA
+    assert pedidos == [list(CAMPOS_RESPOSTA)]
+    stats = validator.stats()
+    assert stats["parse_failures"] == 1
+    assert stats["repairs_succeeded"] == 1
+
+
+def test_reparo_que_nao_e_objeto_conta_como_desperdicio():
+    validator = OutputValidator()
+    assert validator.finalizar({"mensagem": "m"}, "prompt", lambda prompt, campos: ["x"]) is None
+    stats = validator.stats()
+    assert stats["repairs_attempted"] == 1
+    assert stats["repairs_succeeded"] == 0
+    assert stats["wasted_generations"] == 1
+
+
+def test_reparo_so_pede_os_campos_em_falta():
+    validator = OutputValidator()
+    parcial = {"keywords": "luz", "mensagem": "m", "versiculo": " "}
+    pedidos = []
+
+    def reparar(prompt, campos):
+        pedidos.append(campos)
+        return json.dumps({"versiculo": "v", "oracao": "o"})
+
+    assert validator.finalizar(parcial, "prompt", reparar) == COMPLETA
+    assert pedidos == [["versiculo", "oracao"]]
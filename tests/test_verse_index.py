@@ -0,0 +1,114 @@
+import mmap
+import random
+import struct
+
+import pytest
+
+from coachai.services import verse_index
+from coachai.services.verse_index import VerseIndex, compilar, ler_corpus
+
+CORPUS = """# referência\ttexto\ttemas
+Salmos 23:1\tO Senhor é o meu pastor; nada me faltará.\tcuidado, provisão, confiança
+Mateus 11:28\tVinde a mim, todos os que estais cansados e oprimidos, e eu vos aliviarei.\tcansaço, descanso, alívio
+Filipenses 4:6\tNão andeis ansiosos por coisa alguma.\tansiedade, preocupação, oração
+
+Josué 1:9\tSê forte e corajoso; não temas.\tmedo, coragem, força
+"""
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = tmp_path / "versiculos.tsv"
+    path.write_text(CORPUS, encoding="utf-8")
+    return path
+
+
+def test_ler_corpus_ignora_comentarios_e_linhas_vazias(corpus):
+    entradas = ler_corpus(corpus)
+    assert [referencia for referencia, _, _ in entradas] == ["Salmos 23:1", "Mateus 11:28", "Filipenses 4:6", "Josué 1:9"]
+
+
+@pytest.mark.parametrize("dim", [0, 64])
+def test_ida_e_volta_pelo_formato_binario(corpus, dim):
+    entradas = ler_corpus(corpus)
+    index = VerseIndex(compilar(entradas, b"abc", dim))
+
+    assert len(index) == len(entradas)
+    assert index.dim == dim
+    assert index.checksum == b"abc".ljust(32, b"\0")
+    for i, (referencia, texto, _) in enumerate(entradas):
+        assert index.versiculo(i) == (referencia, texto)
+    assert index.formatar(3) == "Sê forte e corajoso; não temas. (Josué 1:9)"
+
+
+@pytest.mark.parametrize("usar_vetores", [False, True])
+def test_busca_encontra_o_versiculo_do_tema(corpus, usar_vetores):
+    if usar_vetores:
+        pytest.importorskip("numpy")
+    index = VerseIndex(compilar(ler_corpus(corpus), dim=64), usar_vetores=usar_vetores)
+    assert index.metodo == ("vetores" if usar_vetores else "indice_invertido")
+
+    assert index.buscar("estou muito ansioso e preocupado")[0][1] == 2
+    assert index.buscar("tenho medo")[0][1] == 3
+    assert index.buscar("xyzzy") == []
+    assert index.escolher("xyzzy", "cansado", rng=random.Random(1)).endswith("(Mateus 11:28)")
+    assert index.escolher("xyzzy", aleatorio_se_vazio=False) is None
+
+
+def test_abrir_grava_o_ficheiro_e_reabre_com_mmap(corpus, tmp_path):
+    path = tmp_path / "versiculos.idx"
+    primeiro = VerseIndex.abrir(str(path), corpus_path=str(corpus))
+    assert isinstance(primeiro._buf, mmap.mmap)
+    gravado = path.stat().st_mtime_ns
+
+    segundo = VerseIndex.abrir(str(path), corpus_path=str(corpus))
+    assert path.stat().st_mtime_ns == gravado
+    assert segundo.versiculo(0) == primeiro.versiculo(0)
+
+
+def test_abrir_recompila_se_o_corpus_mudou(corpus, tmp_path):
+    path = tmp_path / "versiculos.idx"
+    VerseIndex.abrir(str(path), corpus_path=str(corpus))
+    corpus.write_text(CORPUS + "João 14:27\tDeixo-vos a paz.\tpaz\n", encoding="utf-8")
+
+    index = VerseIndex.abrir(str(path), corpus_path=str(corpus))
+    assert len(index) == 5
+    assert index.versiculo(4) == ("João 14:27", "Deixo-vos a paz.")
+
+
+def _substituir(dados, offset, novo):
+    return dados[:offset] + novo + dados[offset + len(novo):]
+
+
+@pytest.mark.parametrize("offset, valor", [
+    (0, b"XXXX"),                          # magic
+    (4, struct.pack("<H", 99)),            # versão
+    (8, struct.pack("<I", 10 ** 6)),       # nº de versículos
+    (12, struct.pack("<I", 10 ** 6)),      # nº de termos
+    (16, struct.pack("<I", 10 ** 9)),      # offset dos versos
+    (36, struct.pack("<I", 0)),            # offset dos vetores
+], ids=["magic", "versao", "n_versiculos", "n_termos", "off_versos", "off_vetores"])
+def test_cabecalho_corrompido_e_recusado(corpus, offset, valor):
+    dados = compilar(ler_corpus(corpus))
+    with pytest.raises(ValueError):
+        VerseIndex(_substituir(dados, offset, valor))
+
+
+@pytest.mark.parametrize("tamanho", [0, 10, verse_index._HEADER.size, verse_index._HEADER.size + 3, -5])
+def test_ficheiro_truncado_e_recusado(corpus, tamanho):
+    dados = compilar(ler_corpus(corpus), dim=16)
+    with pytest.raises(ValueError):
+        VerseIndex(dados[:tamanho])
+
+
+def test_abrir_recompila_um_ficheiro_corrompido(corpus, tmp_path):
+    path = tmp_path / "versiculos.idx"
+    VerseIndex.abrir(str(path), corpus_path=str(corpus))
+    # O checksum (no fim do cabeçalho) continua certo, mas o ficheiro está truncado
+    dados = path.read_bytes()
+    path.write_bytes(dados[:verse_index._HEADER.size + 8])
+
+    index = VerseIndex.abrir(str(path), corpus_path=str(corpus))
+    assert len(index) == 4
+    assert index.versiculo(3)[0] == "Josué 1:9"
+    assert path.read_bytes() == dados